@@ -29,6 +29,8 @@ class ClamavBackend(AVBackend):
     scan_command = 'clamdscan'
     scan_time_pattern = r'^.*Time:\s*(?P<scan_time>\S+)'
     infected_pattern = r'^.*Infected files:\s*(?P<infected>\d+)'
+    batch_pattern = r'^(?P<path>.+?): (?:(?P<threat>.+) FOUND|OK|(?P<error>.+ ERROR))$'
+    batch_lists_clean = True
     last_update_command = f'sigtool --info /var/lib/clamav/daily.cvd'
     version_command = f'clamscan -V'
 
@@ -7,25 +7,34 @@ from django.utils import timezone
 from django.conf import settings
 
 from agents.exceptions import AVException
-import rpyc
 import os
 import subprocess
 from core.utils.files import extract_compressed_file
+from core.utils.rpc import RPYC_PORT, pool as rpc_pool
 
 
 class AVBackend:
     av_name = None
     title = None
     service_name = None
+    # runs on a private copy of the stored file, see
+    # ContentAddressedStorage.private_copy
     scan_command = None
     scan_time_pattern = None
     infected_pattern = None
     threats_pattern = None
+    # pattern of the line of a file in the output of a batch scan, with the
+    # groups path, threat and optionally error, None if batches are not
+    # supported
+    batch_pattern = None
+    # whether every clean file has a line, otherwise a file without a line
+    # is clean
+    batch_lists_clean = False
 
     def __init__(self, host=None):
+        self.host = host
         if host:
-            self.conn = rpyc.classic.connect(host, 18811)
-            self.conn._config['sync_request_timeout'] = None
+            self.conn = rpc_pool.acquire(host, RPYC_PORT, timeout=None)
             self.os = self.conn.modules.os
             self.open = self.conn.builtins.open
             self.subprocess = self.conn.modules.subprocess
@@ -33,7 +42,7 @@ class AVBackend:
             self.shutil = self.conn.modules.shutil
             self.settings = self.conn.root.settings
             self.extract = self.conn.root.extract_compressed_file
-            if self.conn.modules.platform.uname().system == 'Windows':
+            if rpc_pool.get_system(host, RPYC_PORT, self.conn) == 'Windows':
                 self.pywinauto = self.conn.modules.pywinauto
         else:
             self.conn = None
@@ -48,9 +57,26 @@ class AVBackend:
                 import pywinauto
                 self.pywinauto = pywinauto
 
+    def close(self, discard=False):
+        """ Hands the connection back to the pool or closes it """
+        conn, self.conn = getattr(self, 'conn', None), None
+        if not conn:
+            return
+        if discard:
+            rpc_pool.close(conn)
+        else:
+            rpc_pool.release(self.host, RPYC_PORT, conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
     def __del__(self):
-        if hasattr(self, 'conn'):
-            self.conn.close()
+        conn, self.conn = getattr(self, 'conn', None), None
+        if conn:
+            rpc_pool.abandon(conn)
 
     def _perform_command(self, command):
         if not command:
@@ -133,6 +159,71 @@ class AVBackend:
             scan_time = result.seconds
         return stdout, scan_time, infected, threats
 
+    def get_scan_path(self, path):
+        return path
+
+    def get_batch_args(self, paths):
+        return [f'"{path}"' for path in paths]
+
+    def parse_batch(self, stdout, scan_paths):
+        """
+        Returns a dict of path to (stdout, infected_num, threats) of the files
+        which the output of a batch scan has a result for. A line of a member
+        of an archive counts for the archive.
+        """
+        ordered = sorted(scan_paths, key=len, reverse=True)
+        lines = {path: [] for path in scan_paths.values()}
+        threats = {path: [] for path in scan_paths.values()}
+        errors = set()
+        for line in stdout.splitlines():
+            m = re.match(self.batch_pattern, line.strip())
+            if not m:
+                continue
+            scan_path = next((scan_path for scan_path in ordered
+                              if m['path'].startswith(scan_path)), None)
+            if scan_path is None:
+                continue
+            path = scan_paths[scan_path]
+            lines[path].append(line.strip())
+            groups = m.groupdict()
+            if groups.get('error'):
+                errors.add(path)
+            elif groups.get('threat') and \
+                    groups['threat'] not in threats[path]:
+                threats[path].append(groups['threat'])
+
+        results = {}
+        for path in scan_paths.values():
+            if path in errors or (self.batch_lists_clean and not lines[path]):
+                continue
+            results[path] = ('\n'.join(lines[path]),
+                             1 if threats[path] else 0,
+                             ', '.join(threats[path]) or None)
+        return results
+
+    def scan_batch(self, paths):
+        """
+        Scans files in one run of the engine. Returns the stdout, the scan
+        time of the run and the results of parse_batch, a file without a
+        result has to be scanned on its own.
+        """
+        if not self.batch_pattern:
+            raise AVException('Batch scan not supported')
+        scan_paths = {self.get_scan_path(path): path for path in paths}
+        now = timezone.now()
+        command = f'{self.scan_command} ' \
+                  f'{" ".join(self.get_batch_args(list(scan_paths)))}'
+        stdout = self._perform_scan_command(command)
+        scan_time = self.get_scan_time(stdout)
+        infected = self.get_infected_num(stdout)
+        if not scan_time:
+            scan_time = (timezone.now() - now).seconds
+        results = self.parse_batch(stdout, scan_paths)
+        if bool(infected) != any(result[1] for result in results.values()):
+            raise AVException(f'Detections could not be matched to the '
+                              f'files: {stdout}')
+        return stdout, scan_time, results
+
     def get_last_update(self):
         return None
 
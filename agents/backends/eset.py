@@ -34,6 +34,7 @@ class EsetBackend(AVBackend):
     scan_time_pattern = r'^.*Scan time:\s*(?P<scan_time>\S+)'
     infected_pattern = r'^.*Detected:\s*files\s*-\s*(?P<infected>\d+)'
     total_pattern = r'^.*\s*Total:\s*files\s*-\s*(?P<total>\d+),'
+    batch_pattern = r'^name="(?P<path>[^"]+)", result="(?:(?P<error>error[^"]*)|is OK|(?P<threat>[^"]+))"'
     # version_pattern = r"^.*version\s*(?P<version>\S*),\s\DC"
     last_update_command = r'"C:\ESET_CommandLine_Scanner\ecls.exe" "" /base-dir="C:\ESET_CommandLine_Scanner\Modules"'
 
@@ -61,8 +62,14 @@ class EsetBackend(AVBackend):
         else:
             raise AVException(f'Invalid pattern to check number of files scanned: {result.stdout.strip()}')
 
+    def get_scan_path(self, path):
+        return path.replace('/smb/', 'Z:/').replace('/', '\\')
+
+    def get_batch_args(self, paths):
+        return [r'/base-dir="C:\ESET_CommandLine_Scanner\Modules"'] + super().get_batch_args(paths)
+
     def scan(self, path):
-        path = path.replace('/smb/', 'Z:/').replace('/', '\\')
+        path = self.get_scan_path(path)
         return super().scan(r'/base-dir="C:\ESET_CommandLine_Scanner\Modules"', path)
 
     def update(self, path):
@@ -43,6 +43,7 @@ class KasperskyBackend(AVBackend):
     title = 'Kaspersky Security Cloud 21.3'
     scan_command = r'"C:\Program Files (x86)\Kaspersky Lab\Kaspersky Security Cloud 21.3\avp.com"'
     infected_pattern = r'^.*Total detected:[\\t]*(?P<infected>\d+)[\\n]*'
+    batch_pattern = r'^\S+\s+\S+\s+(?P<path>\S.*?)\s+(?:detected\s+(?P<threat>.+)|(?P<error>error|corrupted|password protected).*|\S+)$'
     version_command = r'reg query HKLM\SOFTWARE\Microsoft\Windows\CurrentVersion\Installer\UserData\S-1-5-18\Products\8B21A2FF7BEA0C84598C2E3E6DD7CF2B\InstallProperties /v DisplayVersion'
     update_command = r'"C:\Program Files (x86)\Kaspersky Lab\Kaspersky Security Cloud 21.3\avp.com" update'
     last_update_command = r'Reg Query "HKEY_LOCAL_MACHINE\SOFTWARE\WOW6432Node\KasperskyLab\AVP21.3\Data" /v "LastSuccessfulUpdate"'
@@ -69,8 +70,14 @@ class KasperskyBackend(AVBackend):
         else:
             raise AVException(f'"{self.scan_command}" path does not exist')
 
+    def get_scan_path(self, path):
+        return path.replace('/smb/', 'Z:/').replace('/', '\\')
+
+    def get_batch_args(self, paths):
+        return ['scan'] + super().get_batch_args(paths)
+
     def scan(self, path):
-        path = path.replace('/smb/', 'Z:/').replace('/', '\\')
+        path = self.get_scan_path(path)
         return super().scan('scan', f'"{path}"')
 
     def get_version(self):
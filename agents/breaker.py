@@ -0,0 +1,95 @@
+from time import time
+
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from core.utils.broker import get_redis
+
+import logging
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def get_breaker_key(agent_id):
+    return f'agent_breaker:{agent_id}'
+
+
+def get_trial_key(agent_id):
+    return f'agent_breaker_trial:{agent_id}'
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of an agent, fed by the agents poller and by the scans.
+    It opens after AGENT_BREAKER_THRESHOLD failures in a row, or at once on
+    a failed status check, and lets one trial scan through after
+    AGENT_BREAKER_COOLDOWN seconds. Without redis it stays closed.
+    """
+
+    def __init__(self, agent_id):
+        self.agent_id = agent_id
+        self.key = get_breaker_key(agent_id)
+
+    def get_state(self):
+        try:
+            state = get_redis().hgetall(self.key)
+        except RedisError as e:
+            logger.warning(f'Breaker of agent {self.agent_id} is closed: {e}')
+            return CLOSED
+        if state.get(b'state') != OPEN.encode():
+            return CLOSED
+        if time() - float(state[b'opened_at']) >= \
+                settings.AGENT_BREAKER_COOLDOWN:
+            return HALF_OPEN
+        return OPEN
+
+    def allow(self):
+        """ Whether a scan may go to the agent, one at a time if half open """
+        state = self.get_state()
+        if state == CLOSED:
+            return True
+        if state == OPEN:
+            return False
+        try:
+            return bool(get_redis().set(
+                get_trial_key(self.agent_id), 1, nx=True,
+                ex=settings.AGENT_BREAKER_COOLDOWN))
+        except RedisError:
+            return True
+
+    def record_success(self):
+        """ Closes the breaker, returns True if it was open """
+        try:
+            with get_redis().pipeline() as pipe:
+                pipe.hget(self.key, 'state')
+                pipe.delete(self.key, get_trial_key(self.agent_id))
+                state = pipe.execute()[0]
+        except RedisError:
+            return False
+        return state == OPEN.encode()
+
+    def record_failure(self, force=False):
+        """
+        Counts a failure, returns True if the breaker opened. A failed status
+        check or trial scan starts the cooldown again.
+        """
+        try:
+            connection = get_redis()
+            failures = connection.hincrby(self.key, 'failures', 1)
+            is_open = connection.hget(self.key, 'state') == OPEN.encode()
+            trial = connection.delete(get_trial_key(self.agent_id))
+            if is_open and not (trial or force):
+                return False
+            if not (is_open or force or
+                    failures >= settings.AGENT_BREAKER_THRESHOLD):
+                return False
+            connection.hset(self.key, mapping={'state': OPEN,
+                                               'opened_at': time()})
+        except RedisError as e:
+            logger.warning(f'Failure of agent {self.agent_id} is not '
+                           f'recorded: {e}')
+            return False
+        return not is_open
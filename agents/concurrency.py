@@ -0,0 +1,130 @@
+import uuid
+from math import ceil
+from time import time
+
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from core.utils.broker import get_redis
+
+import logging
+logger = logging.getLogger(__name__)
+
+# takes a slot if the live slots are below the limit of the agent
+ACQUIRE_SCRIPT = """
+redis.call('zremrangebyscore', KEYS[1], '-inf', ARGV[1])
+local limit = tonumber(redis.call('hget', KEYS[2], 'limit') or ARGV[2])
+if redis.call('zcard', KEYS[1]) >= math.floor(limit) then
+    return 0
+end
+redis.call('zadd', KEYS[1], ARGV[3], ARGV[4])
+if redis.call('ttl', KEYS[1]) < tonumber(ARGV[5]) then
+    redis.call('expire', KEYS[1], ARGV[5])
+end
+return 1
+"""
+
+_acquire_script = None
+
+
+def get_slots_key(agent_id):
+    return f'agent_slots:{agent_id}'
+
+
+def get_limit_key(agent_id):
+    return f'agent_concurrency:{agent_id}'
+
+
+def average_scan_time(average, scan_time):
+    if average is None:
+        return scan_time
+    return average + settings.AGENT_CONCURRENCY_SMOOTHING * (
+        scan_time - average)
+
+
+def get_retry_countdown(retries):
+    """ Seconds a scan waits for a busy agent, doubled on every retry """
+    return min(settings.AGENT_CONCURRENCY_RETRY * 2 ** retries,
+               settings.AGENT_CONCURRENCY_RETRY_MAX)
+
+
+def adjust_limit(limit, average, scan_time=None, error=False):
+    """
+    AIMD: the limit is halved on an error or on a scan time which is past
+    AGENT_CONCURRENCY_TOLERANCE times the average, otherwise it grows by one
+    per limit scans.
+    """
+    if error or (average and scan_time is not None and
+                 scan_time > average * settings.AGENT_CONCURRENCY_TOLERANCE):
+        limit = limit / 2
+    elif scan_time is not None:
+        limit = limit + 1 / limit
+    return min(max(limit, settings.AGENT_CONCURRENCY_MIN),
+               settings.AGENT_CONCURRENCY_MAX)
+
+
+class ConcurrencyLimiter:
+    """
+    Limits the scans which run on an agent at once to a limit which adjusts
+    itself from the scan times and errors of the agent. A slot expires once
+    what holds it can no longer be running, after the time limit it is
+    acquired with or AGENT_SLOT_TTL seconds, so a worker which dies does not
+    leak it. Without redis the scans are not limited.
+    """
+
+    def __init__(self, agent_id):
+        self.agent_id = agent_id
+        self.token = None
+
+    def acquire(self, ttl=None):
+        global _acquire_script
+        if not settings.AGENT_CONCURRENCY_MAX:
+            return True
+        token = uuid.uuid4().hex
+        now = time()
+        ttl = ceil(ttl or settings.AGENT_SLOT_TTL)
+        try:
+            if _acquire_script is None:
+                _acquire_script = get_redis().register_script(ACQUIRE_SCRIPT)
+            acquired = _acquire_script(
+                keys=[get_slots_key(self.agent_id),
+                      get_limit_key(self.agent_id)],
+                args=[now, settings.AGENT_CONCURRENCY_INITIAL,
+                      now + ttl, token, ttl])
+        except RedisError as e:
+            logger.warning(f'Scans of agent {self.agent_id} are not '
+                           f'limited: {e}')
+            return True
+        if acquired:
+            self.token = token
+        return bool(acquired)
+
+    def release(self, scan_time=None, error=False):
+        """ Frees the slot and feeds the result of the scan back """
+        if self.token is None:
+            return
+        key = get_limit_key(self.agent_id)
+
+        def update(pipe):
+            limit, average = pipe.hmget(key, 'limit', 'scan_time')
+            limit = float(limit or settings.AGENT_CONCURRENCY_INITIAL)
+            average = float(average) if average else None
+            values = {'limit': adjust_limit(limit, average, scan_time, error)}
+            if scan_time is not None and not error:
+                values['scan_time'] = average_scan_time(average, scan_time)
+            pipe.multi()
+            pipe.hset(key, mapping=values)
+
+        try:
+            connection = get_redis()
+            connection.zrem(get_slots_key(self.agent_id), self.token)
+            if scan_time is not None or error:
+                connection.transaction(update, key)
+        except RedisError as e:
+            logger.warning(f'Slot of agent {self.agent_id} is not '
+                           f'released: {e}')
+        self.token = None
+
+    def get_limit(self):
+        limit = get_redis().hget(get_limit_key(self.agent_id), 'limit')
+        return float(limit or settings.AGENT_CONCURRENCY_INITIAL)
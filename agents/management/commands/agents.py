@@ -1,8 +1,10 @@
 from time import sleep
 from django.core.management.base import BaseCommand
 
+from agents.breaker import CircuitBreaker
 from agents.models import Agent
 from agents.exceptions import AVException
+from scans.models.scan import Scan
 
 import logging
 logger = logging.getLogger(__name__)
@@ -11,15 +13,29 @@ logger = logging.getLogger(__name__)
 class Command(BaseCommand):
     help = 'Sets agents status periodically'
 
+    def feed_breaker(self, agent, status):
+        breaker = CircuitBreaker(agent.pk)
+        scans = Scan.objects.filter(agent=agent)
+        if status['status_code'] == 200:
+            if breaker.record_success():
+                logger.info(f'{agent.av_name} recovered, resuming its scans')
+                scans.resume_parked()
+        else:
+            breaker.record_failure(force=True)
+            scans.fail_parked(f'Agent is down: {status["detail"]}')
+
     def set_status(self):
         agents = Agent.objects.filter(active=True)
         av_names = []
         for agent in agents:
             av_names.append(agent.av_name)
             # logger.info(f'Setting status for {agent.av_name}')
+            av = None
             try:
+                # one pooled connection for all the calls of an agent
+                av = agent.av
                 try:
-                    agent.av.check()
+                    av.check()
                     status = {
                         'detail': 'Up', 'status_code': 200
                     }
@@ -28,28 +44,29 @@ class Command(BaseCommand):
                     status = {'detail': f'Checking AV: {str(e)}',
                               'status_code': 498}
                     Agent.objects.filter(pk=agent.pk).update(status=status)
+                    self.feed_breaker(agent, status)
                     continue
 
                 try:
-                    status['version'] = agent.av.get_version()
+                    status['version'] = av.get_version()
                 except AVException as e:
                     status['version'] = f'Getting AV Version: {str(e)}'
 
                 try:
-                    status['last_update'] = str(agent.av.get_last_update())
+                    status['last_update'] = str(av.get_last_update())
                 except AVException as e:
                     status[
                         'last_update'] = f'Getting Last Update: {str(e)}'
 
                 try:
-                    status['license_key'] = agent.av.get_license_key()
+                    status['license_key'] = av.get_license_key()
                 except AVException as e:
                     status[
                         'license_key'] = f'Getting License Key: {str(e)}'
 
                 try:
                     status['license_expiry'] = str(
-                        agent.av.get_license_expiry())
+                        av.get_license_expiry())
                 except AVException as e:
                     status[
                         'license_expiry'] = f'Getting License Expiry: {str(e)}'
@@ -58,8 +75,14 @@ class Command(BaseCommand):
                 status = {'detail': str(e), 'status_code': 404}
             except (TimeoutError, OSError, EOFError) as e:
                 status = {'detail': str(e), 'status_code': 499}
+                if av:
+                    av.close(discard=True)
+            finally:
+                if av:
+                    av.close()
 
             Agent.objects.filter(pk=agent.pk).update(status=status)
+            self.feed_breaker(agent, status)
         logger.info(f'Status set for {",".join(av_names)}')
         return True
 
@@ -68,4 +91,6 @@ class Command(BaseCommand):
         while True:
             # logger.info('Starting to set status for agents ...')
             self.set_status()
+            # scans whose worker was killed at their hard time limit
+            Scan.objects.all().fail_expired()
             sleep(5)
@@ -13,6 +13,7 @@ class Command(BaseCommand):
         av_name = options['av_name']
 
         agent = Agent.objects.get(av_name=av_name)
-        agent.av.check()
+        with agent.av as av:
+            av.check()
 
         self.stdout.write(self.style.SUCCESS(f'{av_name} is up'))
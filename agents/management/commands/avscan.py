@@ -17,5 +17,6 @@ class Command(BaseCommand):
 
         agent = Agent.objects.get(av_name=av_name)
 
-        stdout, scan_time, infected, threats = agent.av.scan(file_path)
+        with agent.av as av:
+            stdout, scan_time, infected, threats = av.scan(file_path)
         self.stdout.write(self.style.SUCCESS(stdout))
@@ -1,13 +1,14 @@
 import importlib
-import rpyc
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
 from django.utils.translation import ugettext_lazy as _
-from django.db.models.signals import post_delete
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from core.fields import SafeCharField
 from core.models.server import Server
 from core.models.mixins import DateMixin, UpdateModelMixin
+from core.utils.rpc import pool as rpc_pool
 
 
 class Agent(Server):
@@ -197,6 +198,13 @@ class Agent(Server):
             'logo': 'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAeAAAACHCAYAAADOUorDAAAAGXRFWHRTb2Z0d2FyZQBBZG9iZSBJbWFnZVJlYWR5ccllPAAARM5JREFUeNrsvQeAHNWVLnyqqnNPTx5JoxxGEsoJRSSEkFBCYARI5AfYJNvr9Zr3sNf22muvzb+2117v2jiBbQzGRuScowCDQAGBkIRynpync6X/nqo70mjUoaqnZ6ZndD770prqqupbt6rud9I9R9B1HQgEAoFAIPQsRBoCAoFAIBCIgAkEAoFAIAImEAgEAoFABEwgEAgEAhEwgUAgEAgEImACgUAgEIiACQQCgUAgEAETCAQCgUAETCAQCAQCgQiYQCAQCIRegSPTA4NtIdBVG2ksRQFURYPdnxyEuspGKBlUBHkBL8gxGWRFBZF9r6kayHEFfHkeiEVl8zBJAlVWAFNmRiMxyC/Kg1gkbpzL43dDJBQDh0MEr88D4XAUJEk0vke4PU4QBBHCoQj7FEpj0fhgtv8wRVGHxGPxgXJcLdFBz2e/6WLnl/AYtp/qdDmiAkCz2+NqdDgdVezvEx6v63h+YV4l26VZZf0V2O+4XE6Ist8UHRI42N+tzSHw+j3gcjtZv0WIR+N4PnCxfrjZvqrTAZvLRkC9AjDeLxrSj98hmH1lH21sPLETQfaZx473OUwJKaYBSOx7D/ujSdah2CnApIAEWorhx6+cbP+ARA85gUAg9BsCxvTRjMwMwrQKgRGsElfh6IEqOLj7GIwYOxiKywoMAo0zEkbCQmKLRmNQUByAcBsjTXac5HQykmaEq2kQaglD2eASCLWFDaJmhAgtTUFwux3GMW2tYYMImxra8oOtoUnsvHOCreHZjBgnyrIynB1Tgn1GMkeCEk527szrEziJCbzvkiRpjFjrGKkfZmT/aaDAt6VsUPFm9vVuX8ATdTJyrT7RAIF8PxMgvCA5ThI/+PxeyPO5IO52wwfOoXA0ChBHUmUHF7nMH/ex36hnG9lh0BhnJOsCKHQiAQsQYUyLBJzP/nOCsfFQxtZjGIGraQhYBSRggZ5yAoFA6E8aMBILNrv7O5ySoSEyzZKRlGT8rTFyRQLG0zlVB9NoJeN7k4Al0DUHiGwfpoka+yPZIZyMeL0+N/tbQhIfWVvZsLSxrmVlc2PbPCYgDFW5gIDaNf42Hp8xdBCZgDAw1KYMZKQ+t6668dYjTJhgmvH+opKC90oHFb4kiuJG1p8ats1gbmfccfKajWtlDbVYL2Nel2gSsJMPIX7iNlSI3ewTeRm3oQasCKYGjN+5+Kdwptxw5pjT800gEAj9j4B7E0jWDl1imrFSWn2ifk1dVeNVTMtdGIvF8/B7SRQNrRUJL2sQuBDRkdaYmhkOxSqCbdUVxw5X3+R2uxpKBhS8MXjEgA0Dh5S+yoSIkK5RtSkCgUAg9HECRv8uapLBtvD0oweqvsi03SvDoWg5kqIoZZlwLZKyyEhZFM3fVRSlpPJY3foq1vLy/fsHDin5e/mwsgfyCnwHsd8yPW8EAoFA6EsEjMSLZuTWltDCA3tP/AvTeL8gy4pDZJpuj5NuKj4WTgkBoWC4Yv+u0PeP7K/8xvDR5RvOmTz8V/nDB30moPk8phhmZNwTTcukJBMIBAIRcE4BCRb9ttU1zbOP7D/xr9UnGi7HIKp2f2qu9539H/3bgf27j9567EDlDcMmDH9YXjXwsFpW7j4YUyJ+0A4y7v0szyHscYlCrN23SyAQCAQi4F7TJDHQKhSMDP58x6F/O7zvxC2qojkxmKnd3NtX0B78peq658D2Azc79v4RRiycDc0L5jUdyivwbg/JnnxBPT7UI75U6BAeLfcIbzEiVomICQQCgQi4RyEZ0dACHD9cfcvu7Qf/IxKOlWNENJJvX4ZhnnY7AWQZ4JW3Yej2HVUV5836fXj2TP2AK3DH9qB8q1PXbx3gFraVOIXfTgpIDzkFiKlkniYQCIR+iZzKhIVabywij3rv1W3Pbt/0+X3xuFKO2qPQn9RBUQTd44GWhtaJ9U+99ov8+x4ceunx3RdeViZeXuR37qiK6TM/D2l/3NiofHgwoq/FZBq0lJdAIBCIgLtNO0TyPX6kZv2mjZ9+UH28/hL082LgVb8deHZ9utvtPH6k9lu7/vj0G/lPPHfoYrl+6swS9/ccoqjUxvRpb9YrT77VoPwtokK5k0iYQCAQiICz2gHJ6ILj0817f7H1vZ2PYIrIvm5utgOJCR4tkfjkzW9u39Ty8PNfvbBq349XDnAszXNJlWh93hvSrn2lTnm/JqZfiIk6iIcJBAKBCLjLwEhmOSaXfbjx02f3fnb4TkmSjOjhsw3o9wZJdH+24/A92//2yh9GbvnonZVFsDjgko4i4YZVfeQr9cpLO4PaLRQpTSAQCETAXQKanFubg+PefmnzmzUnGlYZaSLPYmYxU1Y64NDh2ts2P/uPV0Z99GHlF8v01U6HFOQ+cNeb9cp9O9q0u1yScNIvLqRoBAKBQCACPl3zdUpQW9Uw683nP3qjpbFtcpdyNPcz4FjU1LYsf2nDW28X7951fM0g51dlXTBuFLrEmRb8s11B7RsSp1gtRSMQCAQCEfAp8nVIEA5FF2x7f/dLbc3BoQ4nkW/CMYrKs5/508vvjtm76+WRhe6NMq/QhIUaXqlT/vvxavnqVhWgJq5DbYKG2xsp9yWBQCD0PwJur25kp2F93raW8LkH9xx/VlHUMslBxWpTkXBDU2jKe398/rnxtSdeEJxO1Rh3rgk/WiXfdySsTR3gFI2Sg50bli70izSOBAKBkKsQsDauXeAhddUNRv1ea4t0dXC5XVgHeMIDv372jXAwWo71cgnpocXi4BxWXnnkti+WKZLDKWimcZkpuDDcI3789ZGuBU4Bop1NzphfOs8hwDg/eYMJBAKhH2nAOkQjcSzFB5E0DfdRFB0O7Tkx6MF7nns62Bom8rVzg5jgolTVDpaqa50gnbIYYF3gg2Ftxmv1yr8i0Tp4neD2Rgk8CAQCoV8SMJgFEXiKyGRNYg2L08ejcfdTD77+SGtTcBwFXGUw1ooKzqZm0Dst0fIwPn6rUb1rV0itQB9xmKm97S2kMiGJyiwRCARCPyRgQQBJFMx6uEmaA8sFMq3t2b+//aujB6vOd3mcOT0YiqxCJib57ocOYjR6xtoivHlhVfd90KR+N8DUXp90qvnZ3x6RVGACgUDodwSsMK0MCQv9wMkaBhK98/KWL378/q7bPF53zpPvoGGlgMlAcpGD9SS+dg+7g5tbtKu3t6qjG5kaXBszWw1rTTJpwAQCgdDvCDgekyEajSdtmqbD3l1HJr72zAf/63TnttlZZuRbVJoPd/74epi3ZApEw9Hc6qAggubzoSJ85lesRVXd81mbdqOuC4CcazSNCRXEvwQCgZCzyIgZ0UzbWN8K0UiMcUMnzUw3i9GzD+cLj7zzR0bUebns98Vrwbb+luVQOrAIvnDDEtj72RGoPFoPrlwQHFjfNJcTlKJCaI+APuMmslvweUhbv6RE/7FPNPgXsIyhm2LdCAQCoX9pwAL7nz/PC3n5PsgLdGpsG2qTn360587Ko7Xzcz3oKhqOwYVrZsO5iyZCsC0MgUI/XPPlVUYQmZYDQUxIumogD2QkYFVNuA9GO9fHtXMOhvVpYcbRbYrZwio94AQCgdCvCBihMWLQVA30Dg3/xsIC1cfqxn38we7vuVy5HXSFZvRR44fCZUzrjceVk4Q8aeYYWL3uPIgxDb/XCVhRITZ0CGh5eTjoSQQi0+R8Iqqdj2ULRd4EisEiEAiE/kfAksNhLEOSOjQnI1zc/s6rW/8rGon5hRyOwkUBwuV2wrVM2/XlecykIu1acSQOK9cvhImMiPHfvY3wxHNATzOUSLaMgOcFmRyBS5CMZUgqOYEJBAKhfxEwm+w9Phf4/B7w+t1m87mhoCgPDu87vuLg58cvRXLLZcQiMlxy7WIYN2XEGSSLmjxGcCM5o0laVXqntAGanOWSYgiPHQNiPHViZ0zR0SDr45pkTQiSCZpAIBD6rwas4TIkY7mRZjT0l0YiMem91z7+ca5fNJqZp80bBxetncf+nVjDRfP0sNGD4IqbloIsKwkjkLudgBnpBmdMBTU/kNT83FEDjmkwMKJBQNV1UHgjEAgEQj8iYJzX21rC0NoUPNkioShsfXfnZccPVZ+by4FXKDRgkNg1t68yorW1FMSGqTQXrZgJ85dOhUi4Z/3BAtPClcICaJs9CwQ5fVkjww+sQyCm6fnt94hAIBAIuYuMmdLhkkDVpJOVjhgDSDu27v22KObu2hckJdTW131pOZQPK8WyiGn210FVzf0P7TkBdVVN0FPChRCPQ+uyxSCXloAYiVi9QNdwr+gtdgoQZ3JFofN0x3E0GoV169ZBTU3NWfFwezweeOyxx2DgwIH0pvcAzrbnqx/jb6yNTXe7WVvHWg29l71AwLGoDNGIbETbor93386jyyuP1s3KZe0XE2xccPFsmGdDo1VkBYpKAnD17Svhnv/YYJCy0M3hxSL7zfiQcmhdMA/EmB3NW9CiKqhhJgMhAXs7VXtEbX/Tpk1QX19v9YTlrA1mrZQ1L5iG+DBrjfzFw5bTVYdjsRgQegYZPF8ECy81n6cl/u/2yQdNd3H+mW3MYm28hf3c9F72AgELhhTjMojIyPnslGDvzsNfy+ULjccUw6d7+U1LQYkrtnI+I1lPnzselq+dD89veMcIPutONR0jnhtWLwfV67VFwKIohI4pYmu1ohvZOIYmuESv15vyFKxdwNplrC1kbTRrBUn2DbJWydonrL3O2susHc2le+73+6GgoIDe8h6Cz+czxryPEDCSx7+xFrB53K9ZO5ClPuRxTXMEa8NYG8LaANZK+Hvnx6mWNRdrzg4kbOgGODWx1soF4UOs7WRtO2ufcQ01Y13Fwj5hyDAyht7LLhIwjjpmwcLoYdR4K4/VTjh6oGoZEnFuSua6ISRggo1Agd/ou32NPw5rrjkfNX3Yv+souD2u7tF+ozFovmAhhCecYxZgsHpPBBEcsag2r75G87lEUFQdAn6cYyybedCcdBdrs21MHuN4W8cngidY+ylre3LhvsuyDL/85S+hqKiI3vSeEHLjcWhpaekr3Z3JCdgumlj7YZb6cDVr93XDte1n7VXWHmLtg1wb+P72XjocDrjxxhshD3M19AQBGxSsmz5SpnXB/p1Hr4/HZGeuLj3ChBprb1xqJNgIBzMTDNEXjKSLS5N+/u0HjShpTDqSVfJl2m60YhQ0rVgGYtze+mPB6YDo/srSYzWfL5947rgNMhOO9MI8KwSMEvdvWLuyi93H4K+bWXsvVwgYCeGHP/whEAgJcHGGx63KIgG7uunaKnj7CmvPsvbvXDMGei+7B2vWrMmIgDNmEFyagxWE2lrCrkP7TqzD+sC5Sb5xRrwVsHLdeUmXHNnRgkeNH2JkzpJjNl2f6DtOEc0s4HgWFULdurWgM4kq3bKjM04viuCqroGje4/f4A34wMc0fU96UzmamN/KAvm2o5m152huJ+Q4BE6kmWAGJ7dsoCcSDFzK2j9Y+ye67d0DdL1kGnycmQasmwSMCStqKhvmNTe2jc22NpgNYMTzydzOTECIx7oeL4RLk5asmQ17Pj0Mm9/daSQgSfu2azqofi8Ep0+Fgvc+AF06XVjBhBu6ywm1V18J8bJSwwxt/57okHeiEo4eqll84mjtkEC+/4QjtVBUzMlyYpLv0VTwEWtbWDvMWohL7BiQNYq1yaxNAtNP1Y7XWKujV5KQ48AAo6ld0FpXgGnm7TMcAabvGs1h36PbnzvIjIAxE5bXZaSerDxa+wVM45hzBMyFhOtvvhiGjRqYdsmRdZ4zqyddddsKOLKvChobWsGZxvctxGIQPH8B1H9hJTgbm8D/yWegedwnyRezaNRedQVEKkaDGMmgn4zQHa2t4D12HCKy6j9+qGb5hGmj70ezeQr8KgX5/p61/2Xt8zS/jMEjS1m7nrUlrD1GrxShD2A5dGEFCMMlYLpt+hrQ542Bk7+jRyA3kCFrmtHwTKOUqk/UX5SL2m8kEoP5S6fBwuUzsp5EQ44rUDqoyCBh4IScdKQUBeSBZdC8cD4jYgUaLl5pJNhA4sVCCyCKBvmGpk7OjHwZNKcDvAcPgaOp2SDjoweqLo7H5dPyW3fC+axdl2A7DhQGhnzZAvkijrD2Z9YuZG0R14AJhFzHmi4ev4C1QX302n+RQvAm9A0C1o3Jva6qcWxTfesEScot/y8SJCbaWPeli4zgKb0b0kJhOstZiybAhZfMSUnwSLRNFy4GNRAAMRYHubQYGi9eYZiZdbcTaq67CoIzpllPtnHGDwiGiTtv2yeGXIS++NqqxgWh1kiqiICvJ9mOUdCPZDgkGHzVTK8UIceBa9vnp5Np03yPS5eW9GCf0a3zJpgJMn4LpnXqD6w9z9pBm+fCdYh302OQG8jQDCNAfmEe7NlxeAHTgh25FP1sJMoQBSPVJCbQ6K4Ukvg7uLb4CzcsMZYloTna5Tl9HDCSOVIxxsjn3L6eF4k3yLRd17IlEBlfAeGxFZmTL/bD6QT3kaPg3X+QacIuIzFKOBgpD4ciU71+z/sJDikD02zcGTugb5rVCAQ7uADMJXTJcJy1d1m7Js15MLjp4R7q80+55pqMUFGguBOsR3Zj39EH/ik9Dn1RA2bkg8Xrjx2qXijkWNFZJNzll8+HaXPH2Sdfm5eCVgCf3w3Xfnk1uL0uIyit4xjpkgOaLmKCsiidSs6MAgLTihtXXwSRUSNtrfVN1GGdjX/Bu+8bUdTt/Uet//jhmnmRxH7vKZA4ucYT0DNRmQRCb+KSNN+j6+UBC+dBDTi/h/qspJryuHaMZnWr65px3r+aHoW+SsBs0ldkVWhqaJ2eS7mfcZnQ+Ckj4ZJrFhv/tndJAriYNina9GdjMpKxk4cbpQ1jHaKs0dzcNms6RMaMNvI6dxZgsNIR+oe7As3tAt+efeDfuRs0l/M0QaK+pnlOknrMo5Kcbhe9DoR+DiumY8zshu6UYJr9MKJ4QQ/126pqgKblv1rcd6l9lYOQEwSMd62tJTQg2BIeI0q5cQ9R6/PleQ1tFE3iaSKAzyBfzJT1wqPvQkNNMzid9izzuL74osvmwfR54w3fsKBpoBYEoPnC87tMssnvnGiYuItffcPUrjtYIlAoam0OTg4Ho1KSSSghn9PrQOjnmAfpg6dw2R0uufvMwvkuzcFr/BGYwZTpgGuZi+mRSAp01Z0DZl7sc8G0HA6H1O4L28h4GVJLY9uoWCye78iRBByYGOOqW5fDqPGDbWe78vhcsOXdXfDIva9A5ZE6uO1bVzDiFCwHb2ESegx+uub2lXD0QDWEqhugZcVSXsko2i3Xq7ndUPzya4b/V/N4OnGzAMHW8PCmhlZ8iKo7ywtJTjkqhx5+XKM1l7XzwFxrjAUhcL0xSjNYCGIfa5tYeyfB9WUbI8H0l03iLyDmz8O1oDLvC+a/3g2mPy1dQIwLEqcma4PMA9jQB1iaYHszP28q4PrQkk7b0KSZKJnzGDBzhKPWhzmL0ayDMQOPZDCemGd8Nj9nEZ+HOuYWx/u6GbJfhTtd9DM+Xx/zf7/DCTsVlvN7Gs+hd2cfFx5mpdmvEMwseA3d1A+8pzdC+lzbOHYPcKEnHdbxZy8d0Ddvt0oTzi8XsbaatTlg5ubO78CROn838J0/wp+TjWDGC9R0ZZAyQiQSG2P4PHOAgNHXO+f8SUalI0yUYQeo7TbUtMCj971qJNX46O0dMGnmaDh/5Sxba4fluAwDh5bC1TddCL9/eBO0zJltmKG7hXw9bsP0XPj2uwYRJ9LoFVkNMAliWAKCOp7ktPjg/byXbyVK5LfzF9dKNRacPHDt8X+B/WjQVMCJ6Sr+ws/iRJXWEAJmINvTrD2YZJyn8Im9M5DIvplhXy+CxMFA32LtnjTHLmbt8U7bXuNE23Fi+gFrdySQ/rfZIGA0/X6N9zeVFnE9/8QkMBjt+/cs3VP00axIs8+hDs/RWxbuCQoQM7kwmEs4bIGARTg9iU53CNEYOGal6sJTFgn4O6xNt7DfJhuk6ODP9j9D6hKMAp8HsA3lygFmF6tnitqTqqp+A8wCFbaQsQO3rTk0JheKvsuyCgPKi2H9rStOJsmwrMhjNSdJhMf+9Bou3QGX22GYop+4/w2oPFoHdqO70fw8Z9FEKLz9GohnkE7SCjDq2dnUDKVPPmOeP0kQHJrgW5pCwxN8tSOJiWqxhQmqO4HpMNH89/9ZJF/g2tsdXFu6OQt9wJfru1wLw0QliyySr2FI4Vod+uGSLXOROrzEHVtXyms5kpzTSp7hSILjOmbIL+eE/P+SkKYVCRWtMH8BM1BorQ0THmohuOzmOd6PrgKtGOPS7LMFTpXX3GLRKnEx5B5Uq9NJN/YBz91qYb9WG/0IZvn6x3JB69eQvv5xMpQyHlkhSVJGvsaMCTgcigzr7QBog2x5VqrSgUXG+l9btjum8b73yjb4kGm9+G88HZqSWxqDsOHeV4wqSnaCzDyiDptDIuxyF4BLU7N/vZJk5JMue+RJcNY3mDmjkw8OVn0aluCbI0kkdrzQP0HvLNK/m2uymZrBUXP+MyfPTIHkiTlzfwxdS7LQwk1Tdia8rkhqXTlnKImm2K75Pg3p18ymQrvGf2MXzrGGk3dXXSSrIH3QUcf7Vs+1cCsEnGvBTIMt7KPYILT+iCmcfBdm4VwvQYZuCDHTVz4WiQ/s7ccONc4LL50DsxZOMDJf2QFqtyeO1MKTD7xxRipJ9Al/8uEeeOPZD41/WxpINhYxNuU9UC1AXFGzPzSY7IRJPGWPPwPeffsTmp7PGJ9ILBmR/CrJdvSvvAFdzxRkB//NTUuJ8CYn1fWsfYFruWiWTFZtCcnzlgz6sJb/VjrzFpIrmilxqQrWhK1LIG2jcFPbRyahRJNG+wP/E66FpnyNUnyHPvNXwAxk6YxjYCaSuIXfV7R+YBKY55NYZ/AcaKbsyrKf1Ra0pnc7bXvF4kR+Tg7dU7Q4TLYoKJ6tedvRcvYkWPMnW8FbmR6YYT1gnWmbapHQiwwcj8ow+pyhcNn1S9i/lVPrbK2QJdNqMXBqwx9eQTOtkde6M9yMoJ/720YYP2UEjKgYnHZZk4+JMo/Xi7AjzFSHLK/MMoo3sD6XPvks5H28/Yygq6QziqqVJvnqKT65JDI5I2mj2e8BPgl/3o23EX2C30iw/UMwzZ7vJTNesPYlMBMUdDYR/y8/zmq/cV3ooyneBSRa9HNifdW9YNaDRe2h3ZyM4zWVa1iXWZy0cwUxTjxSJ80I/ZpfTrA/Bvjs4NohBtckW7qGZmxcV16eQOvCKN1f83HsjJ/zsUSf/vJO303j22/P4DpH82tKhc8TCHavcUuCmGYOXQlmIF4u4P+AGWCVDoeS3IOzAWhxy1ZFqyifrzJCplQhaLoW6C3+xeAvTHxx7VdWg8fvZkRjz9yLWu3rT38In27em5B8jYGRRCO46+Hfv5y29q+TjUN1XIANdQK4szwmhpkZNd8nnoH8TR9ZJl/0b0dC0UByG4ahfRxOcQo0G25l7Y8WNKFMTUA/SyIcXJiCfBHou7yHk2dnM6qPE7MVoLn9oSTkiwEVGMg0g2vhaJ6s4i+cwsmriU+8SNA3cQ36r31oIlLgTFO1iws/HUl5Kx9rvGdXcBK8lj8bifBLONOPH+YCyn+kmfgxmvxiLhR1xq1gRsfbxTIwg4JS4e0E1ozdFgW5S3LkfuL9sZqM433oXh9wrmIMf1etAAMp0byM7rEXufDZ2Wy/E8yVED1HwJqqS6qienpLA8aEF5detxjGThpu1Pu1A7fHBQd2HYfnHt5oaLmp93Viuk148ZF3jeOSwcVGcUO9ANUym8mzOCQYcIU+3wEPPwaBDzdbJt92KwUTGvxpHq5LuCScVLHnmuYmbma5yaJ0bQUYIdn5gjDw5TqwHk2IZuNvJpkQz7Vg/UECSWTWrOSTNgoIbTau6TAkXsKTq1ATEDBO4ld1+HsDmMU7kpmHO+MCSOzzRdJ+wYZg8EVucThNrmTtXzO4TisE+WqSfrxu4VgUCoZ2433SLY77Czbez6fOUu13rQVhrF1LRlM+ui7Wc6EQrTDoWrmGk3Kcz40ZCzIZEbCu6yLTQntl/RH6fWfMOweWXTbPSIBhB6jFoin54T+8ZBxrJeuVx+uGV554H3ZuO8A05zPvm4edYmdYgBcbBfBm0fSMZOtoboby+/8Keds/tUW+HZXzNN/jesElnMhSKtT8Bb+fayioxXTFf4Ia7kWdtuHNvI1rt3bwBzgzp63ABQdIo+EnCjBq5RP2B2fBZJSIgB0d5gUMoLoB7C2vSFRv9lFuabADtGz8IMF2NPXbCchCN0y6QJuWFPf7JQu/4eMCW3chmXukkL9LD3BBYZjF832SxsLUn2El6GoLtyS0JBCEjnKhdD0X8u/pSmcypozesF0osgrFZQVw9e0rjTlWs7nMB7XYF5g2u/ezI4Z2a2mARAEUBf3FL0OwJQwdE48IfBwerBEhqnVhMDtzhyiCf9duGPyHP4Pn4OFMydfIeGlhN4yKXs41yUYL+w/jk+x2/pBmspbwqwm2oRn34wxJ5P4E21Fy9SaTq8A0LycCJrXfBoQI11rtLC2YBWemeownIVIreAbOXE/tBntLf863oBXiMrZkAUmbLFo1ujMrFj6r/+AaLmquz3GBAX3wGDSJfl87CtGPbN7X/gQrioPV5D5oku5SjExmqSgFQRNFUe3JUcMlR+j7XXfLchg0tMRIfGEHqL1+tnU/vPrkB4ZWawe4PvjogSp4+q9vgdPlgPYCFD72yL/dIsCmNsie9ssIH4s1lDz/MjgamyxFO6cQHqwOEt5LDHDBQBUMYrISnFHKX2T0JS2y0a1yODPABvH7Loza63Cm/244JI8Gxd8fm2Sy/dNZNBnpKWTpRzKYXK6GM5fkIEFkGqAUhsSJS5baOIeViP5UdaybLWqLSPRF3XSfMLJ5ARcqL+PXNA8yWx+NBP7EWSxYWlnWshDSu7CyM91ndJAkqEwTlPUe1IPR9Hz+6lkwd8kU21WOUGsNtoQMLVZl2qwo2nfUIoG//eIW2PLeLiNwC1NgtygCPFQrQlbTYWMeaa8XglMmdcnMgEKCLCt2M7OgNvwvYPo60NdmpVzZVE6At1n8DUz40TkZw36uhWSKw5A4802yyNf1Sbb/Dym+J/HXDOaSRILVk13sRyKryBSLE6nXIlmnc8FYMUOX2BREewM7bbyn/RVWkqugxQRjAr7RjUJV5gRsRPgI0NZT/ItRyMMryuHyG5eCEldsZ7tCrfWpB96CYwerDW02U0LD9ugfX4WG2hbwuSV4ukGA/VE2EwinqxPYtA5N1c2m8Kay82B088nmdJrNhY3NK5IIbXPOBTXgx3DzzG4RO87r82S60B7Xaf6UExj6mNB/F0ojVaIv9isWzp1okkItR+7CIxJMQsCJMmqh+fm8BNvRBPky8e7Jsdhq85jhCcZbgcTBTXawL8E2XPo1wMKxs3m/UgGXHm1Js8+zYC024dIcvqfbuAZdf5Y/21ss7ofE+99cCcHPud3RmYzYSBBF1AKb9R7IRYnZqDBfM1Y5ysv3YXIJm5qrCza/sxM2vrQ1YRCVHWDCjtrKRnjm/tdg6T9fAX+r0wy6jemm3U0EMzMkOmNQK8a/xQ5/Y3OKxvIgCLeFzYhpTNqhaqwphulZYH8DfuoaKAX54KrBuTCDeDfBsFR0NdE6mnXf4m0c145x+VIyBzqu79wNqRemT0kyod7Rxb4mquySKCPQSEgcrIIvZgtxr4GDGYwFJqPo/ILFubWhKxmXEiVHwbgDdIEcT3OsFV8xRrwvsaCMoF8wXfDXRVzrjuTY/fwLf3fp+Tbzpt9pY/+hXBPGhlY6zPOO+ckbs9GZDIsx6OBwOHokiwouM7r85qUwYfoo21WOkLjra5rhsT++BlgbV8hC7kxMWbnprR3gnDAG7lo8C8Ro1FgHbDTRXIaE/3Zw4nUIpxqSsYeReNWxNvjV/z4EMUbEEvaLp9QEjX8a0VM6aKgVS1KmtwiDzmqyeCv2cg0XIy4x8u/cJBaV33LNOdEk5IbEyzVWQ/pMRZkg0TroUUkkmh00N53E8QyOSUROGB38X93Ux3TBf/gsrrRwniWQvkawHSvAbEjst+4NYHwG5lZ/gR7p0wRtdK/ckMGxs3nDrG0/53Ndl2KhMg4d8njdx7t7pLDY/eRzK2DllefZXnLUXmjh8T+9bmitndNNdgW6Q4JPHn4dZgVr4KIBEizM12FOQIcZfh0m+3QY59VhtEeH4W4dBrt0KHPqUOTQIV/SwaUpMH7sIFh7zSKQUZvXTU+6LojGeXUmNKApWkNTdFcEBnZoIN9/ohtuy4d8wno6hSZ0VQpCLOjBly2RiSZZ4MoxmptOIhONdVAP9zGd+Q2TrEzqhbFb08v37hgXkjHL3XlEvgnxL10UuFHQwnS+6F4Z0SsEnF/oP9idI6QqKhQU5cG1d6wy1u/aXXJkFlr42Cy04HdntW8Y1NXQGIT7f/cKRBTMTmAuQ8KG+aDjvMm62U76fnkLM2HigjWzYc6SqRDBRCJItFnOaYLCR6DAd6QbJ+hrILk/5f8kk9vA2iL4rBlQEmzLyyLp9Fdk4lsK9HAf05WvWwEZ+W66jFXd8Ls41+La3UOcYHEtKgYufsxJ4D7Wvg5m9C4KHTdB133v/RloPkb3xOYungfjYzCAb4ydoj2ncUmmv+zyOA9k+qNWXn9c83vlF5fBkJEDbNXlNfp2WqEFR7d0ESOhP/loL7zxzIewat15tvpoLqnSYf2ty+Hw3kpoqG02AsWyNnzs/C6nIxIo8HenVocXjH6RjQkEOTRB49KJujP18oSixnZInZErU7zQE+8CIakwjySJEfLZrsuJ5rB01p3e0kRR857MCTNbwOj8X3PhVeICkgoZVuAhnLQUYIQ8BpveAZmrQKOZcvioLMso/Nj2/Wc26eioAecdZKQRYT/uFbJclxCXGS1cMQPOu2i67SVHRqEFtb3QQjBprudswCjY8PeNMG7KCBg5Nn3Bho6QZQVKjKQiK+A3P37EIE274ygoihHApblPv0aMgPYV+E4ECv3V3fwQv8fJs/NyHzQzj0pAwDhAiaKdUYL/bS9rTqU0J3UJiZa8YRDgZb3QF4wzmNNL4yByLTibBCylsOj0dUi9ZKlAYJpZjGvBzFaY7CSjOJRoNDrzvvvu++rdd9/982xIrRb4V0cCrvTleY7oWnYjobGm75ARA5j2exEoigp2I62NQgvPpC60kLU3jRdswPXF6Qo2JBM0ZiyYAMu+MM+yoIGR0mI0ZpBvfNBAaFk0HzSP2wzk4lA1DQqK83Y7HFJPSMjJzDhlSR74RLmVR/TgS5csMG1cD/x2sofZCX0fiYIycSnHoF7oC5oGfb04FmuAYHnKhuRuoZ4CBs2hSXoutzQctnsCRsB3NDU12XavZVwP2OmUlIKiwKd2fbMpT8vIHDXYq+9YCYXFeYYZ2pZGaqPQQta0YI8T9u44bKS4TFWwIRniTGvGwhIVE4czDVpOQroaiLEYiHEZlKIiaFk4H6q/dCOc+Nrt0HLePPadfNrMjkJLYXH+FlXVemIIkhGaK4mWVJVg+4QefNnw5Uo0MBjV3d3VRZKl/+tKYFquFINP5EII9LBw1Y7erk6Ez9IoOLuhgrV0l6j9Ws1h3d1C1Ues/TOYSyWxTvWzlqXPuroxW7ZsmWz3B8VMX3mP3wPlw0rf17KoAeMa3xVXLoCps8faNj2j9hm3WWghayKc1w2vpijYkPIpZSSJx1/75VXgZdq7xklT0JB040ZT8/OgbfYsqL7pWjjx1Vuhfu0lEKkYDbrDCe7KaoOcO0ZMoxAzYHDxB93moz8dydwYyUy9nyXYNqsHNZaDSYSAdt9ddyKUZFIa3IVzluTIhLsbEi/JOK+H+4HCzGIL+6ElBjN3zbHRbrIql8OZxUbONsQhfaBcO+ZZ2GcgmKUEewJBTr5IwiuTzBdnYO/evbYViQxnaMGIBB48fMB7jiwFOaH/9Jxpo2DNVYts+VI7ar/Pb3gX9tkotJAtCKcVbAidVrDB6rVXTBwGl92wBLRw1DAxa5iOcvoUqLluPSPd26D2qsshNPEcI1MWrj0W4uYYORoajPSV7UCByOf3NJcNKu6pggJjE9tIjAQHycw9iQhoSQ/1F7XwTUkk8Vu6+bebILEJHouDezM85+wcmXBRsNmfYPuVPdwPJPwyC/thpi/MAb3ZRnsQrJsnczkrVk8A54Bai/teZYGLvm7DUpRNq9ArYNbHTgtZlm0LwxmaoHUIByM40e/ML/Af0rpo6sT8zP6A18h25XQ7wa7p9GShhafsF1rIFpIVbLDypLjZXZAY6S5ceS4MuvQCqFx7KZz4J0a6113FSHiqkRsaSRm1YTjN5K+Dq67htMcN70VxWcEWdm8asukeSAL03SQq74Xkmyyq+XVIHLDzjR68XY8n2f6lJAJFNgk4kTQ9lGvgdoG1jC+G3AD6T15Oot0s6cF+WPW/vpYhqbxucd+FFgWB/oz9FvebnIbkLrNKghYIWMrgvliq0qbruu10uhnbKJEkGVlGSwcVvdVVXyMGXmGe5xFjy21rv6httjWfKrQgiL3nEkNBYOOLW82CDSlM0dhDFxt5v2RajneHBfhdpQD/fFCEbUtXQPi8uaAEAiCg35c1IRGRYm5qRWEacCPoHUzNeC9GjRv6YqDAn5FP2iZuhcSJLTamMD9hApdEye1xScD1PXSrnofE2Z4wuxJGZHfXkiQ00e5M8khclcH57oLk5uveeBEehDMDzbAfv4CeWf+ND/xyi/u+meFvWF3ahtraBWc5AdvJJ/4TMKurDee8hEQ5Gsza41hP2o5ZM9WzP4QTKgZbzbB4vgVWdiouLra97DNDH7CA2i/48zwwbvKIZ7qyCgl9vXMumAyLV8+CSChmsxtmoYWnH3yzS4UWsgWBJ9QwCjbUNJ+2BhmHCFNUIuliWsqDUQEerBXhzoMS3HlIhIfqBDgU0UFnWq6EpKuqae+BGImCo6XVqB/MDRNofpfLBhW/2NYaTibMoNa6OAuXO5+/HImQrqTfL5Js/w30jM8wmKIPODZ/7kYSfjOF9j3ExnnQN/WtDCeh7sK2JAQ1gws23Q38HSt+QkxkkekyoXfBWrlORG8Hg/U23gXrqRrxecX64hgjggUQdvD2PbC/SiDVuzudv2f/BGYiIUzX+QOuAKAlysP74uDCLSoZadOpSpIUnT17tu1nKsN6wAC+gJeRsBdGjR/6dl6+vzqTYCzUfAcOLoGrbl1uJKawv+TInbVCC9kCki6mvnz8z68ZgWBYfAFJFzXeE3EBHq0X4ZuHJfiXAyLcVy3A5xHzJvjFU1WVLJk7GOk62oIghUInNWDMHjagvGTzwMHFe4wiEInzSOMk9TbXQldDZktgruBaZKLlA69Z0C4+4NpSZ+TzCfzqHrhVv08xCd/Ar68ik0cgzfcvQuIF+1hM4i9gzRe81oJW0FtrK78DiRNE4Jg+DpnVsLUqVFhdx/kuZF4wAdc2/8Pivkuh95fY9CawnrTdbFMYOY/ZvDCgKdPAzFTvxfmd+A8ViX8H07WAgYS7+LzwGf/3vWChJOHMmTPfPuecc472CAEjT8aDEQg3B8Ejia0VFeVPYplAe+cwSwhhIorisgIjMYVdoquvboLH/vSaEfWb7WQgXYGXaeKbX94C/3j+I2iRXPBsowjfPSLB1xjp/rpSgO1BUyxE0nVnmoWSkbujqfm0CGhc/1sxYdgGTL2JlgFHp/zXvKTiig4aFJIdJtLAbDAYtTkoxSSHiSowKvA5PpEmqj7E1HEjjN8K0KdzKInpDiuWYB1Z9B1asaOj9NVew/hdSFzwoTMwk9fNkNxUvoJPHj+B9DmFB3OhAX2g/9eC9vVUku+W8Yng/CT3YTKfEJ6EU6kfMdnKzgwEge4Cai3fTSG4beZjNNTi+TD6FQOaHuHaUCpytkrAXU3T+LzF/fC5mAdnL1CjuifL57Ti70z17KeysKGwhMvHcBnSeLAY9IX8c9ddd/0kk1UnmRbHhbZB5RCRNYh4HFB4wZwXxY8PfMXOKeIxBdZccz7MXjgFYvGYkT7S8s8z9U5kfUDyra1qNPI+9zbQTyvIsjE2clERRGZMg99oA0D9XIe6qMgkHd30+2ZpZRAWb3BiBDT6353mGmq/39M2vGLw45FwHJS4aiQyOe3J1TRBUZRVnU41kbdvglmsGv0YJ7iZTeYP5WCuDabKFoUS1I1c6rUCTNywjk+GxUm0vLX8fFv4Zx3vk5try6hNjeHS8ugOAiW+QFaKhXzMNbNHkry0WJgbzbx3col4Jx+bGNdUUWDBBB7ndHhZBU7aqfAjfm2JtF30N23kghH+ZiO/VrzGmQn6+WUuLEzKEQJG/JyPy60JvhvCv0cy3crvAeYsD/L75+PP2fAOY9v+fGD0ejK3x1guhKVDjAtpXcHrXMu3IhxeAtYDt/ojHuVCeTYyk73B2gHWbkuzX7L7Ug7dsNTQ4/H8ctGiRRszOTYjAkYRZLcrH1pEJBUBjlVMyI+NGgGuAwfNKj5pgIFCpYMKYezE4bBz+37DdGpL+3WbyS+2vLuzV8nXIF1FMUwCWLs3OnoihCZNYJ8jQcnPBx39uDEZfN20HNdZd6rcL1oQKiYNf7qkrKAKs3KJkimkdMS2bdumVFVVzUxxykLeptjsCpL1FyF5haRk2Mq1FiTAZAkbzuHNDjAC9SWL+z7FNbP7IfmaWiSzGWAtaGMKF1qCaUxzKPD8OsU+0yFxLdyO+AEf82UJvuvNTFCI28E08yaziKDAciFvVoFCyABIvLzlIotCB2roh7t4bQe4gGSFVFbwfslwdgKvG5f3vccFyUxxjAvLa60YIZNsnwvZdwlgacO7ZDmz25txoIlT18DFiMetCaAJUmnL/LkQOGCtQBImzQi2huE3P9oAmS6V0dhvO129IOSz3xXRXM76reb5ITquAkKTJ0K0YjTIhYWmSYLdDFyre1IfyjrzCyCoCtOAG80ALN2IBtdnzp/4G7fXZfiedda/zlHQXq83lJeX93pbW9uyLPam3ey6K8PjP+SE+T+cCLMB9L1918b+aFZfxNov+YTZFaCUPRXM4I5UQNMcmlf/LcNJ7Vu8v4iWHCRgND9+nWu4d0PXko10JO2ZkHi5k9WApzcgs2pPnfGSRQIexzXzLWexFoxCz5Vc0C7K4HgMysJVAlVJnnWrBDwti9cU4s/1f3blJBnrZjIjIrPsng6RiFwYHj8OosOHmWZYK28nBm0ZNXuljBr6gHvM7YuFEtpJlRFeeOxoqL/8EmOtbs2N10Hb7Jmg5OWZ6SLRJ9vd629x3KIxcDS3gM7IFrXfYaMHvTmiovxD9K3j0izJ4WDt9Ns7bdq0A8XFxagpoG8VI30zrekc5ZMg+oRXdYF823Gcv6C4phVN0kqG56nlL/kPMzgWAzBW8n5shMwq+NTwcbVahxnNsFi60U7wxkZ+/37ZYVs4iSBg5f33dTN5/wXMTGd327zO04xmYEZYo7CSKHBuuA3BKVvmYKsWFpylkgUVWl0n2NNmPiulJX02+QODM3GFgZ3lX2EumJ8Pp1xbVpJ7FCfZ/iuujb/N57BMUA9mHMacrpJvxhowPlH5bHIXmCDpMQKJtDyVaaOt82bDgCNHLYuXORQ3lbh/WG2INd3thtiIYUYmKhQ05IFljPgcBiljRqqevoz2CGgxGDR8wYKgwcixQ3565ECVEVmO/VHNhBy4JviU0MT6y7Rf4A/g29wkhGZVDBRBc2cF18ryOkwO6DNr5dInktQHnAT2dcOlvcgb+jNRUMCACTQ/l/EXXuLEiH0K8pfxEJewP+KTdH0X+/AEbzgey3gfUIsp7TDpKHxyaOC//wnXeD/k2+yasPCarwUz4cAUPoFIHSTt4/z8GyBxANFzcGYwmZUkCOhfxuUYnU1Ju7J8X6s5ef6MT8JL+XOHOYALOxAMSu9otkaXBiZz2QOmm+JD3qdUU8udFjRbmT+/2QA+a3eAtaj1ZHW58R20koBmYw9PMd+H9MkqZP782NWEl3JBG+uJz+eWEQ//Ht9tjEPZC2YGqr/zf3fEJxbG7J0k2/G5+hNvY/i8h2ZpjIEZwrVzL+dFjZN0Mxeod/DzvgOd8t+Hw2HbK3hOckwmB2LR+a/tikE1+weubY3r8KuoJnxN1FQY+Jv7wFNXB7qjj5ZXRRNzLA4607Cx2lD4nHEQnjgeYuXlbJuTlwBUzVDw3uqiywXevftg0P0PGVaIEWPK31y9/vylHYOuMCNWflEeTJsz/pQawfr9+uuvGw9MGsm2MwEHIfNlG12Wg7ig4O9EwKEe7JPYoQ/tBBzi45Jtc0cxF4L8/HcaOIH1Rx+ih49rRwIO87FVgdDfgfd/UAeBM8yF6rpe6IuDz3udCRg1lpTZoRyM65YtW4Yuvp7RgHGN6VCPwLRf0Vi7ejymO8OKZuQvdi+afVB49LnRfZGABU0H1euBlkULIDK+AmKDB4Pm8RiEaxBvNJoT/UQNGP2/Rp8kpz5n8dTvFxQHIB4/NUcbUdGB0x8IXBe8YkVaS10YEps0e+1ywfT7tPRiH9ol8+Ye+K3GDDSLvopoF0yBhP5x/w9D14PisgGlB9/x0yR720Ct98vDnfDtMS74/lg3TAuIjhibJhWmOS5fNu17Q0YNfEOOK33uadAF0+yMJf/C4yoMLd4ofIB+7V7UeBPeg/oGo3zhpJljHp4wbbSRGMDFtPb2ZqwDdkj0ihMIBEKOIiMCVhkXvdWgwgu1CjzL2rGopmJ6RVyWM6Isb8+FX5j/LUNz0fvYaGB0saxA2WNPwcCHHgUxHjfMvTnXR6aRSzV14Mv3NS9ZPec7mHDDxQgX11J3bL0SJU4gEAgES8jITqwwYn2xToEqpvaiNozB0PiJxCzqujR17oSPZszbd++Wf+y8vbeqE2UukgigedwQ2LwVXNW1ULf+MogNGWzkXc4VAsZIa72mHuYunfHvBcWBI63NZy45xdSgQq5HuREIBAJpwDZZm83rK8occPkgB6wrd8J4vxiV9ZPasejwe2HVlYu+XTqw6JAi981YCvT9uk+cgPJ774e8bZ8YpJwLYdvo/1Ubm9HSsHHizLH3NNa3QqgtmqBFIBqO0RNOIBAI/YmAkWvRJYpNM32jrZx8IabqAfQ/Fg0obFp5xcI72Pe6rut9cnAwqxeutx34t0eg5MVXQZekXidhjAYqkGMNV6yde9ugwUVaSbEfykrzzmxlASgs8NMTTiAQCDmKLoUqt9OqR4QmpCU0TTfEtaEOyQGyqmKpwlfnXTD1J++/8fG3+5wpuh2McFHrxFSTxoKYXhYmVFmF4aPLH28pHby3BiWeJCkT8KsSt2irvh2BQCAQ+gABo8lZ1njlZEGoFTghHw5rU/HfBaWF0MLIYvW6Rd+vPl4359DeyqVuT98KCjLW+zICrlt/uZHtKhf8wEbyE7fjs2O6BHKKKDfF0JbJB0wgEAi5ioxTUWLQlVM0W54Elbg2GH3De0LaAtSE3S4JvPk+8Pk9ylW3rLqhoCivT/mDMRoak3HUXLueke+snAnCQkod6hb2DGCyTFmKNtAFUOSgB5xAIBD6FQEjCRQyBi5xCVDEPss94lH2EUECPhDWph8M6+Nw7vcGfKCpOpQPLa269vbV6ySH1IIpEnN+UGJxUAsCUH3z9RCaOomRbyQn+oX6rkuEuE+Cg5iDG83MyZqimZ8EAoFA6E8EzIg2j7FtAWt5kgCD3cKJYqe4B+f7sAquNxuU6w0t2SFCfkkAsDzehGmjt1523RLMdxvXtNwlYdR0oyOGQtWtN0Nk9KjcWX7ECdgrCjXsplWFFJ2NdeoW04iBCQQCoV8RcGdScEuCNsonvIimZyzO8Eq9ckuTrBdhHiav1wUujwsi4RjMOm/ii3MvmHqTpmq6lmPkgElEMOK5bc4sqP7SjSCXFht/5xJwyHyScFjF/N9MhommaBHNzNlNIBAIhH5GwEiuTPk1GrLwlID0MCNfFX3BNTG9/K8nlO+071vItGCvzwWYsWn9F5c/fMVNy2/GtUm5ogkbGa8kCerXrjECrjQsuhDPvdz3OFolLmEPmv3zHZCyFbDmp0yUBAKB0H81YHP5kQ7lHuGzUT7xeazOgxP/UzXy1z9q0c43dxLAVRAwcitjofj5F05/YMa8CdcBmqN70yeMlY/Q5DwMTc43Qcui88wSg2ruBosx8v3cFHyEtE2kTFgEAoHQ/wgYa72fbBgRzSb7paWOu53iyfJszv88EHvoQFgfiabQZo2px4EAqIyEY+EoDBkx4OELL557ueSUmlWl50kYtV5E80UXQNVtN0OMkbARbJXDSUOM6ukSfI7+34iaupEPmEAgEPohAQsmERgBWH5sjIHd7EwT86TNM/Klv6APEssUNsT1Yf++L/b8gbA23CdiomjGzoyEwe8DOS7D0JEDX1i8avZF/oB3f09VT8JqR+jbjYwZZRBvw+oVRr+EeDynbxRSKRNuVI8IB+I6X4edplEUNIFAIOQuhEzSRKK+uq1Fgygm/O+w3SkK0CzrA+45Et8eVPRyXCuMwUADXML+O0e5rp2SL22OqIwY2PaWyjqo23scmuuaIRyODf7kw8//XHm0boXD6eiWbI9GTV9G+vLAMmi+YBG0zZyOBXJznng7jjkTeKquHewc7xKhLZ1yi0b0MiYFXVBMjmACgUDoNwSMRxwI6yB3ImDd0IwF+KBZvfR3R+LPMKIwVGysFcy4IHT1YOe3LxnouMchCLrGeEGNKnDo0wNQc6ASa9dKOz8+8IPd2w9+l51UkCQxOxeIRetZk0uKoW3ubGidcy6ogTyjohD0oRzVGGE+xCNuWjtImm/Fsozabym7AUtLiIAJBAIhFyH94Ac/yOjAVsUs94tRzx0bal6jfOKeVgU8e0LaQiePlGaE4NrSoq3a2aYtLnIKR4Y6hcNelwT5Q0qhZFAJqLKi+zyutwqLA5uaG9vmRELREhFNwxlowwJjKDFuBlMZGu+SRdBw6RoITxxvCAwYaNXXgOM6xCO8NdwjPYUCjZKmyXxJ2Fi/SE85gUAg9CcNuDKqGxN9QlY3CVf82cHYYzvatMs9HTgAA7KQVKfnSy+sKHX8fmpAfG2gR4ihB7jqWAPUHa2BQzuPFO/+9OAPjx6o+gpyvORIr8UZJmZFNbRaNc8P0VEjIDh9KkTGVYDq8+V8dHNHTVdqr60snHLSI6HOKpC+MyUg/mfcggqM5yl3i3DZQMpHSSAQCP2KgI9FNYMUhCQ7oD+4Pq77f3Eo/tzxqLbEJZx+fHuSiGEecffsQvGZcwukF8bmSx8XShCKNLRC9bFa2LVl3+xNb3/6n7VVTUtxDbGIZmleBxETZwAnIszZrOQHID5kMETGVkCkYjTIpSWg41Ic1Ha13M9IoXOSHeoRP5ocEO+sjemz94W1fwoq+hgkZLzU5WWOtaO84tOyhXuGBD7AJcKqMjJBEwgEQr8i4CORFAQMpvaG1ZJerlMK3mlUn26U9QucCXbGc+DaYfQXl7mEI6N94tbx+c7NQ73irjJR/bztRG1836ZdV259Z8c3w6FoGbicoLvdoPr9oBQXQnxAGcTLB4FcVso03zyjdGBf0XY7kiWO6aSA9N/nFUnfi6q6kemqJqYFmKBy3a427ashVZ+8vtw5rcwFnyoWfcAYhLWslDRgAoFAOOsIOMo48PUGBYk4f3dQ+/u+kHaxO4VLst1/2W5+deMSJ5cj6HVJ9eHWUFksKvuBabtGQg8nI2IeqCWomkm4Wt/KvWhovZqRXGPX3ELpGwPcwqsBhxFJbqzjbWGf5V4RKiO6RwV99dwC6U2fBM1WrhI1ZiyYMbuANGACgUDIRXS7eoRkyki3dXGJY61DUO7ZE9Juw8QdiYjbwUsaniQoJhyEYnJeMCrniaITBL+z/QtTy5X77sCjoMGuNX5uofQ/wz3i3cUuoTXINnZ075oErYMk6NEBLuHJco9grL+2EgXNly3RE04gEAhnKwG3kzCjE/m8Iun2Qoewc2ur+lPGNR5HGn4QeDP+o2sA/SCxRLu5uZxpu5MD0nfH+cUtNXFzSVcqTVnpUGrQKgFTIg4CgUA4ywnYIAQzdgqXxfwq4BQ2b29Vf1sX16c7heRm7P4EgzjBMDfvnJ4v/ZgR8AbMoR3XrBEqgUAgEPoXenSRKPIMEs5Al/DB+cWORRPypJ+JAshKPyYgjQeZBRzCUUa831hR5pgzyidu0Li/m0AgEAikAfcYOPEEZ+aL36rwCU9sa9F+VBXTlhsd6ifqcLvGm8+IlxHu7xj53htR9UYzOlwH4l4CgUAgAu4VoDkaI4BLnMJHC4qkFTVx8fJ9IfVb1TF9DqrlfTF+SIdTPt5ip7B7pE+8d1Ke9KCi6424zKpV5tdFsVEEAoFABNzbHWhfejTSKzw5yud45khEv3xXm/q1RllfpPGsULnOV9hP1dTetXK38HaFX7xvsEd8hskXEVx2FZbJz0sgEAiEHCPgdshmMg51hFd4rNAhPdam6Iv3h/Uv1cX0iyOaXixAbpFxe5Qx9iffIRxmxPvUOL/4N48IW324vkgzs31plIqZQCAQCLlMwAhjuY1mmqdLncJGb56wUQjA4OqYvqYmrl9ZF9MWRDXwI+l1zJPcU33TuF8Xf9fvECrLXMLrTGB4otQlvOUSoM1jlmM0hAlSeAkEAoHQZwi4I9mphmlax+jhyjE+4d4pAfHeZlkceSyqL6mL68ubZH1+WNVHtK91bSdlIUu/bzROuHhOpp3HC53C7mImGDDifbncI3zAiLjZK5qaLpKug3y7BAKBQOhuAm4nqXTftwclaVyDbDfbtn9qHZJLtDeV+1RVHqiFCa+cjOg8Ehwe4RPuH+QR7md/+oOKPrEmps8JqjCnRdYnRzV9NCPDwo4JKNo5sXNZQyRX3Kbrp18HN3XrbhFq85zC/nyH8HGJS/jALwlbSpywj53bSN6J5vCIamrDCl/jfNq1wKlI6NM+O/y78/b2v7UOSTc6Nt3CuFu9PwQCgUDoowTcXlghVS5o9H9iPmIkqQBjLPwbo4EFXqgBSQzP4xCNdJWGBqnqp7Yj6Xq5WulnJ0Siw1q4+J1HhFCpS9g8xA2b2f6/4dsHtSj6iBYZKhgZjwmp+nBGyAPZcYWM1AJsF5eR2ZFxE/sPWrvDmCaT/US9QxCqCxxw1CMJB/0SHHRLwlH2m83mtegQ1cw+xlTzoj28zx5eA1k36u8KZg5r9h8kP7duXrfOr191msdgBzy8Zi+mi5TZdp9o7m+kj9TNa8dxK2AXhYSczz7xvDh+VgK69A73iEAgEAi5h4yKMYAN7aon0yF2NEELcLopmXdD0k1e00WzdIPW0Wzc/k8NztSMMx5g3gchyZh13t7xb73T8e3Xp9v4beJgAoFA6GcETCAQCAQCoQtKIw0BgUAgEAhEwAQCgUAgEAETCAQCgUAgAiYQCAQCgQiYQCAQCAQCETCBQCAQCETABAKBQCAQiIAJBAKBQCACJhAIBAKBAPD/CzAA8yVsQ3PKY+wAAAAASUVORK5CYII='
         }
     ]
+    # clamd shares the logo of clamav
+    av_names.append({
+        'code': 'clamd',
+        'display': _('Clamav (clamd)'),
+        'logo': next(item['logo'] for item in av_names
+                     if item['code'] == 'clamav')
+    })
     active = models.BooleanField(default=True)
     av_name = SafeCharField(max_length=128)
     updating = models.BooleanField(default=False, editable=False)
@@ -221,12 +229,41 @@ class Agent(Server):
     def av(self):
         return self.get_av()
 
+    @property
+    def supports_batch(self):
+        try:
+            return bool(self.get_av_class().batch_pattern)
+        except (ModuleNotFoundError, AttributeError):
+            return False
+
+    @property
+    def queue_name(self):
+        return f'{settings.CELERY_TASK_DEFAULT_QUEUE}.agent.{self.pk}'
+
+    @property
+    def signature(self):
+        """
+        Engine version and signature stamp reported by the agents poller,
+        or None when the engine state is unknown.
+        """
+        status = self.status or {}
+        last_update = status.get('last_update')
+        if status.get('status_code') != 200 or not last_update or \
+                last_update == 'None' or \
+                last_update.startswith('Getting Last Update'):
+            return None
+        return f'{status.get("version")}|{last_update}'
+
     def ping(self):
-        with rpyc.classic.connect(self.api_ip, 18811):
+        with rpc_pool.connection(self.api_ip) as conn:
+            conn.ping()
             return True
 
     def get_sys_info(self):
-        conn = rpyc.classic.connect(self.api_ip, 18811)
+        with rpc_pool.connection(self.api_ip) as conn:
+            return self._get_sys_info(conn)
+
+    def _get_sys_info(self, conn):
         system, node, release, version, machine, processor = conn.modules.platform.uname()
         mem = conn.modules.psutil.virtual_memory()
         stat = conn.modules.psutil.disk_usage('/')
@@ -264,6 +301,14 @@ class UpdateFile(DateMixin, UpdateModelMixin):
         verbose_name_plural = _('Update Files')
 
 
+@receiver(post_save, sender=Agent)
+def post_save_agent(sender, instance, created, *args, **kwargs):
+    if settings.AGENT_QUEUES and instance.active:
+        from agents.tasks import add_agent_consumer
+        transaction.on_commit(
+            lambda: add_agent_consumer(instance.queue_name))
+
+
 @receiver(post_delete, sender=UpdateFile)
 def post_delete_update_file(sender, instance, *args, **kwargs):
     instance.file.delete(save=False)
@@ -1,8 +1,41 @@
-from celery import shared_task
+from celery import current_app, shared_task
+from celery.signals import celeryd_after_setup
+
+from django.conf import settings
+from django.db import DatabaseError
 
 from agents.models import Agent, UpdateFile
 from agents.exceptions import AVException
 
+import logging
+logger = logging.getLogger(__name__)
+
+
+@celeryd_after_setup.connect
+def add_agent_queues(sender, instance, **kwargs):
+    """ Makes a starting worker consume the queues of the active agents """
+    queues = instance.app.amqp.queues
+    # workers which are started for other queues do not scan
+    if not settings.AGENT_QUEUES or queues.consume_from and \
+            settings.CELERY_TASK_DEFAULT_QUEUE not in queues.consume_from:
+        return
+    try:
+        queue_names = [agent.queue_name
+                       for agent in Agent.objects.filter(active=True)]
+    except DatabaseError as e:
+        logger.warning(f'Agent queues are not consumed: {e}')
+        return
+    for queue_name in queue_names:
+        queues.select_add(queue_name)
+
+
+def add_agent_consumer(queue_name):
+    """ Makes the running workers consume the queue of a new agent """
+    try:
+        current_app.control.add_consumer(queue_name, reply=False)
+    except Exception as e:
+        logger.warning(f'Queue {queue_name} is not consumed: {e}')
+
 
 @shared_task(name='agents.tasks.perform_update')
 def perform_update(updatefile_id):
@@ -11,7 +44,8 @@ def perform_update(updatefile_id):
     try:
         if instance.file:
             try:
-                instance.agent.av.update(instance.file.path)
+                with instance.agent.av as av:
+                    av.update(instance.file.path)
                 instance.update(status_code=200)
             except ModuleNotFoundError as e:
                 instance.update(status_code=404,
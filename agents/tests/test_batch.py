@@ -0,0 +1,69 @@
+from unittest.mock import MagicMock
+
+from django.test import SimpleTestCase
+
+from agents.backends.clamav import ClamavBackend
+from agents.backends.eset import EsetBackend
+from agents.exceptions import AVException
+
+CLAMAV_STDOUT = """/media/a.pdf: OK
+/media/b.zip: Eicar-Signature FOUND
+/media/c.doc: Access denied. ERROR
+
+----------- SCAN SUMMARY -----------
+Infected files: 1
+Time: 0.522 sec (0 m 0 s)
+"""
+
+ESET_STDOUT = r"""Scan started at:   Mon Jan  3 14:08:21 2022
+name="Z:\b.zip » eicar.com", result="Eicar test file", action="retained", info=""
+
+Scan completed at: Mon Jan  3 14:08:21 2022
+Scan time:         1 sec (0:00:01)
+Total:             files - 2, objects 3
+Detected:          files - 1, objects 1
+"""
+
+
+def get_backend(backend_class, stdout):
+    backend = backend_class()
+    backend.invoke = MagicMock()
+    backend.invoke.run.return_value = MagicMock(exited=0, ok=True,
+                                                stdout=stdout)
+    return backend
+
+
+class Clamav(SimpleTestCase):
+
+    def test_batch(self):
+        backend = get_backend(ClamavBackend, CLAMAV_STDOUT)
+        stdout, scan_time, results = backend.scan_batch(
+            ['/media/a.pdf', '/media/b.zip', '/media/c.doc'])
+        self.assertEqual(
+            backend.invoke.run.call_args.args[0],
+            'clamdscan "/media/a.pdf" "/media/b.zip" "/media/c.doc"')
+        self.assertEqual(scan_time, 0.522)
+        self.assertEqual(results['/media/a.pdf'],
+                         ('/media/a.pdf: OK', 0, None))
+        self.assertEqual(results['/media/b.zip'][1:],
+                         (1, 'Eicar-Signature'))
+        # scanned on its own
+        self.assertNotIn('/media/c.doc', results)
+
+    def test_unmatched_detection(self):
+        backend = get_backend(
+            ClamavBackend, CLAMAV_STDOUT.replace('/media/b.zip', '/other'))
+        with self.assertRaises(AVException):
+            backend.scan_batch(['/media/a.pdf', '/media/b.zip'])
+
+
+class Eset(SimpleTestCase):
+
+    def test_unlisted_files_clean(self):
+        backend = get_backend(EsetBackend, ESET_STDOUT)
+        stdout, scan_time, results = backend.scan_batch(
+            ['/smb/a.pdf', '/smb/b.zip'])
+        self.assertIn(r'"Z:\a.pdf" "Z:\b.zip"',
+                      backend.invoke.run.call_args.args[0])
+        self.assertEqual(results['/smb/a.pdf'], ('', 0, None))
+        self.assertEqual(results['/smb/b.zip'][1:], (1, 'Eicar test file'))
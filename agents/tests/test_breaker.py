@@ -0,0 +1,101 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from agents.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class FakeRedis:
+    """ The commands of redis the breaker uses """
+
+    def __init__(self):
+        self.data = {}
+
+    def hgetall(self, key):
+        return {field.encode(): str(value).encode()
+                for field, value in self.data.get(key, {}).items()}
+
+    def hget(self, key, field):
+        value = self.data.get(key, {}).get(field)
+        return None if value is None else str(value).encode()
+
+    def hincrby(self, key, field, amount):
+        values = self.data.setdefault(key, {})
+        values[field] = int(values.get(field, 0)) + amount
+        return values[field]
+
+    def hset(self, key, mapping):
+        self.data.setdefault(key, {}).update(mapping)
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def delete(self, *keys):
+        return sum(1 for key in keys if self.data.pop(key, None) is not None)
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append(
+            (name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.redis, name)(*args, **kwargs)
+                for name, args, kwargs in self.calls]
+
+
+@override_settings(AGENT_BREAKER_THRESHOLD=2, AGENT_BREAKER_COOLDOWN=30)
+class Breaker(SimpleTestCase):
+
+    def setUp(self):
+        patcher = patch('agents.breaker.get_redis', return_value=FakeRedis())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(1)
+
+    def test_opens_after_threshold(self):
+        self.assertFalse(self.breaker.record_failure())
+        self.assertEqual(self.breaker.get_state(), CLOSED)
+        self.assertTrue(self.breaker.record_failure())
+        self.assertEqual(self.breaker.get_state(), OPEN)
+        self.assertFalse(self.breaker.allow())
+
+    def test_success_resets(self):
+        self.breaker.record_failure()
+        self.assertFalse(self.breaker.record_success())
+        self.assertFalse(self.breaker.record_failure())
+
+    def test_forced(self):
+        self.assertTrue(self.breaker.record_failure(force=True))
+        self.assertTrue(self.breaker.record_success())
+        self.assertEqual(self.breaker.get_state(), CLOSED)
+
+    @patch('agents.breaker.time')
+    def test_half_open_trial(self, time):
+        time.return_value = 100
+        self.breaker.record_failure(force=True)
+        time.return_value = 131
+        self.assertEqual(self.breaker.get_state(), HALF_OPEN)
+        self.assertTrue(self.breaker.allow())
+        # one trial at a time
+        self.assertFalse(self.breaker.allow())
+        # the failed trial starts the cooldown again
+        self.assertFalse(self.breaker.record_failure())
+        self.assertEqual(self.breaker.get_state(), OPEN)
@@ -0,0 +1,126 @@
+import os
+import socketserver
+import struct
+import tempfile
+import threading
+
+from django.test import SimpleTestCase, override_settings
+
+from agents.backends.clamd import ClamdBackend
+from agents.exceptions import AVException
+
+EICAR = b'X5O!P%@AP[4\\PZX54(P^)7CC)7}$EICAR'
+
+
+class FakeClamd(socketserver.StreamRequestHandler):
+    """ Replies like clamd, a stream containing EICAR is infected """
+
+    def read_command(self):
+        command = b''
+        while not command.endswith(b'\0'):
+            char = self.rfile.read(1)
+            if not char:
+                return None
+            command += char
+        return command[1:-1]
+
+    def handle(self):
+        self.server.connections += 1
+        request_id = 0
+        command = self.read_command()
+        if command.startswith(b'MULTISCAN '):
+            path = command.split(b' ', 1)[1].decode()
+            for name in sorted(os.listdir(path)):
+                with open(os.path.join(path, name), 'rb') as f:
+                    result = b'Eicar-Signature FOUND' if EICAR in f.read() \
+                        else b'OK'
+                self.wfile.write(os.path.join(path, name).encode() + b': ' +
+                                 result + b'\0')
+            return
+        while True:
+            command = self.read_command()
+            if command in (None, b'END'):
+                return
+            request_id += 1
+            if command == b'PING':
+                reply = b'PONG'
+            elif command == b'VERSION':
+                reply = b'ClamAV 0.103.2/26290/Thu Sep 23 10:20:13 2021'
+            elif command == b'INSTREAM':
+                data = b''
+                while True:
+                    size = struct.unpack('!L', self.rfile.read(4))[0]
+                    if not size:
+                        break
+                    data += self.rfile.read(size)
+                if len(data) > 1024:
+                    reply = b'INSTREAM size limit exceeded. ERROR'
+                elif EICAR in data:
+                    reply = b'stream: Eicar-Signature FOUND'
+                else:
+                    reply = b'stream: OK'
+            self.wfile.write(str(request_id).encode() + b': ' + reply + b'\0')
+
+
+class Clamd(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.socket_path = os.path.join(cls.temp_dir.name, 'clamd.ctl')
+        cls.server = socketserver.ThreadingUnixStreamServer(cls.socket_path,
+                                                            FakeClamd)
+        cls.server.daemon_threads = True
+        cls.server.connections = 0
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.temp_dir.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        override = override_settings(CLAMD_SOCKET=self.socket_path)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.backend = ClamdBackend()
+
+    def write(self, name, content):
+        path = os.path.join(self.temp_dir.name, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_instream(self):
+        path = self.write('clean.txt', b'clean')
+        stdout, scan_time, infected, threats = self.backend.scan(path)
+        self.assertEqual(stdout, f'{path}: OK')
+        self.assertEqual((infected, threats), (0, None))
+
+        path = self.write('eicar.com', EICAR)
+        stdout, scan_time, infected, threats = self.backend.scan(path)
+        self.assertEqual((infected, threats), (1, 'Eicar-Signature'))
+
+    def test_error(self):
+        path = self.write('large.bin', b'a' * 2048)
+        with self.assertRaises(AVException):
+            self.backend.scan(path)
+
+    def test_session_reused(self):
+        connections = self.server.connections
+        self.backend.check()
+        self.assertTrue(self.backend.get_version().startswith('ClamAV'))
+        self.assertEqual(str(self.backend.get_last_update()), '2021-09-23')
+        self.assertLessEqual(self.server.connections, connections + 1)
+
+    def test_multiscan(self):
+        folder = os.path.join(self.temp_dir.name, 'folder')
+        os.makedirs(folder, exist_ok=True)
+        self.write('folder/a.txt', b'clean')
+        self.write('folder/b.com', EICAR)
+        stdout, scan_time, infected, threats = self.backend.scan(folder)
+        self.assertEqual((infected, threats), (1, 'Eicar-Signature'))
+        self.assertEqual(len(stdout.splitlines()), 2)
@@ -0,0 +1,58 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+from redis.exceptions import ConnectionError
+
+from agents.concurrency import (ConcurrencyLimiter, adjust_limit,
+                                get_retry_countdown)
+
+
+@override_settings(AGENT_CONCURRENCY_MIN=1, AGENT_CONCURRENCY_MAX=8,
+                   AGENT_CONCURRENCY_TOLERANCE=2)
+class AdjustLimit(SimpleTestCase):
+
+    def test_additive_increase(self):
+        self.assertEqual(adjust_limit(4, 10, scan_time=12), 4.25)
+        self.assertEqual(adjust_limit(8, 10, scan_time=12), 8)
+
+    def test_multiplicative_decrease(self):
+        self.assertEqual(adjust_limit(4, 10, scan_time=25), 2)
+        self.assertEqual(adjust_limit(4, 10, error=True), 2)
+        self.assertEqual(adjust_limit(1, 10, error=True), 1)
+
+    def test_no_feedback(self):
+        self.assertEqual(adjust_limit(3, None), 3)
+
+
+@override_settings(AGENT_CONCURRENCY_RETRY=2, AGENT_CONCURRENCY_RETRY_MAX=60)
+class RetryCountdown(SimpleTestCase):
+
+    def test_backoff(self):
+        self.assertEqual([get_retry_countdown(retries)
+                          for retries in range(7)],
+                         [2, 4, 8, 16, 32, 60, 60])
+
+
+class Limiter(SimpleTestCase):
+
+    @patch('agents.concurrency.get_redis',
+           side_effect=ConnectionError('down'))
+    def test_unlimited_without_redis(self, get_redis):
+        limiter = ConcurrencyLimiter(1)
+        self.assertTrue(limiter.acquire())
+        limiter.release(scan_time=1)
+        self.assertIsNone(limiter.token)
+
+    @override_settings(AGENT_CONCURRENCY_MAX=0)
+    def test_disabled(self):
+        self.assertTrue(ConcurrencyLimiter(1).acquire())
+
+    @patch('agents.concurrency.get_redis')
+    def test_slot_ttl(self, get_redis):
+        script = get_redis.return_value.register_script.return_value
+        script.return_value = 1
+        with patch('agents.concurrency._acquire_script', None):
+            self.assertTrue(ConcurrencyLimiter(1).acquire(3600.5))
+        args = script.call_args[1]['args']
+        self.assertEqual(args[-1], 3601)
+        self.assertAlmostEqual(args[2] - args[0], 3601, delta=1)
@@ -67,8 +67,7 @@ def create_from_email(session, part):
             file=file, info=info, display_name=file.name,
             session=session, valid=True
         )
-        instance.update_scan_state()
-        instance.session.update_progress()
+        File.track_created([instance])
         instance.set_file_info()
         instance.scan()
     except Exception as ex:
@@ -77,22 +76,20 @@ def create_from_email(session, part):
 
 def manage_email_parts(parts, sender, total_paths):
     from scans.models.session import Session
+    from scans.progress import ProgressReporter
     counter = 0
     session = Session.objects.create(source='email', remote_addr=sender,
                                      total=total_paths, counter=counter,
                                      analyze_progress=0)
-    for part in parts:
-        if part.get_content_maintype() == 'multipart':
-            continue
-        if part.get('Content-Disposition') is None:
-            continue
-        counter += 1
-        Session.objects.filter(pk=session.pk).update(
-            total=total_paths,
-            counter=counter,
-            analyze_progress=round(100 * counter / total_paths, 1)
-        )
-        create_from_email(session, part)
+    with ProgressReporter(session_id=session.pk,
+                          total=total_paths) as reporter:
+        for part in parts:
+            if part.get_content_maintype() == 'multipart':
+                continue
+            if part.get('Content-Disposition') is None:
+                continue
+            reporter.update()
+            create_from_email(session, part)
 
 
 class EmailBackend:
@@ -1,7 +1,6 @@
 import invoke
 import subprocess
 import platform
-import rpyc
 import os
 import shutil
 import base64
@@ -10,6 +9,7 @@ from django.conf import settings
 
 from core.exceptions import PrinterError
 from core.utils.files import extract_compressed_file
+from core.utils.rpc import pool as rpc_pool
 
 
 class Printer:
@@ -17,8 +17,7 @@ class Printer:
         self.host = host
         self.port = port
         if host:
-            self.conn = rpyc.classic.connect(host, port)
-            self.conn._config['sync_request_timeout'] = None
+            self.conn = rpc_pool.acquire(host, port, timeout=None)
             self.os = self.conn.modules.os
             self.open = self.conn.builtins.open
             self.subprocess = self.conn.modules.subprocess
@@ -26,7 +25,7 @@ class Printer:
             self.shutil = self.conn.modules.shutil
             self.settings = self.conn.root.settings
             self.extract = self.conn.root.extract_compressed_file
-            if self.conn.modules.platform.uname().system == 'Windows':
+            if rpc_pool.get_system(host, port, self.conn) == 'Windows':
                 self.pywinauto = self.conn.modules.pywinauto
         else:
             self.conn = None
@@ -41,9 +40,21 @@ class Printer:
                 import pywinauto
                 self.pywinauto = pywinauto
 
+    def close(self):
+        conn, self.conn = getattr(self, 'conn', None), None
+        if conn:
+            rpc_pool.release(self.host, self.port, conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
     def __del__(self):
-        if self.conn:
-            self.conn.close()
+        conn, self.conn = getattr(self, 'conn', None), None
+        if conn:
+            rpc_pool.abandon(conn)
 
     def check(self):
         return True
@@ -96,6 +96,10 @@ class System:
         if 'valid_acceptance_index' in values and not 0 < valid_acceptance_index <= 1:
             raise ValueError('Not a valid choice for valid_acceptance_index')
 
+        early_decision = values.get('early_decision')
+        if 'early_decision' in values and not isinstance(early_decision, bool):
+            raise ValueError('Not a valid choice for early_decision')
+
         ftp_port = values.get('ftp_port')
         if 'ftp_port' in values and not isinstance(ftp_port, int):
             raise ValueError('Not a valid choice for ftp_port')
@@ -185,6 +189,7 @@ class System:
             'delete_file_after_scan': False,
             'clean_acceptance_index': 0.5,
             'valid_acceptance_index': 0.5,
+            'early_decision': False,
             'log': False,
             'log_http_url': '',
             'log_http_method': '',
@@ -855,7 +860,7 @@ class System:
     def check_printer(raise_exception=True):
         printer_ip, printer_port = System.check_printer_settings(raise_exception=raise_exception)
         try:
-            Printer(printer_ip, printer_port)
+            Printer(printer_ip, printer_port).close()
             return True, f'{printer_ip} responded on port {printer_port}'
         except:
             if raise_exception:
@@ -942,8 +947,8 @@ class System:
     def print_receipt(base64_file):
         printer_ip, printer_port = System.check_printer_settings()
 
-        printer = Printer(printer_ip, printer_port)
-        printer.print(base64_file)
+        with Printer(printer_ip, printer_port) as printer:
+            printer.print(base64_file)
 
         return True, None
 
@@ -27,6 +27,7 @@ class SettingsSerializer(serializers.Serializer):
     delete_file_after_scan = serializers.BooleanField(required=False)
     clean_acceptance_index = serializers.FloatField(required=False)
     valid_acceptance_index = serializers.FloatField(required=False)
+    early_decision = serializers.BooleanField(required=False)
     log = serializers.BooleanField(required=False)
     log_http_url = serializers.URLField(required=False)
     log_http_method = serializers.ChoiceField(choices=['POST', 'PATCH'],
@@ -97,6 +98,7 @@ class KioskSettingsSerializer(serializers.Serializer):
     delete_file_after_scan = serializers.BooleanField(required=False)
     clean_acceptance_index = serializers.FloatField(required=False)
     valid_acceptance_index = serializers.FloatField(required=False)
+    early_decision = serializers.BooleanField(required=False)
     log = serializers.BooleanField(required=False)
     log_http_url = serializers.URLField(required=False, allow_blank=True)
     log_http_method = serializers.ChoiceField(choices=['POST', 'PATCH'],
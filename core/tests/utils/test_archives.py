@@ -0,0 +1,106 @@
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+
+from django.core.files.storage import FileSystemStorage
+from django.test import SimpleTestCase, override_settings
+
+from core.utils.archives import (ExtractionBudget, ExtractedMember,
+                                 SkippedMember, extract_archive,
+                                 get_extraction_executor)
+
+
+def make_zip(path, members):
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as f:
+        for name, content in members.items():
+            f.writestr(name, content)
+
+
+def make_nested_zip(members):
+    content = io.BytesIO()
+    make_zip(content, members)
+    return content.getvalue()
+
+
+class ExtractArchive(SimpleTestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.storage = FileSystemStorage(location=self.root)
+        self.path = os.path.join(self.root, 'archive.zip')
+
+    def extract(self, **limits):
+        limits = {'max_size': 0, 'max_members': 0, 'max_ratio': 0,
+                  'max_depth': 0, **limits}
+        return list(extract_archive(self.path, self.storage, 'out',
+                                    ExtractionBudget(**limits)))
+
+    def test_members(self):
+        make_zip(self.path, {'a.txt': b'first', 'dir/b.txt': b'second'})
+        members = self.extract()
+        self.assertEqual([member.name for member in members],
+                         ['a.txt', 'b.txt'])
+        with self.storage.open(members[1].file) as f:
+            self.assertEqual(f.read(), b'second')
+        self.assertEqual(members[0].info['size'], 5)
+        self.assertEqual(
+            members[0].info['sha256'],
+            'a7937b64b8caa58f03721bb6bacf5c78cb235febe0e70b1b84cd99541461a08e')
+
+    def test_nested(self):
+        make_zip(self.path,
+                 {'nested.zip': make_nested_zip({'inner.txt': b'inner'})})
+        members = self.extract()
+        self.assertEqual([(member.name, member.depth) for member in members],
+                         [('inner.txt', 2)])
+        self.assertFalse(self.storage.exists('out/nested.zip'))
+
+    def test_depth(self):
+        make_zip(self.path,
+                 {'nested.zip': make_nested_zip({'inner.txt': b'inner'})})
+        member, = self.extract(max_depth=1)
+        self.assertIsInstance(member, ExtractedMember)
+        self.assertEqual(member.name, 'nested.zip')
+        self.assertTrue(member.notes)
+
+    def test_ratio(self):
+        make_zip(self.path, {'bomb.txt': b'0' * 1000000, 'a.txt': b'a'})
+        bomb, member = self.extract(max_ratio=100)
+        self.assertIsInstance(bomb, SkippedMember)
+        self.assertIn('ratio', bomb.notes)
+        self.assertIsInstance(member, ExtractedMember)
+
+    def test_size(self):
+        make_zip(self.path, {'a.txt': b'a' * 10, 'b.txt': b'b' * 10})
+        first, second = self.extract(max_size=15)
+        self.assertIsInstance(first, ExtractedMember)
+        self.assertIsInstance(second, SkippedMember)
+
+    def test_members_budget(self):
+        make_zip(self.path, {f'{i}.txt': b'x' for i in range(10)})
+        members = self.extract(max_members=3)
+        self.assertEqual(len(members), 4)
+        self.assertIsInstance(members[-1], SkippedMember)
+        self.assertIn('remaining', members[-1].notes)
+
+    def test_pool(self):
+        make_zip(self.path, {
+            'first.zip': make_nested_zip({'a.txt': b'a', 'b.txt': b'b'}),
+            'second.zip': make_nested_zip({'c.txt': b'c'}),
+            'd.txt': b'd'
+        })
+        budget = ExtractionBudget(max_size=0, max_members=0, max_ratio=0,
+                                  max_depth=0)
+        with override_settings(EXTRACT_WORKERS=2):
+            executor = get_extraction_executor()
+        members = list(extract_archive(self.path, self.storage, 'out',
+                                       budget, executor=executor))
+        self.assertEqual(sorted(member.name for member in members),
+                         ['a.txt', 'b.txt', 'c.txt', 'd.txt'])
+        # the nested archives and their members spent the same budget
+        self.assertEqual(budget.members, 6)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.root, 'out'))),
+                         ['a.txt', 'b.txt', 'c.txt', 'd.txt'])
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.test import SimpleTestCase, override_settings
+
+from core.utils.downloads import DownloadTooLarge, download
+
+CONTENT = b'%PDF-1.4\n' + os.urandom(300 * 1024)
+
+
+class Handler(BaseHTTPRequestHandler):
+    ranges = True
+    content_length = True
+
+    def do_GET(self):
+        self.server.requests.append(self.headers.get('Range'))
+        match = re.match(r'bytes=(\d+)-(\d+)', self.headers.get('Range', ''))
+        if match and self.ranges:
+            start, end = int(match.group(1)), int(match.group(2))
+            end = min(end, len(CONTENT) - 1)
+            body = CONTENT[start:end + 1]
+            self.send_response(206)
+            self.send_header('Content-Range',
+                             f'bytes {start}-{end}/{len(CONTENT)}')
+        else:
+            body = CONTENT
+            self.send_response(200)
+        if self.content_length:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(DOWNLOAD_PART_SIZE=100 * 1024,
+                   DOWNLOAD_CHUNK_SIZE=16 * 1024, DOWNLOAD_WORKERS=3)
+class Download(SimpleTestCase):
+
+    def serve(self, **attributes):
+        handler = type('Handler', (Handler,), attributes)
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        server.requests = []
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.server = server
+        return f'http://127.0.0.1:{server.server_port}/file.pdf'
+
+    def assert_downloaded(self, file):
+        with file:
+            self.assertEqual(file.read(), CONTENT)
+            self.assertEqual(file.file_info, {
+                'size': len(CONTENT),
+                'mimetype': 'application/pdf',
+                'md5': hashlib.md5(CONTENT).hexdigest(),
+                'sha1': hashlib.sha1(CONTENT).hexdigest(),
+                'sha256': hashlib.sha256(CONTENT).hexdigest(),
+            })
+
+    def test_ranges(self):
+        url = self.serve()
+        self.assert_downloaded(download(url, save_as='file.pdf'))
+        self.assertEqual(sorted(self.server.requests), [
+            'bytes=0-102399', 'bytes=102400-204799', 'bytes=204800-307199',
+            'bytes=307200-307208'
+        ])
+
+    def test_without_ranges(self):
+        url = self.serve(ranges=False)
+        self.assert_downloaded(download(url))
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_too_large(self):
+        url = self.serve()
+        with self.assertRaises(DownloadTooLarge) as cm:
+            download(url, max_size=1024)
+        self.assertEqual(cm.exception.size, len(CONTENT))
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_too_large_without_size(self):
+        # the size is enforced on the bytes which arrive
+        url = self.serve(ranges=False, content_length=False)
+        with self.assertRaises(DownloadTooLarge):
+            download(url, max_size=100 * 1024)
@@ -0,0 +1,53 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from core.utils.files import discover_file_info
+from core.utils.hashing import Hasher, hash_file
+
+CONTENT = os.urandom(300 * 1024)
+
+
+def checksums(content):
+    return {
+        'md5': hashlib.md5(content).hexdigest(),
+        'sha1': hashlib.sha1(content).hexdigest(),
+        'sha256': hashlib.sha256(content).hexdigest(),
+    }
+
+
+@override_settings(HASH_CHUNK_SIZE=100 * 1024, HASH_WORKERS=2)
+class Hashing(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_hash_file(self):
+        self.assertEqual(hash_file(self.write('file', CONTENT)),
+                         checksums(CONTENT))
+        self.assertEqual(hash_file(self.write('empty', b'')), checksums(b''))
+
+    def test_discover_file_info(self):
+        self.assertEqual(discover_file_info(io.BytesIO(CONTENT)),
+                         checksums(CONTENT))
+
+    @patch('core.utils.hashing.THREADED_MIN_SIZE', 1024)
+    def test_threaded(self):
+        hasher = Hasher()
+        for start in range(0, len(CONTENT), 100 * 1024):
+            hasher.update(CONTENT[start:start + 100 * 1024])
+        self.assertEqual(hasher.hexdigests(), checksums(CONTENT))
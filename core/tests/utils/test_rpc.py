@@ -0,0 +1,90 @@
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from core.utils.rpc import ConnectionPool
+
+
+def get_connection(*args):
+    return MagicMock(closed=False, _request_callbacks={}, _config={})
+
+
+@patch('rpyc.classic.connect', side_effect=get_connection)
+class Pool(SimpleTestCase):
+
+    def setUp(self):
+        self.pool = ConnectionPool(size=1, max_idle=300, ping_after=10)
+
+    def test_reused(self, connect):
+        conn = self.pool.acquire('agent', timeout=None)
+        self.assertIsNone(conn._config['sync_request_timeout'])
+        self.pool.release('agent', 18811, conn)
+        self.assertIs(self.pool.acquire('agent'), conn)
+        self.assertEqual(self.pool.acquire('other').closed, False)
+        self.assertEqual(connect.call_count, 2)
+        conn.ping.assert_not_called()
+
+    def test_closed_replaced(self, connect):
+        conn = self.pool.acquire('agent')
+        self.pool.release('agent', 18811, conn)
+        conn.closed = True
+        self.assertIsNot(self.pool.acquire('agent'), conn)
+
+    def test_pending_replies_not_reused(self, connect):
+        conn = self.pool.acquire('agent')
+        conn._request_callbacks[1] = None
+        self.pool.release('agent', 18811, conn)
+        conn.close.assert_called()
+        self.assertIsNot(self.pool.acquire('agent'), conn)
+
+    @patch('core.utils.rpc.monotonic')
+    def test_pinged_when_idle(self, monotonic, connect):
+        monotonic.return_value = 0
+        conn = self.pool.acquire('agent')
+        self.pool.release('agent', 18811, conn)
+        monotonic.return_value = 20
+        conn.ping.side_effect = EOFError
+        self.assertIsNot(self.pool.acquire('agent'), conn)
+        conn.close.assert_called()
+
+    @patch('core.utils.rpc.monotonic')
+    def test_expired(self, monotonic, connect):
+        monotonic.return_value = 0
+        conn = self.pool.acquire('agent')
+        self.pool.release('agent', 18811, conn)
+        monotonic.return_value = 301
+        self.assertIsNot(self.pool.acquire('agent'), conn)
+        conn.ping.assert_not_called()
+        conn.close.assert_called()
+
+    def test_size(self, connect):
+        first = self.pool.acquire('agent')
+        second = self.pool.acquire('agent')
+        self.pool.release('agent', 18811, first)
+        self.pool.release('agent', 18811, second)
+        first.close.assert_not_called()
+        second.close.assert_called()
+
+    def test_connection_closed_on_error(self, connect):
+        with self.assertRaises(EOFError):
+            with self.pool.connection('agent') as conn:
+                raise EOFError
+        conn.close.assert_called()
+        self.assertIsNot(self.pool.acquire('agent'), conn)
+
+    def test_system_detected_once(self, connect):
+        with self.pool.connection('agent') as conn:
+            conn.modules.platform.uname.return_value.system = 'Linux'
+            self.assertEqual(self.pool.get_system('agent', 18811, conn),
+                             'Linux')
+            self.pool.get_system('agent', 18811, conn)
+        conn.modules.platform.uname.assert_called_once()
+
+    def test_abandoned_closed_later(self, connect):
+        conn = self.pool.acquire('agent')
+        # a finalizer may run while the lock is held
+        with self.pool._lock:
+            self.pool.abandon(conn)
+        conn.close.assert_not_called()
+        self.assertIsNot(self.pool.acquire('agent'), conn)
+        conn.close.assert_called()
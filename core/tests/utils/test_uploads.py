@@ -0,0 +1,38 @@
+import hashlib
+
+from django.core.files.uploadedfile import (InMemoryUploadedFile,
+                                            SimpleUploadedFile,
+                                            TemporaryUploadedFile)
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+CONTENT = b'%PDF-1.4\n' + b'content ' * 20000
+
+
+class HashingUploadHandler(SimpleTestCase):
+
+    def upload(self):
+        request = RequestFactory().post('/', {
+            'file': SimpleUploadedFile('file.pdf', CONTENT)})
+        return request.FILES['file']
+
+    def assert_file_info(self, file):
+        self.assertEqual(file.file_info, {
+            'size': len(CONTENT),
+            'mimetype': 'application/pdf',
+            'md5': hashlib.md5(CONTENT).hexdigest(),
+            'sha1': hashlib.sha1(CONTENT).hexdigest(),
+            'sha256': hashlib.sha256(CONTENT).hexdigest(),
+        })
+        self.assertEqual(file.read(), CONTENT)
+
+    def test_memory(self):
+        file = self.upload()
+        self.assertIsInstance(file, InMemoryUploadedFile)
+        self.assert_file_info(file)
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=1024)
+    def test_temporary(self):
+        file = self.upload()
+        self.assertIsInstance(file, TemporaryUploadedFile)
+        self.assert_file_info(file)
+        file.close()
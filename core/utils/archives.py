@@ -0,0 +1,379 @@
+import os
+import shutil
+import hashlib
+import tarfile
+import tempfile
+import zipfile
+import threading
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+
+import py7zr
+import rarfile
+
+from django.conf import settings
+from django.core.files import File
+
+from core.utils.files import (MimetypeHead, get_extension_info,
+                              is_archive_file)
+
+CHUNK_SIZE = 64 * 1024
+
+Member = namedtuple('Member', ['name', 'size', 'compressed_size', 'open'])
+ExtractedMember = namedtuple('ExtractedMember', ['name', 'file', 'info',
+                                                 'depth', 'notes'])
+SkippedMember = namedtuple('SkippedMember', ['name', 'depth', 'notes'])
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+class ExtractionBudget:
+    """
+    Limits what extracting archives may cost in total, a limit of 0 is
+    disabled. size and members are what was already spent, the threads of
+    the extraction pool spend them together.
+    """
+
+    def __init__(self, max_size=None, max_members=None, max_ratio=None,
+                 max_depth=None, size=0, members=0):
+        self.max_size = settings.EXTRACT_MAX_SIZE \
+            if max_size is None else max_size
+        self.max_members = settings.EXTRACT_MAX_MEMBERS \
+            if max_members is None else max_members
+        self.max_ratio = settings.EXTRACT_MAX_RATIO \
+            if max_ratio is None else max_ratio
+        self.max_depth = settings.EXTRACT_MAX_DEPTH \
+            if max_depth is None else max_depth
+        self.size = size
+        self.members = members
+        self.lock = threading.Lock()
+
+    def add_member(self):
+        with self.lock:
+            self.members += 1
+
+    def copy(self):
+        return ExtractionBudget(self.max_size, self.max_members,
+                                self.max_ratio, self.max_depth,
+                                self.size, self.members)
+
+    @property
+    def exhausted(self):
+        return bool(self.max_members and self.members >= self.max_members or
+                    self.max_size and self.size >= self.max_size)
+
+    def check(self, size, compressed_size=None):
+        """ Returns why a member can not be extracted or None """
+        if self.max_members and self.members >= self.max_members:
+            return f'Number of extracted files exceeded {self.max_members}.'
+        if self.max_size and size is not None and \
+                self.size + size > self.max_size:
+            return f'Total extracted size exceeded {self.max_size}.'
+        if self.max_ratio and size and compressed_size and \
+                size / compressed_size > self.max_ratio:
+            return f'Compression ratio exceeded {self.max_ratio}.'
+        return None
+
+    def consume(self, size):
+        with self.lock:
+            self.size += size
+            total = self.size
+        if self.max_size and total > self.max_size:
+            raise BudgetExceeded(
+                f'Total extracted size exceeded {self.max_size}.')
+
+
+class MemberReader:
+    """
+    Reads a member while hashing it and charging the budget, so a member
+    which inflates past its declared size or the compression ratio of its
+    archive is stopped while it is being read.
+    """
+
+    def __init__(self, file, budget, size=None, archive=None):
+        self.file = file
+        self.budget = budget
+        self.size = size
+        self.archive = archive
+        self.read_size = 0
+        self.head = MimetypeHead()
+        self.md5 = hashlib.md5()
+        self.sha1 = hashlib.sha1()
+        self.sha256 = hashlib.sha256()
+
+    def read(self, size=CHUNK_SIZE):
+        data = self.file.read(size if size and size > 0 else CHUNK_SIZE)
+        if not data:
+            return data
+        self.read_size += len(data)
+        if self.size is not None and self.read_size > self.size:
+            raise BudgetExceeded('File is larger than its declared size.')
+        self.budget.consume(len(data))
+        if self.archive is not None:
+            self.archive.consume(len(data))
+        self.head.update(data)
+        self.md5.update(data)
+        self.sha1.update(data)
+        self.sha256.update(data)
+        return data
+
+    def get_info(self, name):
+        mimetype = self.head.get_mimetype()
+        return {
+            'size': self.read_size,
+            'md5': self.md5.hexdigest(),
+            'sha1': self.sha1.hexdigest(),
+            'sha256': self.sha256.hexdigest(),
+            'mimetype': mimetype,
+            **get_extension_info(name, mimetype)
+        }
+
+
+class ArchiveRatio:
+    """ Compression ratio of a whole archive, as its members are read """
+
+    def __init__(self, path, max_ratio):
+        self.compressed_size = os.path.getsize(path)
+        self.max_ratio = max_ratio
+        self.size = 0
+
+    def consume(self, size):
+        self.size += size
+        if self.max_ratio and self.compressed_size and \
+                self.size / self.compressed_size > self.max_ratio:
+            raise BudgetExceeded(
+                f'Compression ratio exceeded {self.max_ratio}.')
+
+
+def iter_tar_members(path, budget):
+    with tarfile.open(path) as tar:
+        for info in tar:
+            if info.isfile():
+                yield Member(info.name, info.size, None,
+                             lambda info=info: tar.extractfile(info))
+
+
+def iter_zip_members(path, budget):
+    with zipfile.ZipFile(path) as f:
+        for info in f.infolist():
+            if not info.is_dir():
+                yield Member(info.filename, info.file_size, info.compress_size,
+                             lambda info=info: f.open(info))
+
+
+def iter_rar_members(path, budget):
+    with rarfile.RarFile(path) as f:
+        for info in f.infolist():
+            if not info.is_dir():
+                yield Member(info.filename, info.file_size, info.compress_size,
+                             lambda info=info: f.open(info))
+
+
+def iter_7z_members(path, budget):
+    # py7zr can not stream a member, so the members which fit the budget by
+    # their declared sizes are extracted to a temp folder first
+    with py7zr.SevenZipFile(path) as f:
+        infos = [info for info in f.list() if not info.is_directory]
+        trial = budget.copy()
+        targets = []
+        for info in infos:
+            if trial.check(info.uncompressed, info.compressed) is None:
+                trial.add_member()
+                trial.size += info.uncompressed
+                targets.append(info.filename)
+        temp_dir = tempfile.mkdtemp()
+        try:
+            if targets:
+                f.extract(path=temp_dir, targets=targets)
+            for info in infos:
+                extracted_path = os.path.join(temp_dir, info.filename)
+                if info.filename not in targets or \
+                        not os.path.isfile(extracted_path):
+                    # reported by the budget check of extract_archive
+                    yield Member(info.filename, info.uncompressed,
+                                 info.compressed, None)
+                    continue
+                yield Member(info.filename, info.uncompressed,
+                             info.compressed,
+                             lambda path=extracted_path: open(path, 'rb'))
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def iter_members(path, budget):
+    if tarfile.is_tarfile(path):
+        return iter_tar_members(path, budget)
+    elif zipfile.is_zipfile(path):
+        return iter_zip_members(path, budget)
+    elif rarfile.is_rarfile(path):
+        return iter_rar_members(path, budget)
+    elif py7zr.is_7zfile(path):
+        return iter_7z_members(path, budget)
+    else:
+        raise Exception('Could not detect the archive type')
+
+
+class TemporaryMember(File):
+    """
+    A member read into a temporary file, with its checksums as file_info, so
+    the storage links it to a stored copy or moves it without hashing again.
+    """
+
+    def __init__(self, path, name, file_info):
+        super().__init__(open(path, 'rb'), name=name)
+        self.file_info = file_info
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def save_member(storage, folder, member, budget, archive):
+    name = os.path.basename(member.name.rstrip('/')) or 'unnamed'
+    file_name = storage.get_available_name(os.path.join(folder, name))
+    budget.add_member()
+    # next to the member, so the storage moves it on the same disk
+    temp_folder = os.path.dirname(storage.path(file_name))
+    os.makedirs(temp_folder, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=temp_folder, prefix='.member.')
+    try:
+        with member.open() as f, os.fdopen(fd, 'wb') as temp:
+            reader = MemberReader(f, budget, member.size, archive)
+            shutil.copyfileobj(reader, temp, CHUNK_SIZE)
+        info = reader.get_info(name)
+        with TemporaryMember(temp_path, name, info) as content:
+            file_name = storage.save(file_name, content)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return name, file_name, info
+
+
+def extract_nested(path, storage, folder, budget, depth):
+    """
+    Extracts a nested archive completely, what was extracted of it is
+    deleted again if it fails.
+    """
+    members = []
+    try:
+        for member in extract_archive(path, storage, folder, budget, depth):
+            members.append(member)
+    except BaseException:
+        for member in members:
+            if isinstance(member, ExtractedMember):
+                storage.delete(member.file)
+        raise
+    return members
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_extraction_executor():
+    """
+    Pool of EXTRACT_WORKERS threads which extract_archive hands the nested
+    archives to, shared by the extractions of a process. Inflating, hashing
+    and writing members release the GIL. None if EXTRACT_WORKERS is less
+    than 2.
+    """
+    global _executor
+    if settings.EXTRACT_WORKERS < 2:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.EXTRACT_WORKERS,
+                thread_name_prefix='extract')
+    return _executor
+
+
+def discard_nested(nested_archives, storage):
+    """ Deletes what the pool extracted of nested archives not yielded """
+    for extracted, nested in nested_archives:
+        if not isinstance(nested, Future) or nested.cancel():
+            continue
+        try:
+            members = nested.result()
+        except Exception:
+            continue
+        for member in members:
+            if isinstance(member, ExtractedMember):
+                storage.delete(member.file)
+
+
+def extract_archive(path, storage, folder, budget=None, depth=1,
+                    executor=None):
+    """
+    Extracts the members of an archive one by one into a storage folder,
+    hashing them on the way, and recurses into nested archives. Yields an
+    ExtractedMember for each file and a SkippedMember with the reason for
+    each member the budget does not allow.
+    With an executor of get_extraction_executor the nested archives are
+    extracted on the pool while the rest of the archive is read, their
+    members are yielded last.
+    """
+    budget = budget or ExtractionBudget()
+    archive = ArchiveRatio(path, budget.max_ratio)
+    nested_archives = []
+    try:
+        for member in iter_members(path, budget):
+            notes = budget.check(member.size, member.compressed_size)
+            if notes and budget.exhausted:
+                # one note instead of a row for every member of a bomb
+                yield SkippedMember(
+                    member.name, depth,
+                    f'{notes} The remaining files are skipped.')
+                break
+            if notes is None and member.open is None:
+                notes = 'File could not be extracted.'
+            if notes:
+                yield SkippedMember(member.name, depth, notes)
+                continue
+
+            try:
+                name, file_name, info = save_member(storage, folder, member,
+                                                    budget, archive)
+            except BudgetExceeded as e:
+                yield SkippedMember(member.name, depth, str(e))
+                continue
+
+            nested_path = storage.path(file_name)
+            if not is_archive_file(nested_path):
+                yield ExtractedMember(name, file_name, info, depth, '')
+                continue
+            elif budget.max_depth and depth >= budget.max_depth:
+                # too deep to extract, the archive is scanned as it is
+                yield ExtractedMember(
+                    name, file_name, info, depth,
+                    f'Archive nesting depth exceeded {budget.max_depth}.')
+                continue
+
+            extracted = ExtractedMember(name, file_name, info, depth, '')
+            if executor:
+                # deeper archives are extracted on the thread of this one,
+                # so the pool never waits on itself
+                nested = executor.submit(extract_nested, nested_path,
+                                         storage, folder, budget, depth + 1)
+            else:
+                nested = partial(extract_nested, nested_path, storage,
+                                 folder, budget, depth + 1)
+            nested_archives.append((extracted, nested))
+
+        while nested_archives:
+            extracted, nested = nested_archives.pop(0)
+            try:
+                if isinstance(nested, Future):
+                    members = nested.result()
+                else:
+                    members = nested()
+            except Exception as e:
+                yield extracted._replace(notes=str(e))
+                continue
+            storage.delete(extracted.file)
+            yield from members
+    except BaseException:
+        discard_nested(nested_archives, storage)
+        raise
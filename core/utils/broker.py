@@ -0,0 +1,13 @@
+import redis
+
+from django.conf import settings
+
+_connection = None
+
+
+def get_redis():
+    """ Shared client of the redis server which is the celery broker """
+    global _connection
+    if _connection is None:
+        _connection = redis.Redis.from_url(settings.CELERY_BROKER_URL)
+    return _connection
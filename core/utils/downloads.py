@@ -0,0 +1,176 @@
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.utils.text import slugify
+
+from core.utils.files import MimetypeHead
+from core.utils.hashing import Hasher
+
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class DownloadError(Exception):
+    pass
+
+
+class DownloadTooLarge(DownloadError):
+
+    def __init__(self, max_size, size=None):
+        super().__init__(f'The uploaded file size exceeded {max_size}.')
+        self.size = size
+
+
+class Download:
+    """
+    Downloads a url into a temporary file. The first part is requested as a
+    range, servers which answer it with a part are downloaded in parallel
+    ranges of DOWNLOAD_PART_SIZE on DOWNLOAD_WORKERS connections, others in
+    one stream. The size is enforced on the bytes which arrive and the file
+    is hashed in order while the later parts are still downloading.
+    """
+
+    def __init__(self, url, save_as=None, max_size=None, workers=None):
+        self.url = url
+        self.name = save_as or slugify(url)
+        self.max_size = max_size
+        self.workers = workers or settings.DOWNLOAD_WORKERS
+        self.part_size = settings.DOWNLOAD_PART_SIZE
+        self.chunk_size = settings.DOWNLOAD_CHUNK_SIZE
+        self.aborted = threading.Event()
+        self.head = MimetypeHead()
+
+    def get(self, http, headers=None, url=None):
+        response = http.get(url or self.url, headers=headers, stream=True,
+                            timeout=settings.DOWNLOAD_TIMEOUT)
+        response.raise_for_status()
+        return response
+
+    def check_size(self, size):
+        if self.max_size and size > self.max_size:
+            raise DownloadTooLarge(self.max_size, size)
+
+    def stream(self, response, file, hasher, limit=None):
+        """ Writes a response at the position of the file, returns its size """
+        written = 0
+        for chunk in response.iter_content(self.chunk_size):
+            written += len(chunk)
+            if limit is not None and written > limit:
+                raise DownloadError('The server sent more than requested.')
+            self.check_size(written)
+            self.head.update(chunk)
+            file.write(chunk)
+            hasher.update(chunk)
+        return written
+
+    def write_range(self, http, url, fd, start, end):
+        headers = {'Range': f'bytes={start}-{end}'}
+        offset = start
+        with self.get(http, headers, url) as response:
+            if response.status_code != 206:
+                raise DownloadError('The server stopped serving ranges.')
+            for chunk in response.iter_content(self.chunk_size):
+                if self.aborted.is_set():
+                    return
+                if offset + len(chunk) > end + 1:
+                    raise DownloadError('The server sent more than requested.')
+                os.pwrite(fd, chunk, offset)
+                offset += len(chunk)
+        if offset != end + 1:
+            raise DownloadError('The download ended before its size.')
+
+    def hash_range(self, fd, hasher, start, end):
+        offset = start
+        while offset <= end:
+            data = os.pread(fd, min(self.chunk_size, end + 1 - offset), offset)
+            if not data:
+                raise DownloadError('The download ended before its size.')
+            hasher.update(data)
+            offset += len(data)
+
+    def download_ranges(self, http, url, file, hasher, start, size):
+        file.flush()
+        fd = file.fileno()
+        ranges = [(offset, min(offset + self.part_size, size) - 1)
+                  for offset in range(start, size, self.part_size)]
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self.write_range, http, url, fd, *part)
+                       for part in ranges]
+            try:
+                # parts are hashed in order as soon as they are written
+                for future, part in zip(futures, ranges):
+                    future.result()
+                    self.hash_range(fd, hasher, *part)
+            except BaseException:
+                self.aborted.set()
+                for future in futures:
+                    future.cancel()
+                raise
+
+    def run(self):
+        file = TemporaryUploadedFile(self.name, None, 0, None)
+        try:
+            hasher = Hasher()
+            with requests.Session() as http:
+                adapter = HTTPAdapter(pool_maxsize=self.workers)
+                http.mount('http://', adapter)
+                http.mount('https://', adapter)
+
+                response = self.get(
+                    http, {'Range': f'bytes=0-{self.part_size - 1}'})
+                refetch = False
+                with response:
+                    match = response.status_code == 206 and \
+                        CONTENT_RANGE.match(
+                            response.headers.get('content-range', ''))
+                    if match and match.group(1) == '0':
+                        size = int(match.group(3))
+                        self.check_size(size)
+                        written = self.stream(response, file, hasher,
+                                              int(match.group(2)) + 1)
+                        if written != int(match.group(2)) + 1:
+                            raise DownloadError(
+                                'The download ended before its size.')
+                    elif response.status_code == 206:
+                        refetch = True
+                    else:
+                        # the server does not serve ranges
+                        size = written = self.stream(response, file, hasher)
+
+                if refetch:
+                    # a part of an unknown position, the file is downloaded
+                    # again in one stream
+                    with self.get(http) as response:
+                        size = written = self.stream(response, file, hasher)
+                elif size > written:
+                    self.download_ranges(http, response.url, file, hasher,
+                                         written, size)
+
+                file.size = size
+                file.file_info = {
+                    'size': size,
+                    'mimetype': self.head.get_mimetype(),
+                    **hasher.hexdigests()
+                }
+        except requests.exceptions.RequestException as e:
+            file.close()
+            raise DownloadError(f'There was an error downloading file: {e}')
+        except BaseException:
+            file.close()
+            raise
+        file.seek(0)
+        return file
+
+
+def download(url, save_as=None, max_size=None, workers=None):
+    """
+    Downloads a url into a temporary uploaded file whose size, mimetype and
+    checksums are set as file_info, raises DownloadError if it fails.
+    """
+    return Download(url, save_as=save_as, max_size=max_size,
+                    workers=workers).run()
@@ -6,9 +6,7 @@ from PIL import Image
 import magic
 import mimetypes
 import os
-import hashlib
 import requests
-import tempfile
 import tarfile
 import gzip
 import zipfile
@@ -16,9 +14,12 @@ import rarfile
 import py7zr
 import base64
 
-from django.core import files
 from django.core.files import File
-from django.utils.text import slugify
+
+from core.utils.hashing import hash_stream
+
+# what the mimetype of a file is told by
+MIMETYPE_HEAD_SIZE = 8192
 
 
 def generate_photo_file(name='test', format='png'):
@@ -53,58 +54,83 @@ def index_dir(path):
     return files
 
 
-def discover_mimetype(file):
-    chunk = file.read(8192)
-    mime_type = magic.from_buffer(chunk, mime=True)
-    return mime_type or 'generic-data'
-
-
-def discover_file_info(file):
+def iter_paths(paths):
     """
-        Generate checksums of the given file
+        Yield every file under the given paths exactly once. Paths nested in
+        another given directory are skipped and directory symlinks are not
+        followed, so no index of visited paths has to be kept in memory.
     """
-    chunk = file.read(8192)
-
-    sh1 = hashlib.sha1()
-    sha256 = hashlib.sha256()
-    md5 = hashlib.md5()
-
-    while chunk:
-        sh1.update(chunk)
-        sha256.update(chunk)
-        md5.update(chunk)
-        chunk = file.read(8192)
-
-    sh1 = sh1.hexdigest()
-    sha256 = sha256.hexdigest()
-    md5 = md5.hexdigest()
-
-    data = {
-        'sha1': sh1,
-        'sha256': sha256,
-        'md5': md5
+    roots = []
+    for path in sorted(set(os.path.abspath(path) for path in paths)):
+        if any(os.path.commonpath([root, path]) == root for root in roots):
+            continue
+        roots.append(path)
+
+    for root in roots:
+        if not os.path.isdir(root):
+            yield root
+            continue
+
+        stack = [root]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as entries:
+                    for entry in entries:
+                        if entry.is_dir():
+                            if not entry.is_symlink():
+                                stack.append(entry.path)
+                        else:
+                            yield entry.path
+            except OSError:
+                continue
+
+
+def get_extension_info(name, mimetype):
+    allow_extensions = mimetypes.guess_all_extensions(mimetype)
+    extension = os.path.splitext(name)[1][1:].lower()
+
+    ext_match = True
+    if allow_extensions and extension not in allow_extensions:
+        ext_match = False
+
+    return {
+        'extension': extension,
+        'ext_match': ext_match
     }
-    return data
 
 
-def download_file(url, save_as=None):
-    response = requests.get(url, stream=True, allow_redirects=True)
-    temp_file = tempfile.NamedTemporaryFile()
+def get_mimetype(head):
+    return magic.from_buffer(head, mime=True) or 'generic-data'
 
-    for chunk in response.iter_content(2000):
-        if not chunk:
-            break
 
-        temp_file.write(chunk)
+def discover_mimetype(file):
+    return get_mimetype(file.read(MIMETYPE_HEAD_SIZE))
 
-    temp_file.flush()
 
-    if save_as:
-        filename = save_as
-    else:
-        filename = slugify(url)
+class MimetypeHead:
+    """ Keeps the head of a stream as it is read, for its mimetype """
 
-    return files.File(temp_file, name=filename)
+    def __init__(self):
+        self.head = b''
+
+    def update(self, data):
+        if len(self.head) < MIMETYPE_HEAD_SIZE:
+            self.head += data[:MIMETYPE_HEAD_SIZE - len(self.head)]
+
+    def get_mimetype(self):
+        return get_mimetype(self.head)
+
+
+def discover_file_info(file):
+    """
+        Generate checksums of the given file
+    """
+    return hash_stream(file)
+
+
+def download_file(url, save_as=None):
+    from core.utils.downloads import download
+    return download(url, save_as=save_as)
 
 
 def validate_download_size(url):
@@ -0,0 +1,90 @@
+import hashlib
+import mmap
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+DIGESTS = ('md5', 'sha1', 'sha256')
+# hashing smaller buffers on the calling thread costs less than handing
+# them to the pool
+THREADED_MIN_SIZE = 1024 * 1024
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """ Pool of HASH_WORKERS threads which the hashers of a process share """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.HASH_WORKERS,
+                                           thread_name_prefix='hash')
+    return _executor
+
+
+class Hasher:
+    """
+    Feeds every digest of a file with the same buffer. Large buffers are
+    hashed by the first digest on the calling thread and by the others on
+    the shared pool, in parallel as hashlib releases the GIL while it hashes
+    them.
+    """
+
+    def __init__(self, names=DIGESTS):
+        self.digests = {name: hashlib.new(name) for name in names}
+
+    def update(self, data):
+        first, *others = self.digests.values()
+        if not others or len(data) < THREADED_MIN_SIZE or \
+                settings.HASH_WORKERS < 1:
+            for digest in self.digests.values():
+                digest.update(data)
+            return
+        executor = get_executor()
+        futures = [executor.submit(digest.update, data) for digest in others]
+        first.update(data)
+        for future in futures:
+            future.result()
+
+    def hexdigests(self):
+        return {name: digest.hexdigest()
+                for name, digest in self.digests.items()}
+
+
+def hash_stream(file, chunk_size=None, names=DIGESTS):
+    """ Checksums of a file object, read in HASH_CHUNK_SIZE chunks """
+    chunk_size = chunk_size or settings.HASH_CHUNK_SIZE
+    hasher = Hasher(names)
+    for chunk in iter(lambda: file.read(chunk_size), b''):
+        hasher.update(chunk)
+    return hasher.hexdigests()
+
+
+def hash_file(path, chunk_size=None, names=DIGESTS):
+    """
+    Checksums of a file on disk. The file is mapped into memory and hashed
+    in slices of the mapping, so its content is not copied into Python
+    buffers, files which can not be mapped are read in chunks.
+    """
+    chunk_size = chunk_size or settings.HASH_CHUNK_SIZE
+    with open(path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            return hash_stream(f, chunk_size, names)
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return hash_stream(f, chunk_size, names)
+
+        hasher = Hasher(names)
+        with mapped:
+            view = memoryview(mapped)
+            try:
+                for start in range(0, len(view), chunk_size):
+                    hasher.update(view[start:start + chunk_size])
+            finally:
+                view.release()
+            return hasher.hexdigests()
+
@@ -0,0 +1,148 @@
+import os
+import threading
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from time import monotonic
+
+import rpyc
+
+from django.conf import settings
+
+RPYC_PORT = 18811
+# the sync_request_timeout of rpyc
+DEFAULT_TIMEOUT = 30
+
+
+class ConnectionPool:
+    """
+    Per process pool of rpyc classic connections keyed by host and port.
+    Idle connections are closed after RPC_POOL_MAX_IDLE seconds and pinged
+    before reuse once idle for RPC_POOL_PING_AFTER seconds. The module
+    proxies of a connection are cached by rpyc, so they live as long as the
+    pooled connection, and the OS of every host is detected once.
+    """
+
+    def __init__(self, size=None, max_idle=None, ping_after=None):
+        self.size = settings.RPC_POOL_SIZE if size is None else size
+        self.max_idle = settings.RPC_POOL_MAX_IDLE \
+            if max_idle is None else max_idle
+        self.ping_after = settings.RPC_POOL_PING_AFTER \
+            if ping_after is None else ping_after
+        self._systems = {}
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._idle = defaultdict(list)
+        self._abandoned = deque()
+
+    def _check_pid(self):
+        # the sockets of a parent process are never shared with a fork
+        if self._pid != os.getpid():
+            self._reset()
+
+    def is_healthy(self, conn, idle_time):
+        if conn.closed:
+            return False
+        if idle_time < self.ping_after:
+            return True
+        try:
+            conn.ping(timeout=DEFAULT_TIMEOUT)
+        except Exception:
+            return False
+        return True
+
+    def acquire(self, host, port=RPYC_PORT, timeout=DEFAULT_TIMEOUT):
+        self._close_abandoned()
+        key = (host, port)
+        while True:
+            with self._lock:
+                self._check_pid()
+                idle = self._idle[key]
+                conn, released_at = idle.pop() if idle else (None, None)
+
+            if conn is None:
+                conn = rpyc.classic.connect(host, port)
+                break
+
+            idle_time = monotonic() - released_at
+            if idle_time <= self.max_idle and \
+                    self.is_healthy(conn, idle_time):
+                break
+            self.close(conn)
+
+        conn._config['sync_request_timeout'] = timeout
+        return conn
+
+    def release(self, host, port, conn):
+        # a connection still waiting for replies, e.g. after a timeout, would
+        # hand them to the next user
+        if conn.closed or getattr(conn, '_request_callbacks', None):
+            return self.close(conn)
+
+        self._close_abandoned()
+        now = monotonic()
+        evicted = []
+        with self._lock:
+            self._check_pid()
+            idle = self._idle[(host, port)]
+            for item in list(idle):
+                if now - item[1] > self.max_idle:
+                    idle.remove(item)
+                    evicted.append(item[0])
+            if len(idle) < self.size:
+                idle.append((conn, now))
+            else:
+                evicted.append(conn)
+        for conn in evicted:
+            self.close(conn)
+
+    def close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def abandon(self, conn):
+        """
+        Takes a connection which its user did not release, from a finalizer.
+        A finalizer may run while this thread holds the lock, so the
+        connection is only queued and closed by the next acquire or release.
+        """
+        self._abandoned.append(conn)
+
+    def _close_abandoned(self):
+        while True:
+            try:
+                conn = self._abandoned.popleft()
+            except IndexError:
+                return
+            self.close(conn)
+
+    def clear(self):
+        with self._lock:
+            idle, self._idle = self._idle, defaultdict(list)
+        for items in idle.values():
+            for conn, released_at in items:
+                self.close(conn)
+
+    @contextmanager
+    def connection(self, host, port=RPYC_PORT, timeout=DEFAULT_TIMEOUT):
+        conn = self.acquire(host, port, timeout)
+        try:
+            yield conn
+        except BaseException:
+            self.close(conn)
+            raise
+        else:
+            self.release(host, port, conn)
+
+    def get_system(self, host, port, conn):
+        key = (host, port)
+        if key not in self._systems:
+            self._systems[key] = conn.modules.platform.uname().system
+        return self._systems[key]
+
+
+pool = ConnectionPool()
@@ -0,0 +1,45 @@
+from django.core.files.uploadhandler import (MemoryFileUploadHandler,
+                                             TemporaryFileUploadHandler)
+
+from core.utils.files import MimetypeHead
+from core.utils.hashing import Hasher
+
+
+class HashingUploadHandlerMixin:
+    """
+    Sets the size, mimetype and checksums of an uploaded file as file_info
+    while it is received, so it does not have to be read again for them.
+    """
+
+    def new_file(self, *args, **kwargs):
+        # the memory handler stops the next handlers in new_file
+        self.hasher = Hasher()
+        self.head = MimetypeHead()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        # the memory handler passes large files on without keeping them
+        if getattr(self, 'activated', True):
+            self.head.update(raw_data)
+            self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.file_info = {
+                'size': file_size,
+                'mimetype': self.head.get_mimetype(),
+                **self.hasher.hexdigests()
+            }
+        return file
+
+
+class HashingMemoryFileUploadHandler(HashingUploadHandlerMixin,
+                                     MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(HashingUploadHandlerMixin,
+                                        TemporaryFileUploadHandler):
+    pass
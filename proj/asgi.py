@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'proj.settings')
 
 application = get_asgi_application()
+
+from scans.streams import ProgressStream  # noqa: E402 needs the apps loaded
+
+# progress events are streamed on the event loop instead of holding a worker
+application = ProgressStream(application)
@@ -47,8 +47,113 @@ CELERY_TASK_ACKS_LATE = True
 CELERYD_PREFETCH_MULTIPLIER = 1
 CELERY_TASK_TRACK_STARTED = True
 CELERY_RESULT_SERIALIZER = 'json'
+# tasks are consumed by their priority, 0 is the highest
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'queue_order_strategy': 'priority',
+    'priority_steps': list(range(10)),
+}
 MAX_FILE_SIZE = int(os.environ.setdefault('MAX_FILE_SIZE', '16777216'))
 MAX_VIDEO_SIZE = int(os.environ.get('MAX_VIDEO_SIZE', '400000000'))
+VERDICT_CACHE_TTL = int(os.environ.get('VERDICT_CACHE_TTL', '86400'))
+SCAN_COALESCE_WINDOW = int(os.environ.get('SCAN_COALESCE_WINDOW', '600'))
+# files scanned in one run of engines which support it, 1 disables batches
+SCAN_BATCH_SIZE = int(os.environ.get('SCAN_BATCH_SIZE', '20'))
+# pending scans are performed by the scan_dispatcher command instead of
+# celery, claims of scans which did not start within SCAN_CLAIM_TTL seconds
+# are taken again, started ones are failed past their time limit
+SCAN_DISPATCHER = os.environ.get(
+    'SCAN_DISPATCHER', 'False').lower().capitalize() == 'True'
+SCAN_DISPATCHER_THREADS = int(
+    os.environ.get('SCAN_DISPATCHER_THREADS', '256'))
+SCAN_CLAIM_TTL = int(os.environ.get('SCAN_CLAIM_TTL', '300'))
+# seconds after which a waiting scan task gains one step of priority
+SCAN_PRIORITY_AGING = int(os.environ.get('SCAN_PRIORITY_AGING', '60'))
+# time limits of scans, SCAN_TIMEOUT_FACTOR times the 95th percentile of the
+# scan times of the agent for files alike, or SCAN_TIMEOUT_BASE seconds plus
+# SCAN_TIMEOUT_PER_MB per MB without history, between the min and the max
+SCAN_TIMEOUT_MIN = int(os.environ.get('SCAN_TIMEOUT_MIN', '10'))
+SCAN_TIMEOUT_MAX = int(os.environ.get('SCAN_TIMEOUT_MAX', '3600'))
+SCAN_TIMEOUT_BASE = int(os.environ.get('SCAN_TIMEOUT_BASE', '60'))
+SCAN_TIMEOUT_PER_MB = float(os.environ.get('SCAN_TIMEOUT_PER_MB', '2'))
+SCAN_TIMEOUT_FACTOR = float(os.environ.get('SCAN_TIMEOUT_FACTOR', '3'))
+SCAN_TIMEOUT_HISTORY = int(os.environ.get('SCAN_TIMEOUT_HISTORY', '500'))
+SCAN_TIMEOUT_MIN_SAMPLES = int(
+    os.environ.get('SCAN_TIMEOUT_MIN_SAMPLES', '20'))
+SCAN_TIMEOUT_STATS_TTL = int(os.environ.get('SCAN_TIMEOUT_STATS_TTL', '300'))
+# seconds past the soft limit after which the worker kills the scan
+SCAN_TIMEOUT_GRACE = int(os.environ.get('SCAN_TIMEOUT_GRACE', '30'))
+INGEST_WORKERS = int(os.environ.get('INGEST_WORKERS', '8'))
+INGEST_CHUNK_SIZE = int(os.environ.get('INGEST_CHUNK_SIZE', '200'))
+HASH_CHUNK_SIZE = int(os.environ.get('HASH_CHUNK_SIZE', '4194304'))
+# threads shared by the hashers of a process for the digests of buffers of a
+# MB and above, 0 hashes them on the calling thread
+HASH_WORKERS = int(os.environ.get('HASH_WORKERS', '4'))
+UPLOAD_MAX_CHUNK_SIZE = int(
+    os.environ.get('UPLOAD_MAX_CHUNK_SIZE', '67108864'))
+# seconds the hasher of an upload is kept in a process after its last chunk
+UPLOAD_HASHER_TTL = int(os.environ.get('UPLOAD_HASHER_TTL', '3600'))
+DOWNLOAD_CHUNK_SIZE = int(os.environ.get('DOWNLOAD_CHUNK_SIZE', '1048576'))
+DOWNLOAD_PART_SIZE = int(os.environ.get('DOWNLOAD_PART_SIZE', '8388608'))
+DOWNLOAD_WORKERS = int(os.environ.get('DOWNLOAD_WORKERS', '4'))
+DOWNLOAD_TIMEOUT = int(os.environ.get('DOWNLOAD_TIMEOUT', '30'))
+# urls of a bulk download which are fetched at once
+DOWNLOAD_BULK_CONCURRENCY = int(
+    os.environ.get('DOWNLOAD_BULK_CONCURRENCY', '4'))
+DOWNLOAD_BULK_MAX_URLS = int(os.environ.get('DOWNLOAD_BULK_MAX_URLS', '1000'))
+PROGRESS_FLUSH_INTERVAL = int(os.environ.get('PROGRESS_FLUSH_INTERVAL', '500'))
+PROGRESS_FLUSH_ITEMS = int(os.environ.get('PROGRESS_FLUSH_ITEMS', '50'))
+SESSION_STATE_CACHE_TTL = int(
+    os.environ.get('SESSION_STATE_CACHE_TTL', '300'))
+SESSION_EVENTS_TTL = int(os.environ.get('SESSION_EVENTS_TTL', '3600'))
+# waiting scan tasks are indexed by agent and session for their ETA
+SCAN_QUEUE_INDEX_TTL = int(os.environ.get('SCAN_QUEUE_INDEX_TTL', '86400'))
+# how often a progress stream checks for events, in ms, and the seconds of
+# silence after which it sends a keepalive
+SESSION_EVENTS_INTERVAL = int(os.environ.get('SESSION_EVENTS_INTERVAL', '500'))
+SESSION_EVENTS_KEEPALIVE = int(
+    os.environ.get('SESSION_EVENTS_KEEPALIVE', '15'))
+# budgets of archive extraction per session, 0 disables a budget
+EXTRACT_MAX_SIZE = int(os.environ.get('EXTRACT_MAX_SIZE', '4000000000'))
+EXTRACT_MAX_MEMBERS = int(os.environ.get('EXTRACT_MAX_MEMBERS', '10000'))
+EXTRACT_MAX_RATIO = int(os.environ.get('EXTRACT_MAX_RATIO', '100'))
+EXTRACT_MAX_DEPTH = int(os.environ.get('EXTRACT_MAX_DEPTH', '5'))
+EXTRACT_WORKERS = int(os.environ.get('EXTRACT_WORKERS', '4'))
+# idle rpyc connections kept per host, in seconds how long they are kept
+# and when they are pinged before they are reused
+RPC_POOL_SIZE = int(os.environ.get('RPC_POOL_SIZE', '4'))
+RPC_POOL_MAX_IDLE = int(os.environ.get('RPC_POOL_MAX_IDLE', '300'))
+RPC_POOL_PING_AFTER = int(os.environ.get('RPC_POOL_PING_AFTER', '10'))
+# clamd of the clamd backend, the socket is used for agents without a host
+CLAMD_SOCKET = os.environ.get('CLAMD_SOCKET', '/var/run/clamav/clamd.ctl')
+CLAMD_PORT = int(os.environ.get('CLAMD_PORT', '3310'))
+CLAMD_TIMEOUT = int(os.environ.get('CLAMD_TIMEOUT', '60'))
+# scans are routed to a queue per agent, which every worker consumes
+AGENT_QUEUES = os.environ.get(
+    'AGENT_QUEUES', 'True').lower().capitalize() == 'True'
+# scans running on an agent at once, adjusted between min and max by AIMD
+# from the scan times and errors, a max of 0 disables the limit
+AGENT_CONCURRENCY_MIN = int(os.environ.get('AGENT_CONCURRENCY_MIN', '1'))
+AGENT_CONCURRENCY_MAX = int(os.environ.get('AGENT_CONCURRENCY_MAX', '8'))
+AGENT_CONCURRENCY_INITIAL = int(
+    os.environ.get('AGENT_CONCURRENCY_INITIAL', '2'))
+AGENT_CONCURRENCY_TOLERANCE = float(
+    os.environ.get('AGENT_CONCURRENCY_TOLERANCE', '2'))
+AGENT_CONCURRENCY_SMOOTHING = float(
+    os.environ.get('AGENT_CONCURRENCY_SMOOTHING', '0.2'))
+# a scan waits for a busy agent from the retry seconds, doubled up to the
+# max on every retry, and fails after the max retries
+AGENT_CONCURRENCY_RETRY = int(os.environ.get('AGENT_CONCURRENCY_RETRY', '2'))
+AGENT_CONCURRENCY_RETRY_MAX = int(
+    os.environ.get('AGENT_CONCURRENCY_RETRY_MAX', '60'))
+AGENT_CONCURRENCY_MAX_RETRIES = int(
+    os.environ.get('AGENT_CONCURRENCY_MAX_RETRIES', '30'))
+# slots of tasks without a time limit expire after these seconds
+AGENT_SLOT_TTL = int(os.environ.get('AGENT_SLOT_TTL', '120'))
+# the breaker of an agent opens after failures in a row and lets a trial
+# scan through after the cooldown, scans parked longer than the timeout fail
+AGENT_BREAKER_THRESHOLD = int(os.environ.get('AGENT_BREAKER_THRESHOLD', '3'))
+AGENT_BREAKER_COOLDOWN = int(os.environ.get('AGENT_BREAKER_COOLDOWN', '30'))
+AGENT_PARK_TIMEOUT = int(os.environ.get('AGENT_PARK_TIMEOUT', '600'))
 INTERFACES_PATH = os.environ['INTERFACES_PATH']
 LOG_FILE_PATH = os.environ['LOG_FILE_PATH']
 SYSLOG_FILE_PATH = os.environ.get('SYSLOG_FILE_PATH', 'syslog.log')
@@ -120,6 +225,12 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# uploads are hashed while they are received
+FILE_UPLOAD_HANDLERS = [
+    'core.utils.uploads.HashingMemoryFileUploadHandler',
+    'core.utils.uploads.HashingTemporaryFileUploadHandler',
+]
+
 ROOT_URLCONF = 'proj.urls'
 
 TEMPLATES = [
@@ -168,6 +279,24 @@ CACHES = {
         'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
         'LOCATION': 'cache_captcha',
     },
+    'verdicts': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'cache_verdicts',
+        'TIMEOUT': VERDICT_CACHE_TTL,
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000
+        }
+    },
+    # snapshots of finished sessions, the keys are versioned by the session
+    # row so a per process cache never serves a stale snapshot
+    'state': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'session_state',
+        'TIMEOUT': SESSION_STATE_CACHE_TTL,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000
+        }
+    },
 }
 
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
@@ -3,7 +3,6 @@ import time
 import os
 import importlib
 import libvirt
-import rpyc
 from django.conf import settings
 from django.core.files import File as DjangoFile
 from celery import group
@@ -11,6 +10,7 @@ from celery.result import GroupResult
 import redis
 
 from core.mixins import AsyncMixin
+from core.utils.rpc import pool as rpc_pool
 from scans.models.file import File
 from scans.tasks import scan_path, save_results
 
@@ -166,7 +166,8 @@ class Scanner:
         return self.get_av()
 
     def ping(self):
-        with rpyc.classic.connect(self.host, self.port):
+        with rpc_pool.connection(self.host, self.port) as conn:
+            conn.ping()
             return True
 
 
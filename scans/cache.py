@@ -0,0 +1,28 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+
+VERDICT_FIELDS = ('status_code', 'stdout', 'infected_num', 'threats')
+
+
+def get_verdict_key(sha256, av_name, signature):
+    # The engine signature is part of the key, so a signature update on the
+    # agent makes every older verdict unreachable until it expires.
+    signature = hashlib.md5(signature.encode()).hexdigest()
+    return f'verdict:{av_name}:{sha256}:{signature}'
+
+
+def get_verdict(sha256, av_name, signature):
+    if not (settings.VERDICT_CACHE_TTL and sha256 and signature):
+        return None
+    return caches['verdicts'].get(get_verdict_key(sha256, av_name, signature))
+
+
+def set_verdict(sha256, av_name, signature, **verdict):
+    if not (settings.VERDICT_CACHE_TTL and sha256 and signature):
+        return False
+    verdict = {field: verdict.get(field) for field in VERDICT_FIELDS}
+    caches['verdicts'].set(get_verdict_key(sha256, av_name, signature),
+                           verdict)
+    return True
@@ -0,0 +1,209 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from math import floor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from redis.exceptions import RedisError
+
+from agents.breaker import CircuitBreaker
+from agents.concurrency import ConcurrencyLimiter
+from scans.models.scan import Scan
+from scans.priorities import get_priority_ordering
+from scans.tasks import record_agent_result, run_scan
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class ScanDispatcher:
+    """
+    Performs the pending scans on an event loop instead of celery workers.
+    The calls to the agents wait on a pool of threads, so the scans in
+    flight are bound by the concurrency limits of the agents and not by
+    worker processes. The database is used from one thread, the results
+    are written once every poll interval.
+    """
+
+    def __init__(self, threads=None, timeout=None, poll_interval=1):
+        self.threads = threads or settings.SCAN_DISPATCHER_THREADS
+        # the time limit of every scan by default
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.executor = ThreadPoolExecutor(self.threads)
+        self.db_executor = ThreadPoolExecutor(1)
+        self.in_flight = {}
+        # pks of the scans in flight, they are not claimed again
+        self.running = set()
+        self.results = []
+        self.stopped = False
+
+    async def db(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.db_executor, func, *args)
+
+    async def call(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, func, *args)
+
+    def get_claimable(self):
+        # a started scan is failed by the sweep past its time limit instead
+        expired = timezone.now() - timedelta(seconds=settings.SCAN_CLAIM_TTL)
+        return Q(status_code=None, leader=None, parked=False,
+                 agent__isnull=False) & (
+            Q(claimed_at=None) | Q(claimed_at__lt=expired, expires_at=None))
+
+    def get_limits(self):
+        """ Concurrency limits of the agents which have pending scans """
+        close_old_connections()
+        agent_ids = Scan.objects.filter(self.get_claimable()).order_by(
+            ).values_list('agent_id', flat=True).distinct()
+        limits = {}
+        for agent_id in agent_ids:
+            try:
+                limits[agent_id] = ConcurrencyLimiter(agent_id).get_limit()
+            except RedisError:
+                limits[agent_id] = settings.AGENT_CONCURRENCY_INITIAL
+        return limits
+
+    def claim(self, counts):
+        """ Claims the given number of pending scans of every agent """
+        now = timezone.now()
+        claimable = self.get_claimable()
+        ordering = get_priority_ordering('file__session__source')
+        pk_list = []
+        for agent_id, count in counts.items():
+            pk_list += Scan.objects.filter(claimable, agent_id=agent_id) \
+                .exclude(pk__in=self.running) \
+                .order_by(*ordering, 'pk') \
+                .values_list('pk', flat=True)[:count]
+        Scan.objects.filter(claimable, pk__in=pk_list).update(claimed_at=now)
+        return list(Scan.objects.select_related(
+            'file', 'file__session', 'file__info', 'agent').filter(
+            pk__in=pk_list, claimed_at=now))
+
+    def unclaim(self, instance):
+        Scan.objects.filter(pk=instance.pk).update(claimed_at=None)
+
+    def start(self, instance, timeout):
+        Scan.objects.filter(pk=instance.pk).start(
+            timeout + settings.SCAN_TIMEOUT_GRACE)
+
+    def prepare(self, instance):
+        """
+        Returns the result of a scan which needs no agent, False for a scan
+        which is attached to an in-flight one or parked, or None.
+        """
+        if instance.attach_to_leader():
+            return False
+        if not CircuitBreaker(instance.agent_id).allow():
+            Scan.objects.filter(pk=instance.pk).park()
+            return False
+        if not instance.file.file:
+            return {'status_code': 499,
+                    'error': 'Source file does not exist'}
+        return instance.get_cached_verdict()
+
+    def write(self, results):
+        with transaction.atomic():
+            for instance, result, called in results:
+                instance.complete(**result)
+        for instance, result, called in results:
+            instance.cache_verdict()
+            instance.log()
+            instance.resolve_waiters()
+
+    async def perform(self, instance):
+        limiter = None
+        result = None
+        called = False
+        call = None
+        try:
+            result = await self.db(self.prepare, instance)
+            if result is False:
+                return
+            called = result is None
+            if called:
+                timeout = self.timeout or \
+                    await self.db(instance.get_time_limit)
+                limiter = ConcurrencyLimiter(instance.agent_id)
+                if not await self.call(
+                        limiter.acquire,
+                        timeout + settings.SCAN_TIMEOUT_GRACE):
+                    # another dispatcher or a worker holds the slots
+                    await self.db(self.unclaim, instance)
+                    return
+                await self.db(self.start, instance, timeout)
+                call = asyncio.ensure_future(self.call(run_scan, instance))
+                try:
+                    result = await asyncio.wait_for(asyncio.shield(call),
+                                                    timeout)
+                except asyncio.TimeoutError:
+                    result = {'status_code': 499,
+                              'error': f'Scan timed out after '
+                                       f'{round(timeout, 1)} seconds'}
+                called = result['status_code'] != 404
+            self.results.append((instance, result, called))
+            if call and not call.done():
+                # the thread can not be stopped, the slot of the agent and
+                # the count of its scans in flight are held until it returns
+                await asyncio.wait([call])
+        except Exception as e:
+            logger.exception(f'Dispatching scan ID {instance.pk} failed: {e}')
+        finally:
+            self.in_flight[instance.agent_id] -= 1
+            self.running.discard(instance.pk)
+            if limiter:
+                feedback = result if called and result else {}
+                await self.call(limiter.release, feedback.get('scan_time'),
+                                feedback.get('status_code') == 499)
+                if feedback:
+                    await self.db(record_agent_result,
+                                  CircuitBreaker(instance.agent_id),
+                                  feedback['status_code'])
+
+    async def dispatch(self):
+        """ Claims what the agents can take, returns the started scans """
+        limits = await self.db(self.get_limits)
+        free = self.threads - sum(self.in_flight.values())
+        counts = {}
+        for agent_id, limit in limits.items():
+            count = min(floor(limit) - self.in_flight.get(agent_id, 0), free)
+            if count > 0:
+                counts[agent_id] = count
+                free -= count
+        if not counts:
+            return []
+        tasks = []
+        for instance in await self.db(self.claim, counts):
+            self.in_flight[instance.agent_id] = \
+                self.in_flight.get(instance.agent_id, 0) + 1
+            self.running.add(instance.pk)
+            tasks.append(asyncio.ensure_future(self.perform(instance)))
+        return tasks
+
+    async def flush(self):
+        results, self.results = self.results, []
+        if results:
+            await self.db(self.write, results)
+            logger.info(f'{len(results)} scan results written')
+
+    def stop(self):
+        self.stopped = True
+
+    async def run(self):
+        tasks = set()
+        while not self.stopped:
+            for task in await self.dispatch():
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await self.flush()
+            await asyncio.sleep(self.poll_interval)
+        if tasks:
+            await asyncio.wait(tasks)
+        await self.flush()
+        self.executor.shutdown(wait=False)
+        self.db_executor.shutdown()
@@ -0,0 +1,55 @@
+import json
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from redis.exceptions import RedisError
+
+from core.utils.broker import get_redis
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def get_events_key(session_id):
+    return f'session_events:{session_id}'
+
+
+def publish_progress(session_id, **fields):
+    """
+    Merges the changed progress fields of a session into its snapshot on
+    redis, bumps its version and publishes the delta to the listeners.
+    """
+    if not settings.SESSION_EVENTS_TTL:
+        return None
+    key = get_events_key(session_id)
+    try:
+        connection = get_redis()
+        with connection.pipeline() as pipe:
+            pipe.hincrby(key, 'version', 1)
+            if fields:
+                pipe.hset(key, mapping={field: json.dumps(value)
+                                        for field, value in fields.items()})
+            pipe.expire(key, settings.SESSION_EVENTS_TTL)
+            version = pipe.execute()[0]
+        connection.publish(key, json.dumps({'version': version, **fields}))
+    except RedisError as e:
+        logger.warning(f'Progress of session {session_id} is not '
+                       f'published: {e}')
+        return None
+    return version
+
+
+def publish_progress_on_commit(session_id, **fields):
+    transaction.on_commit(partial(publish_progress, session_id, **fields))
+
+
+def get_progress(session_id):
+    snapshot = get_redis().hgetall(get_events_key(session_id))
+    if not snapshot:
+        return None
+    version = int(snapshot.pop(b'version'))
+    return {'version': version,
+            **{field.decode(): json.loads(value)
+               for field, value in snapshot.items()}}
+
@@ -12,3 +12,11 @@ class InvalidPostScanOperation(PostScanOperationError):
 
 class PostScanOperationFailed(PostScanOperationError):
     pass
+
+
+class UploadError(Exception):
+    pass
+
+
+class UploadConflict(UploadError):
+    pass
@@ -0,0 +1,36 @@
+import asyncio
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from scans.dispatcher import ScanDispatcher
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Performs the pending scans, with SCAN_DISPATCHER enabled'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int,
+                            default=settings.SCAN_DISPATCHER_THREADS)
+        parser.add_argument('--poll-interval', type=float, default=1)
+
+    def handle(self, *args, **options):
+        if not settings.SCAN_DISPATCHER:
+            logger.warning('SCAN_DISPATCHER is disabled, the scans are '
+                           'performed by celery as well')
+        dispatcher = ScanDispatcher(threads=options['threads'],
+                                    poll_interval=options['poll_interval'])
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(sig, dispatcher.stop)
+            await dispatcher.run()
+
+        logger.info('Scan dispatcher started ...')
+        asyncio.run(run())
+        logger.info('Scan dispatcher stopped')
@@ -0,0 +1,19 @@
+# Generated by Django 3.2 on 2026-10-18 20:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scans', '0002_auto_20220212_1725'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scan',
+            name='leader',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='waiters', to='scans.scan'),
+        ),
+    ]
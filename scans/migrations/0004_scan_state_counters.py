@@ -0,0 +1,135 @@
+# Generated by Django 3.2 on 2026-10-18 20:34
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count(queryset, group_by, **filters):
+    queryset = queryset.filter(**filters).order_by().values(group_by)
+    return Coalesce(Subquery(
+        queryset.annotate(count=Count('pk')).values('count'),
+        output_field=IntegerField()
+    ), 0)
+
+
+def backfill_counters(apps, schema_editor):
+    File = apps.get_model('scans', 'File')
+    Scan = apps.get_model('scans', 'Scan')
+    Session = apps.get_model('scans', 'Session')
+
+    scans = Scan.objects.filter(file=OuterRef('pk'))
+    File.objects.filter(pk__in=Scan.objects.values('file')).update(
+        scans_total=count(scans, 'file'),
+        scans_completed=count(scans, 'file', status_code__isnull=False),
+        scans_infected=count(scans, 'file', status_code__isnull=False,
+                             infected_num__gt=0),
+        scans_errored=count(scans, 'file', status_code__isnull=False,
+                            infected_num__isnull=True)
+    )
+
+    # children reference their own table, which MySQL can not update from
+    # a subquery, so the archives are counted one by one
+    parents = File.objects.filter(children__isnull=False).values_list(
+        'pk', flat=True).distinct()
+    for pk in list(parents):
+        completed = Q(progress=100)
+        File.objects.filter(pk=pk).update(**File.objects.filter(
+            parent_id=pk, valid=True).aggregate(
+            children_total=Count('pk'),
+            children_completed=Count('pk', filter=completed),
+            children_infected=Count('pk', filter=completed & Q(infected=True)),
+            children_unknown=Count('pk', filter=completed & Q(
+                infected__isnull=True))
+        ))
+
+    files = File.objects.filter(session=OuterRef('pk'), parent=None,
+                                valid=True)
+    Session.objects.update(
+        files_total=count(files, 'session'),
+        files_completed=count(files, 'session', progress=100),
+        files_infected=count(files, 'session', progress=100, infected=True),
+        files_unknown=count(files, 'session', progress=100,
+                            infected__isnull=True)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scans', '0003_scan_leader'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='file',
+            name='children_completed',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='children_infected',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='children_total',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='children_unknown',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='scans_completed',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='scans_errored',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='scans_infected',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='scans_total',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='session',
+            name='files_completed',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='session',
+            name='files_infected',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='session',
+            name='files_total',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='session',
+            name='files_unknown',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='session',
+            name='counter',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='session',
+            name='total',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2 on 2026-10-18 20:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scans', '0004_scan_state_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='extracted_members',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='session',
+            name='extracted_size',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+    ]
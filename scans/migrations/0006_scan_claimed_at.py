@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 21:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scans', '0005_session_extraction_budget'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scan',
+            name='claimed_at',
+            field=models.DateTimeField(db_index=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 21:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scans', '0006_scan_claimed_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scan',
+            name='parked',
+            field=models.BooleanField(db_index=True, default=False, editable=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 21:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scans', '0007_scan_parked'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='session',
+            name='source',
+            field=models.CharField(blank=True, choices=[('upload', 'Upload'), ('url', 'URL'), ('disk', 'Disk'), ('email', 'Email'), ('rescan', 'Rescan')], max_length=32, null=True),
+        ),
+    ]
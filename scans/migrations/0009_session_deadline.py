@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 21:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scans', '0008_session_source_rescan'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='deadline',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+    ]
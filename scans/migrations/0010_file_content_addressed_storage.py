@@ -0,0 +1,20 @@
+# Generated by Django 3.2 on 2026-10-18 21:46
+
+from django.db import migrations, models
+import scans.models.file
+import scans.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scans', '0009_session_deadline'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='file',
+            name='file',
+            field=models.FileField(max_length=1024, null=True, storage=scans.storage.ContentAddressedStorage(), upload_to=scans.models.file.get_file_upload_path),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.2 on 2026-10-18 21:50
+
+import core.models.mixins
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('scans', '0010_file_content_addressed_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Upload',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=256)),
+                ('size', models.BigIntegerField()),
+                ('received', models.BigIntegerField(default=0, editable=False)),
+                ('chunks', models.PositiveIntegerField(default=0, editable=False)),
+                ('mimetype', models.CharField(editable=False, max_length=256)),
+                ('file', models.OneToOneField(editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload', to='scans.file')),
+                ('user', models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='uploads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'default_permissions': [],
+            },
+            bases=(models.Model, core.models.mixins.UpdateModelMixin),
+        ),
+    ]
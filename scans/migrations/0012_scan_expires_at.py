@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 22:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scans', '0011_upload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scan',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True, editable=False, null=True),
+        ),
+    ]
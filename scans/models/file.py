@@ -1,8 +1,11 @@
 import os
+from collections import Counter
 from datetime import timedelta
+from itertools import islice
 
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models import F
 from django.utils.translation import ugettext_lazy as _
 from django.db.models.signals import post_delete
 from django.dispatch import receiver
@@ -12,11 +15,12 @@ from django.db import transaction
 from core.models.mixins import DateMixin, UpdateModelMixin
 from core.models.system import System
 from core.mixins import AsyncMixin
-from scans.tasks import extract_file, scan_file, \
-    set_file_info, bulk_create_from_disk, \
-    create_from_url, create_from_path
+from scans.tasks import extract_file, scan_file, scan_files, \
+    set_file_info, bulk_create_from_disk, expire_session, \
+    create_from_url, create_from_urls, create_from_path
 from scans.exceptions import InvalidPostScanOperation
 from scans.models.session import Session
+from scans.storage import ContentAddressedStorage
 from core.fields import SafeCharField
 from core.utils.files import is_archive_file
 
@@ -57,8 +61,17 @@ def get_file_upload_path(instance, filename):
     return os.path.join("files/%s" % folder_name, filename)
 
 
-class FileQuerySet(models.QuerySet):
-    pass
+class FileQuerySet(models.QuerySet, AsyncMixin):
+
+    def scan(self, session_id, extract=False, agents=None):
+        agent_pks = agents and [agent.pk for agent in agents]
+        pk_list = list(self.values_list('pk', flat=True))
+        self.perform_async(
+            scan_files.si(pk_list, extract=extract, agent_pks=agent_pks),
+            session_id=session_id,
+            priority=Session.objects.get(pk=session_id).get_priority()
+        )
+        return pk_list
 
 
 class FileManager(models.Manager, AsyncMixin):
@@ -72,21 +85,50 @@ class FileManager(models.Manager, AsyncMixin):
             created_at__lt=timezone.now() - timedelta(days=days_older_than),
             deleted=False)
 
-        for instance in older_files:
-            instance.file.delete(save=False)
-            self.model.objects.filter(pk=instance.pk).update(deleted=True)
-
-        return older_files.count()
+        names = list(older_files.exclude(file='').exclude(file=None)
+                     .values_list('file', flat=True))
+        count = older_files.update(deleted=True)
+        self.delete_unreferenced(names)
+
+        return count
+
+    def delete_unreferenced(self, names, batch_size=500):
+        """
+        Deletes the stored files of names which no file that is not deleted
+        refers to any more.
+        """
+        storage = self.model._meta.get_field('file').storage
+        names = iter(set(names))
+        while True:
+            batch = set(islice(names, batch_size))
+            if not batch:
+                break
+            referenced = set(self.get_queryset().filter(
+                file__in=batch, deleted=False).values_list('file', flat=True))
+            for name in batch - referenced:
+                storage.delete(name)
 
     def bulk_create_from_disk(self, paths, scan=False, extract=False,
-                              agents=None, owner=None, _async=True):
+                              agents=None, owner=None, _async=True,
+                              time_budget=None):
+        """
+        With a time budget in seconds the riskiest files are scanned first,
+        the files which are not scanned within it are reported as unscanned.
+        """
         if agents:
             agent_pks = [agent.pk for agent in agents]
         else:
             agent_pks = None
 
         owner_id = owner.pk if owner else None
-        session = Session.objects.create(source='disk')
+        deadline = time_budget and timezone.now() + timedelta(
+            seconds=time_budget)
+        session = Session.objects.create(source='disk', deadline=deadline)
+        if time_budget:
+            # ahead of the scans it expires
+            self.perform_async(expire_session.si(session.pk),
+                               countdown=time_budget, session_id=session.pk,
+                               priority=0)
 
         if _async:
             self.perform_async(
@@ -94,7 +136,8 @@ class FileManager(models.Manager, AsyncMixin):
                                          extract=extract,
                                          agent_pks=agent_pks,
                                          owner_id=owner_id),
-                session_id=session.pk
+                session_id=session.pk,
+                priority=session.get_priority()
             )
             return session
             # app.control.add_consumer(queue=session_id, reply=True)
@@ -120,7 +163,8 @@ class FileManager(models.Manager, AsyncMixin):
                 create_from_url.si(session.pk, url, save_as=save_as, scan=scan,
                                    extract=extract,
                                    agent_pks=agent_pks, owner_id=owner_id),
-                session_id=session.pk
+                session_id=session.pk,
+                priority=session.get_priority()
             )
             # app.control.add_consumer(queue=session_id, reply=True)
             return session
@@ -129,6 +173,28 @@ class FileManager(models.Manager, AsyncMixin):
                                    extract=extract,
                                    agent_pks=agent_pks, owner_id=owner_id)
 
+    def create_from_urls(self, urls, scan=False, extract=False, agents=None,
+                         owner=None, concurrency=None, _async=True):
+        agent_pks = agents and [agent.pk for agent in agents]
+        owner_id = owner.pk if owner else None
+        session = Session.objects.create(source='url')
+
+        if _async:
+            self.perform_async(
+                create_from_urls.si(session.pk, urls, scan=scan,
+                                    extract=extract, agent_pks=agent_pks,
+                                    owner_id=owner_id,
+                                    concurrency=concurrency),
+                session_id=session.pk,
+                priority=session.get_priority()
+            )
+            return session
+        else:
+            return create_from_urls(session.pk, urls, scan=scan,
+                                    extract=extract, agent_pks=agent_pks,
+                                    owner_id=owner_id,
+                                    concurrency=concurrency)
+
     def create_from_path(self, path, scan=False, extract=False, agents=None,
                          owner=None, _async=False):
         if agents:
@@ -144,7 +210,8 @@ class FileManager(models.Manager, AsyncMixin):
                 create_from_path.si(session.pk, path, scan=scan,
                                     extract=extract,
                                     agent_pks=agent_pks, owner_id=owner_id),
-                session_id=session.pk
+                session_id=session.pk,
+                priority=session.get_priority()
             )
             # app.control.add_consumer(queue=session_id, reply=True)
             return session
@@ -173,7 +240,7 @@ class BaseFile(AbstractFile, DateMixin):
 
 class File(BaseFile, UpdateModelMixin, AsyncMixin):
     file = models.FileField(max_length=1024, upload_to=get_file_upload_path,
-                            null=True)
+                            storage=ContentAddressedStorage(), null=True)
     info = models.ForeignKey(FileInfo, related_name='files',
                              on_delete=models.CASCADE, null=True,
                              editable=False)
@@ -194,6 +261,23 @@ class File(BaseFile, UpdateModelMixin, AsyncMixin):
     progress = models.FloatField(null=True, db_index=True, editable=False)
     infected = models.BooleanField(null=True, db_index=True, editable=False)
 
+    # denormalized counters which the scan state is evaluated from
+    scans_total = models.PositiveIntegerField(default=0, editable=False)
+    scans_completed = models.PositiveIntegerField(default=0, editable=False)
+    scans_infected = models.PositiveIntegerField(default=0, editable=False)
+    scans_errored = models.PositiveIntegerField(default=0, editable=False)
+    children_total = models.PositiveIntegerField(default=0, editable=False)
+    children_completed = models.PositiveIntegerField(default=0,
+                                                     editable=False)
+    children_infected = models.PositiveIntegerField(default=0,
+                                                    editable=False)
+    children_unknown = models.PositiveIntegerField(default=0, editable=False)
+
+    SCAN_STATE_FIELDS = ('progress', 'infected', 'scans_total',
+                         'scans_completed', 'scans_infected', 'scans_errored',
+                         'children_total', 'children_completed',
+                         'children_infected', 'children_unknown')
+
     objects = FileManager()
 
     class Meta:
@@ -212,11 +296,18 @@ class File(BaseFile, UpdateModelMixin, AsyncMixin):
         if _async:
             self.perform_async(
                 set_file_info.si(self.pk),
-                session_id=self.session.pk
+                session_id=self.session.pk,
+                priority=self.session.get_priority()
             )
         else:
             return set_file_info(self.pk)
 
+    def get_sha256(self):
+        if not self.info.sha256:
+            self.set_file_info(_async=False)
+            self.info.refresh_from_db()
+        return self.info.sha256
+
     def extract(self, _async=True):
         if not is_archive_file(self.file.path):
             return False
@@ -229,7 +320,8 @@ class File(BaseFile, UpdateModelMixin, AsyncMixin):
         if _async:
             self.perform_async(
                 extract_file.si(self.pk),
-                session_id=self.session.pk
+                session_id=self.session.pk,
+                priority=self.session.get_priority()
             )
         else:
             return extract_file(self.pk)
@@ -240,70 +332,181 @@ class File(BaseFile, UpdateModelMixin, AsyncMixin):
             self.perform_async(
                 scan_file.si(self.pk, _async=_async, extract=extract,
                              agent_pks=agent_pks),
-                session_id=self.session.pk
+                session_id=self.session.pk,
+                priority=self.session.get_priority()
             )
         else:
             return scan_file(self.pk, _async=_async, extract=extract,
                              agent_pks=agent_pks)
 
+    @staticmethod
+    def track_created(instances):
+        """
+        Counts newly created valid files on their parent archive, or on their
+        session if they are top level files.
+        """
+        sessions, parents = {}, Counter()
+        for instance in instances:
+            if not instance.valid:
+                continue
+            if instance.parent_id:
+                parents[instance.parent_id] += 1
+            else:
+                session, count = sessions.get(instance.session_id,
+                                              (instance.session, 0))
+                sessions[instance.session_id] = session, count + 1
+
+        for pk, count in parents.items():
+            File.objects.filter(pk=pk).update(
+                children_total=F('children_total') + count)
+        for session, count in sessions.values():
+            session.update_progress(files_total=count)
+
+    def reset_scan_state(self):
+        for field in self.SCAN_STATE_FIELDS:
+            setattr(self, field, self._meta.get_field(field).get_default())
+
     def eval_infected(self, clean_acceptance_index, valid_acceptance_index):
-        total_scans = self.scans.count()
-        if total_scans:
-            if self.scans.filter(
-                    status_code=None).exists() or self.scans.filter(
-                infected_num__isnull=True).count() >= (
-                    1 - valid_acceptance_index) * total_scans:
-                return None
-            elif self.scans.filter(infected_num__gt=0).count() >= (
-                    1 - clean_acceptance_index) * total_scans:
-                return True
+        total_scans = self.scans_total
+        if not total_scans or self.scans_completed < total_scans:
+            return None
+        elif self.scans_errored >= (1 - valid_acceptance_index) * total_scans:
+            return None
+        elif self.scans_infected >= (
+                1 - clean_acceptance_index) * total_scans:
+            return True
+        else:
+            return False
+
+    def eval_decided(self, clean_acceptance_index, valid_acceptance_index):
+        """
+        Whether the verdict of eval_infected is certain before the last scans
+        are completed, whatever they report.
+        """
+        total_scans = self.scans_total
+        remaining = total_scans - self.scans_completed
+        errors_limit = (1 - valid_acceptance_index) * total_scans
+        infections_limit = (1 - clean_acceptance_index) * total_scans
+        if self.scans_errored >= errors_limit:
+            return True
+        elif self.scans_errored + remaining >= errors_limit:
+            return False
+        return self.scans_infected >= infections_limit or \
+            self.scans_infected + remaining < infections_limit
+
+    def eval_scan_state(self):
+        if self.children_total:
+            progress = round(
+                100 * self.children_completed / self.children_total, 1)
+            if self.children_infected:
+                infected = True
+            elif self.children_unknown or \
+                    self.children_completed < self.children_total:
+                infected = None
             else:
-                return False
+                infected = False
+            return progress, infected
+        elif self.scans_total:
+            _settings = System.get_settings()
+            progress = round(100 * self.scans_completed / self.scans_total, 1)
+            return progress, self.eval_infected(
+                _settings['clean_acceptance_index'],
+                _settings['valid_acceptance_index'])
         else:
-            return None
+            return self.progress, None
 
     def update_scan_state(self):
-        _settings = System.get_settings()
-        clean_acceptance_index = _settings['clean_acceptance_index']
-        valid_acceptance_index = _settings['valid_acceptance_index']
         with transaction.atomic():
             obj = File.objects.select_for_update().filter(pk=self.pk).get()
-            if obj.children.exists():
-                total_children = obj.children.filter(valid=True).count(
-                )
-                total_children_scanned = obj.children.filter(
-                    progress=100).count()
-                obj.progress = round(100 * total_children_scanned / total_children, 1)
-
-                for child in obj.children.all():
-                    infected = child.eval_infected(clean_acceptance_index,
-                                                   valid_acceptance_index)
-                    if infected or infected is None:
-                        obj.infected = infected
-                        break
-                    else:
-                        obj.infected = False
-            else:
-                total_scans = obj.scans.count()
-                if total_scans:
-                    obj.progress = round(100 * obj.scans.exclude(
-                        status_code=None).count() / total_scans, 1)
-
-                    if obj.scans.filter(status_code=None).exists():
-                        obj.infected = None
-                    elif obj.scans.filter(
-                            infected_num__isnull=True).count() >= (
-                            1 - valid_acceptance_index) * total_scans:
-                        obj.infected = None
-                    elif obj.scans.filter(infected_num__gt=0).count() >= (
-                            1 - clean_acceptance_index) * total_scans:
-                        obj.infected = True
-                    else:
-                        obj.infected = False
-
-                else:
-                    obj.infected = None
-            obj.save()
+            obj.progress, obj.infected = obj.eval_scan_state()
+            File.objects.filter(pk=self.pk).update(
+                progress=obj.progress, infected=obj.infected,
+                modified_at=timezone.now())
+        return obj
+
+    def add_scan_result(self, infected_num):
+        """
+        Counts a finished scan of this file, the verdict is propagated to the
+        parent archive or the session once the last scan is counted.
+        """
+        infected = infected_num is not None and infected_num > 0
+        with transaction.atomic():
+            File.objects.filter(pk=self.pk).update(
+                scans_completed=F('scans_completed') + 1,
+                scans_infected=F('scans_infected') + int(infected),
+                scans_errored=F('scans_errored') + int(infected_num is None)
+            )
+            obj = self.update_scan_state()
+            if obj.scans_completed < obj.scans_total:
+                _settings = System.get_settings()
+                if _settings.get('early_decision') and obj.eval_decided(
+                        _settings['clean_acceptance_index'],
+                        _settings['valid_acceptance_index']):
+                    obj = obj.skip_pending_scans()
+            if obj.scans_completed == obj.scans_total:
+                obj.propagate_scan_state()
+        return obj
+
+    def skip_pending_scans(self):
+        """
+        Completes the pending scans of a file whose verdict is decided with
+        status 410, they count neither as infected nor as errored so the
+        verdict stays the same. Their queued tasks are revoked.
+        """
+        from scans.models.scan import Scan
+
+        with transaction.atomic():
+            pending = Scan.objects.filter(file=self, status_code=None)
+            scans = list(pending.select_for_update())
+            skipped = pending.filter(pk__in=[scan.pk for scan in scans]) \
+                .update(status_code=410, parked=False,
+                        error='Verdict decided by other agents',
+                        modified_at=timezone.now())
+            File.objects.filter(pk=self.pk).update(
+                scans_completed=F('scans_completed') + skipped)
+            obj = self.update_scan_state()
+        Scan.revoke(scans)
+        Scan.objects.filter(pk__in=[scan.pk for scan in scans]) \
+            .release_waiters()
+        return obj
+
+    def add_child_result(self, infected):
+        with transaction.atomic():
+            File.objects.filter(pk=self.pk).update(
+                children_completed=F('children_completed') + 1,
+                children_infected=F('children_infected') + int(
+                    infected is True),
+                children_unknown=F('children_unknown') + int(infected is None)
+            )
+            obj = self.update_scan_state()
+            if obj.children_completed == obj.children_total:
+                obj.propagate_scan_state()
+        return obj
+
+    def mark_scanned(self, **values):
+        """
+        Completes a file which has nothing to be scanned with.
+        """
+        with transaction.atomic():
+            updated = File.objects.filter(pk=self.pk).exclude(
+                progress=100).update(progress=100, **values)
+            if updated:
+                self.refresh_from_db()
+                self.propagate_scan_state()
+        return bool(updated)
+
+    def propagate_scan_state(self):
+        # only valid files are counted by track_created
+        if not self.valid:
+            return
+        if self.parent_id:
+            self.parent.add_child_result(self.infected)
+        else:
+            self.session.update_progress(
+                files_completed=1,
+                files_infected=int(self.infected is True),
+                files_unknown=int(self.infected is None)
+            )
 
     def postscan_valid(self, raise_exception=True):
         is_valid = self.progress == 100 and self.infected is False
@@ -318,7 +521,8 @@ class File(BaseFile, UpdateModelMixin, AsyncMixin):
 
 @receiver(post_delete, sender=File)
 def post_delete_file(sender, instance, *args, **kwargs):
-    instance.file.delete(save=False)
+    if instance.file:
+        File.objects.delete_unreferenced([instance.file.name])
 
 
 # @receiver(post_save, sender=File)
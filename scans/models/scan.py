@@ -1,14 +1,24 @@
-from django.db import models
+from datetime import timedelta
+
+from celery import current_app
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Q
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
+from redis.exceptions import RedisError
 import os
 
 from core.models.mixins import DateMixin, UpdateModelMixin
 from core.mixins import AsyncMixin
 from core.fields import SafeCharField
 
+from agents.breaker import OPEN, CircuitBreaker
 from agents.models import Agent
-from scans.tasks import perform_scan, scan_report
+from scans.tasks import perform_scan, perform_scan_batch, scan_report
 from scans.models.file import File
+from scans.cache import VERDICT_FIELDS, get_verdict, set_verdict
+from scans.timeouts import get_time_limit
 
 import logging
 logger = logging.getLogger(__name__)
@@ -41,6 +51,70 @@ class ScanQuerySet(models.QuerySet, AsyncMixin):
 
         return obj
 
+    def release_waiters(self):
+        pk_list = list(Scan.objects.filter(
+            leader__in=self, status_code=None).values_list('pk', flat=True))
+        Scan.objects.filter(pk__in=pk_list).update(leader=None)
+        for waiter in Scan.objects.filter(pk__in=pk_list).select_related(
+                'file__session', 'agent'):
+            waiter.perform(coalesce=False)
+        return pk_list
+
+    def park(self):
+        """ Holds back pending scans until their agent recovers """
+        return self.filter(status_code=None).update(
+            parked=True, modified_at=timezone.now())
+
+    def resume_parked(self):
+        pk_list = list(self.filter(parked=True, status_code=None)
+                       .values_list('pk', flat=True))
+        Scan.objects.filter(pk__in=pk_list).update(parked=False)
+        Scan.perform_many(list(Scan.objects.filter(
+            pk__in=pk_list).select_related('file__session', 'agent')))
+        return pk_list
+
+    def start(self, seconds):
+        """ Marks pending scans as started by a run killed after seconds """
+        return self.filter(status_code=None).update(
+            expires_at=timezone.now() + timedelta(seconds=seconds))
+
+    def fail_expired(self):
+        """
+        Fails the scans which are still pending past the hard time limit of
+        the run which started them, its worker was killed before it could
+        store a result. Waiters of leaders which stored a result but died
+        before resolving them are dispatched again.
+        """
+        now = timezone.now()
+        scans = self.filter(status_code=None,
+                            expires_at__lt=now).select_related(
+            'file', 'file__info', 'file__session', 'agent')
+        failed = []
+        for scan in scans:
+            if scan.complete(status_code=499,
+                             error='Scan was killed after its time limit'):
+                scan.log()
+                scan.resolve_waiters()
+                failed.append(scan.pk)
+
+        resolved_before = now - timedelta(seconds=settings.SCAN_TIMEOUT_GRACE)
+        self.filter(status_code__isnull=False,
+                    modified_at__lt=resolved_before,
+                    waiters__status_code=None).distinct().release_waiters()
+        return failed
+
+    def fail_parked(self, error):
+        """ Fails the scans parked for longer than AGENT_PARK_TIMEOUT """
+        expired = timezone.now() - timedelta(
+            seconds=settings.AGENT_PARK_TIMEOUT)
+        scans = self.filter(parked=True, status_code=None,
+                            modified_at__lt=expired).select_related(
+            'file', 'file__info', 'file__session', 'agent')
+        for scan in scans:
+            if scan.complete(status_code=499, error=error, parked=False):
+                scan.log()
+                scan.resolve_waiters()
+
 
 class ScanManager(models.Manager):
     def get_queryset(self):
@@ -54,6 +128,19 @@ class Scan(BaseScan, UpdateModelMixin, AsyncMixin):
                               null=True)
     file = models.ForeignKey(File, on_delete=models.CASCADE,
                              related_name='scans')
+    leader = models.ForeignKey('self', related_name='waiters',
+                               editable=False, on_delete=models.SET_NULL,
+                               null=True)
+    # when the scan dispatcher took the scan
+    claimed_at = models.DateTimeField(null=True, editable=False,
+                                      db_index=True)
+    # held back while the circuit breaker of the agent is open
+    parked = models.BooleanField(default=False, editable=False,
+                                 db_index=True)
+    # when the scan is past the hard time limit of the run which started it,
+    # a scan still pending then was killed with its worker
+    expires_at = models.DateTimeField(null=True, editable=False,
+                                      db_index=True)
 
     objects = ScanManager()
 
@@ -68,14 +155,192 @@ class Scan(BaseScan, UpdateModelMixin, AsyncMixin):
             ('view_performance', 'Can view performance of an agent')
         ]
 
-    def perform(self, _async=True):
+    def get_queue_name(self):
+        if settings.AGENT_QUEUES and self.agent_id:
+            return self.agent.queue_name
+        return None
+
+    def get_time_limit(self):
+        info = self.file.info
+        size = info and info.size
+        if size is None and self.file.file:
+            try:
+                size = self.file.file.size
+            except OSError:
+                size = None
+        return get_time_limit(self.agent_id, size, info and info.mimetype)
+
+    def get_task_id(self):
+        # known without storing it, so pending scans can be revoked
+        return f'perform_scan.{self.pk}'
+
+    @staticmethod
+    def revoke(scans):
+        """ Revokes the queued perform_scan tasks of the scans """
+        task_ids = [scan.get_task_id() for scan in scans]
+        if not task_ids:
+            return
+
+        def revoke_tasks():
+            try:
+                current_app.control.revoke(task_ids)
+            except RedisError as e:
+                logger.warning(f'Scan tasks are not revoked: {e}')
+        transaction.on_commit(revoke_tasks)
+
+    def perform(self, _async=True, coalesce=True):
+        if _async and settings.SCAN_DISPATCHER:
+            # pending scans are taken by the scan_dispatcher command
+            return None
         if _async:
+            time_limit = self.get_time_limit()
             self.perform_async(
-                perform_scan.si(self.pk),
-                session_id=self.file.session.pk
+                perform_scan.si(self.pk, coalesce=coalesce),
+                session_id=self.file.session.pk,
+                agent_id=self.agent_id,
+                queue=self.get_queue_name(),
+                task_id=self.get_task_id(),
+                priority=self.file.session.get_priority(),
+                soft_time_limit=time_limit,
+                time_limit=time_limit + settings.SCAN_TIMEOUT_GRACE
             )
         else:
-            return perform_scan(self.pk)
+            return perform_scan(self.pk, coalesce=coalesce)
+
+    @staticmethod
+    def perform_many(scans, _async=True):
+        """
+        Performs the scans of agents whose engine scans many files in one
+        run in batches of SCAN_BATCH_SIZE, the others one by one.
+        """
+        if _async and settings.SCAN_DISPATCHER:
+            return
+        if _async:
+            agent_ids = {scan.agent_id for scan in scans if scan.agent_id}
+            open_ids = {agent_id for agent_id in agent_ids
+                        if CircuitBreaker(agent_id).get_state() == OPEN}
+            if open_ids:
+                Scan.objects.filter(
+                    pk__in=[scan.pk for scan in scans
+                            if scan.agent_id in open_ids]).park()
+                scans = [scan for scan in scans
+                         if scan.agent_id not in open_ids]
+
+        batches = {}
+        for scan in scans:
+            if settings.SCAN_BATCH_SIZE > 1 and scan.agent_id and \
+                    scan.agent.supports_batch:
+                batches.setdefault(scan.agent_id, []).append(scan)
+            else:
+                scan.perform(_async=_async)
+
+        for agent_scans in batches.values():
+            for i in range(0, len(agent_scans), settings.SCAN_BATCH_SIZE):
+                batch = agent_scans[i:i + settings.SCAN_BATCH_SIZE]
+                if len(batch) == 1:
+                    batch[0].perform(_async=_async)
+                elif _async:
+                    time_limit = sum(scan.get_time_limit() for scan in batch)
+                    batch[0].perform_async(
+                        perform_scan_batch.si([scan.pk for scan in batch]),
+                        session_id=batch[0].file.session.pk,
+                        agent_id=batch[0].agent_id,
+                        queue=batch[0].get_queue_name(),
+                        priority=batch[0].file.session.get_priority(),
+                        soft_time_limit=time_limit,
+                        time_limit=time_limit + settings.SCAN_TIMEOUT_GRACE
+                    )
+                else:
+                    perform_scan_batch([scan.pk for scan in batch])
+
+    def attach_to_leader(self):
+        """
+        Attaches this scan as a waiter of an earlier in-flight scan of the
+        same content on the same agent, one which a worker started and is
+        within its time limit or which the dispatcher claimed recently.
+        Returns True if attached.
+        """
+        if not (settings.SCAN_COALESCE_WINDOW and self.agent_id and
+                self.file.file):
+            return False
+        sha256 = self.file.get_sha256()
+        if not sha256:
+            return False
+
+        now = timezone.now()
+        since = now - timedelta(seconds=settings.SCAN_COALESCE_WINDOW)
+        claimed_since = now - timedelta(seconds=settings.SCAN_CLAIM_TTL)
+        leader_pk = Scan.objects.filter(
+            Q(expires_at__gt=now) | Q(claimed_at__gte=claimed_since),
+            agent_id=self.agent_id, file__info__sha256=sha256,
+            status_code=None, leader=None, pk__lt=self.pk,
+            created_at__gte=since
+        ).order_by('pk').values_list('pk', flat=True).first()
+        if not leader_pk:
+            return False
+
+        # Locking the leader row orders this against resolve_waiters, so
+        # a waiter either attaches before the result lands or not at all.
+        with transaction.atomic():
+            leader = Scan.objects.select_for_update().filter(
+                pk=leader_pk, status_code=None).first()
+            if not leader:
+                return False
+            Scan.objects.filter(pk=self.pk).update(leader=leader)
+            self.leader = leader
+        return True
+
+    def complete(self, **result):
+        """
+        Stores the result of a pending scan and counts it on its file. A scan
+        which already has a result is left as it is, so every scan is counted
+        once. Returns True if the result was stored.
+        """
+        with transaction.atomic():
+            updated = Scan.objects.filter(pk=self.pk, status_code=None).update(
+                modified_at=timezone.now(), **result)
+            if not updated:
+                return False
+            for field, value in result.items():
+                setattr(self, field, value)
+            self.file.add_scan_result(self.infected_num)
+        return True
+
+    def resolve_waiters(self):
+        """
+        Completes the waiters with the verdict of this scan. Without one,
+        e.g. a timeout or a missing file of another session, they are
+        dispatched again.
+        """
+        if self.status_code != 200:
+            return Scan.objects.filter(pk=self.pk).release_waiters()
+
+        result = {field: getattr(self, field)
+                  for field in VERDICT_FIELDS + ('error',)}
+        with transaction.atomic():
+            Scan.objects.select_for_update().get(pk=self.pk)
+            pk_list = list(self.waiters.filter(
+                status_code=None).values_list('pk', flat=True))
+
+        for waiter in Scan.objects.filter(pk__in=pk_list).select_related(
+                'file', 'file__info', 'file__session'):
+            if waiter.complete(**result):
+                waiter.log()
+        return pk_list
+
+    def get_cached_verdict(self):
+        if not (settings.VERDICT_CACHE_TTL and self.agent and
+                self.agent.signature):
+            return None
+        return get_verdict(self.file.get_sha256(), self.av_name,
+                           self.agent.signature)
+
+    def cache_verdict(self):
+        if self.status_code != 200 or not self.agent:
+            return False
+        verdict = {field: getattr(self, field) for field in VERDICT_FIELDS}
+        return set_verdict(self.file.info.sha256, self.av_name,
+                           self.agent.signature, **verdict)
 
     def log(self):
         data = {
@@ -1,11 +1,16 @@
 import os
+import hashlib
 from celery.result import AsyncResult
 
 from django.utils.translation import ugettext_lazy as _
 from rest_framework.exceptions import ValidationError
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import caches
 from django.db import models
 from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
 from django.template.loader import render_to_string
 from core.models.mixins import DateMixin
 from core.models.system import System
@@ -14,6 +19,8 @@ from core.tasks import send_email
 from scans.tasks import postscan_print, postscan_copy, \
     postscan_ftp, postscan_sftp, postscan_webdav
 from scans.exceptions import InvalidPostScanOperation
+from scans.events import publish_progress_on_commit
+from scans.priorities import get_priority
 
 User = get_user_model()
 
@@ -29,31 +36,77 @@ class SessionManager(models.Manager, AsyncMixin):
 
 
 class Session(DateMixin, AsyncMixin):
+    PROGRESS_FIELDS = ('progress', 'analyze_progress', 'total', 'counter',
+                       'current_path', 'files_total', 'files_completed',
+                       'files_infected', 'files_unknown')
+
     user = models.ForeignKey(User, related_name='sessions',
                              on_delete=models.SET_NULL, null=True,
                              editable=False)
     username = models.CharField(max_length=32, null=True)
     progress = models.FloatField(null=True, db_index=True)
-    total = models.PositiveSmallIntegerField(null=True)
-    counter = models.PositiveSmallIntegerField(null=True)
+    total = models.PositiveIntegerField(null=True)
+    counter = models.PositiveIntegerField(null=True)
     current_path = models.CharField(max_length=1024, null=True)
     analyze_progress = models.FloatField(null=True)
 
+    # denormalized counters of the top level valid files
+    files_total = models.PositiveIntegerField(default=0, editable=False)
+    files_completed = models.PositiveIntegerField(default=0, editable=False)
+    files_infected = models.PositiveIntegerField(default=0, editable=False)
+    files_unknown = models.PositiveIntegerField(default=0, editable=False)
+    # what archive extraction has spent of the session budgets
+    extracted_size = models.PositiveBigIntegerField(default=0, editable=False)
+    extracted_members = models.PositiveIntegerField(default=0,
+                                                    editable=False)
+
     source_choices = (
         ('upload', _("Upload")),
         ('url', _("URL")),
         ('disk', _("Disk")),
         ('email', _("Email")),
+        ('rescan', _("Rescan")),
     )
     source = models.CharField(choices=source_choices, max_length=32, null=True, blank=True)
+    # files which are not scanned by then are reported as unscanned
+    deadline = models.DateTimeField(null=True, editable=False)
     remote_addr = models.CharField(max_length=64, null=True)
     objects = SessionManager()
 
     class Meta:
         default_permissions = ['view', 'delete']
 
+    def get_priority(self, enqueued_at=None):
+        """ Priority of a task of the session enqueued at the given time """
+        return get_priority(self.source, enqueued_at)
+
+    def get_progress(self):
+        return {field: getattr(self, field) for field in self.PROGRESS_FIELDS}
+
+    def get_state_key(self):
+        # every write to the progress of a session changes the key, so
+        # snapshots never have to be deleted from the other processes
+        version = '|'.join(str(value) for value in (
+            self.modified_at, self.progress, self.analyze_progress,
+            self.total, self.counter, self.files_total, self.files_completed
+        ))
+        version = hashlib.md5(version.encode()).hexdigest()
+        return f'session_state:{self.pk}:{version}'
+
     def state(self):
+        """
+        Returns the progress of the session. Snapshots of finished sessions
+        are cached for SESSION_STATE_CACHE_TTL seconds.
+        """
         from scans.models.file import File
+
+        cache = caches['state']
+        key = self.get_state_key()
+        if settings.SESSION_STATE_CACHE_TTL:
+            data = cache.get(key)
+            if data is not None:
+                return data
+
         async_result = AsyncResult(str(self.pk))
 
         if self.analyze_progress is None:
@@ -70,16 +123,18 @@ class Session(DateMixin, AsyncMixin):
         else:
             scan_title = _('Scanning files finished')
 
-        valid_count = File.objects.filter(session=self,
-                                          parent=None, valid=True).count()
+        valid = Q(parent=None, valid=True)
+        scanned = valid & Q(progress=100)
+        counts = File.objects.filter(session=self).aggregate(
+            valid_count=Count('pk', filter=valid),
+            scanned_count=Count('pk', filter=scanned),
+            infected_count=Count('pk', filter=scanned & Q(infected=True)),
+            clean_count=Count('pk', filter=scanned & Q(infected=False)),
+            unknown_count=Count('pk', filter=scanned & Q(
+                infected__isnull=True))
+        )
         invalid_count = (
-                self.total - valid_count) if self.total else None
-        scanned_qs = File.objects.filter(session=self,
-                                         progress=100,
-                                         parent=None, valid=True)
-        infected_count = scanned_qs.filter(infected=True).count()
-        clean_count = scanned_qs.filter(infected=False).count()
-        unknown_count = scanned_qs.filter(infected=None, valid=True).count()
+                self.total - counts['valid_count']) if self.total else None
 
         data = {
             'session_id': self.pk,
@@ -95,35 +150,50 @@ class Session(DateMixin, AsyncMixin):
                 },
                 'scan': {
                     'title': scan_title,
-                    'total': valid_count,
-                    'counter': scanned_qs.count(),
+                    'total': counts['valid_count'],
+                    'counter': counts['scanned_count'],
                     'progress': self.progress
                 }
             },
             'total': self.total,
             'invalid': invalid_count,
-            'scanned': scanned_qs.count(),
-            'infected': infected_count,
-            'clean': clean_count,
-            'mysterious': unknown_count,
+            'scanned': counts['scanned_count'],
+            'infected': counts['infected_count'],
+            'clean': counts['clean_count'],
+            'mysterious': counts['unknown_count'],
             'complete': self.progress == 100 and self.analyze_progress == 100
         }
 
+        if data['complete'] and settings.SESSION_STATE_CACHE_TTL:
+            cache.set(key, data)
         return data
 
-    def update_progress(self):
+    def update_progress(self, **increments):
+        """
+        Adds the given increments to the file counters and evaluates the
+        progress from them.
+        """
         with transaction.atomic():
+            if increments:
+                Session.objects.filter(pk=self.pk).update(**{
+                    field: F(field) + value
+                    for field, value in increments.items()
+                })
             obj = Session.objects.select_for_update().filter(pk=self.pk).get()
-            total_files = obj.files.filter(parent=None, valid=True).count()
-            total_files_scanned = obj.files.filter(parent=None, progress=100,
-                                                   valid=True).count()
-            if total_files:
-                obj.progress = round(100 * total_files_scanned/total_files, 1)
+            previous_progress = obj.progress
+            if obj.files_total:
+                obj.progress = round(
+                    100 * obj.files_completed / obj.files_total, 1)
             elif obj.counter:
                 obj.progress = 100
-            obj.save()
-        if obj.progress == 100 and self.source == 'email' and self.remote_addr:
-            self.postscan_email()
+            Session.objects.filter(pk=self.pk).update(
+                progress=obj.progress, modified_at=timezone.now())
+            publish_progress_on_commit(self.pk, **obj.get_progress())
+        self.progress = obj.progress
+        if obj.progress == 100 and previous_progress != 100 and \
+                obj.source == 'email' and obj.remote_addr:
+            obj.postscan_email()
+        return obj
 
     def postscan_email(self):
         from scans.models.scan import Scan
@@ -0,0 +1,241 @@
+import os
+import uuid
+from collections import OrderedDict
+from time import monotonic
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files import File as FileWrapper
+from django.db import models
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from core.models.mixins import DateMixin, UpdateModelMixin
+from core.models.system import System
+from core.utils.files import (MIMETYPE_HEAD_SIZE, get_extension_info,
+                              get_mimetype)
+from core.utils.hashing import Hasher, hash_file
+from scans.exceptions import UploadError, UploadConflict
+from scans.models.file import File, FileInfo
+from scans.models.session import Session
+
+User = get_user_model()
+
+SPOOL_FOLDER = 'spool'
+# what is read of a chunk at a time
+READ_SIZE = 1024 * 1024
+MAX_HASHERS = 32
+
+# hashers of the uploads whose chunks all reached this process, with the
+# offset they are fed up to and when they were last fed, by upload id. They
+# only save reading the spool file again when the chunks of an upload and
+# its finalize reach the same worker process, which is best-effort
+hashers = OrderedDict()
+
+
+def prune_hashers():
+    """ Drops the hashers of uploads which received no chunk for a while """
+    expired = monotonic() - settings.UPLOAD_HASHER_TTL
+    while hashers and next(iter(hashers.values()))[2] < expired:
+        hashers.popitem(last=False)
+
+
+class SpoolFile(FileWrapper):
+    """ Lets the storage move the spool file instead of copying it """
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+class Upload(DateMixin, UpdateModelMixin):
+    """
+    A file uploaded in numbered chunks which are appended to a spool file,
+    so an upload resumes from its received bytes after a dropped connection.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4,
+                          editable=False)
+    user = models.ForeignKey(User, related_name='uploads',
+                             on_delete=models.CASCADE, null=True,
+                             editable=False)
+    filename = models.CharField(max_length=256)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0, editable=False)
+    chunks = models.PositiveIntegerField(default=0, editable=False)
+    mimetype = models.CharField(max_length=256, editable=False)
+    file = models.OneToOneField(File, related_name='upload', null=True,
+                                on_delete=models.SET_NULL, editable=False)
+
+    class Meta:
+        default_permissions = []
+
+    def get_spool_path(self):
+        storage = File._meta.get_field('file').storage
+        return storage.path(os.path.join(SPOOL_FOLDER, str(self.pk)))
+
+    def create_spool(self):
+        path = self.get_spool_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, 'wb').close()
+
+    def get_hasher(self):
+        """
+        Hasher which is fed with the received bytes if all of them reached
+        this process, otherwise the upload is hashed when it is finalized.
+        """
+        hasher, offset, fed_at = hashers.pop(self.pk, (None, None, None))
+        if self.received == 0:
+            return Hasher()
+        return hasher if offset == self.received else None
+
+    def keep_hasher(self, hasher):
+        hashers[self.pk] = (hasher, self.received, monotonic())
+        prune_hashers()
+        while len(hashers) > MAX_HASHERS:
+            hashers.popitem(last=False)
+
+    def get_checksums(self):
+        """
+        Checksums of a complete upload, None if it is not complete. A
+        complete spool file is not written to any more, so it is hashed
+        without the row lock of the upload. The hasher of write_chunk is used
+        if this process received all of the chunks, otherwise the spool file
+        is read again.
+        """
+        if self.file_id or self.received != self.size:
+            return None
+        hasher, offset, fed_at = hashers.pop(self.pk, (None, None, None))
+        if hasher is not None and offset == self.size:
+            return hasher.hexdigests()
+        try:
+            return hash_file(self.get_spool_path())
+        except FileNotFoundError:
+            # finalized by another request meanwhile
+            return None
+
+    def validate_file(self, system_settings):
+        max_file_size = system_settings['max_file_size']
+        if max_file_size and not self.size <= max_file_size:
+            raise UploadError(
+                f'The uploaded file size exceeded {max_file_size}.')
+
+        allowed_mimetypes = system_settings['mimetypes']
+        if self.mimetype and allowed_mimetypes and \
+                self.mimetype not in allowed_mimetypes:
+            raise UploadError(
+                f'The Uploaded file mimetype {self.mimetype} is not valid.')
+
+    def write_chunk(self, number, offset, stream, length):
+        """
+        Appends a chunk read from a stream to the spool file, hashing it on
+        the way. A chunk which is not the next one raises UploadConflict, the
+        received bytes and chunks tell a client where to resume. The mimetype
+        is checked once the head of the file is received, which may take
+        more than one chunk.
+        """
+        if self.file_id:
+            raise UploadConflict('The upload is already finalized.')
+        if number != self.chunks or offset != self.received:
+            raise UploadConflict(f'Expected chunk {self.chunks} at offset '
+                                 f'{self.received}.')
+        if not 0 < length <= settings.UPLOAD_MAX_CHUNK_SIZE:
+            raise UploadError(f'Chunks must have 1 to '
+                              f'{settings.UPLOAD_MAX_CHUNK_SIZE} bytes.')
+        if offset + length > self.size:
+            raise UploadError('The chunk exceeds the size of the upload.')
+
+        hasher = self.get_hasher()
+        written = 0
+        with open(self.get_spool_path(), 'r+b') as f:
+            # drops what an interrupted chunk left behind
+            f.truncate(offset)
+            f.seek(offset)
+            while written < length:
+                data = stream.read(min(READ_SIZE, length - written))
+                if not data:
+                    break
+                f.write(data)
+                if hasher is not None:
+                    hasher.update(data)
+                written += len(data)
+            if written < length:
+                f.truncate(offset)
+            elif not self.mimetype and (
+                    offset + written >= MIMETYPE_HEAD_SIZE or
+                    offset + written == self.size):
+                f.seek(0)
+                self.mimetype = get_mimetype(f.read(MIMETYPE_HEAD_SIZE))
+                try:
+                    self.validate_file(System.get_settings())
+                except UploadError:
+                    self.mimetype = ''
+                    f.truncate(offset)
+                    raise
+
+        if written < length:
+            raise UploadError(f'The chunk ended after {written} of {length} '
+                              f'bytes.')
+        self.update(received=self.received + written,
+                    chunks=self.chunks + 1, mimetype=self.mimetype)
+        if hasher is not None:
+            self.keep_hasher(hasher)
+
+    def finalize(self, checksums=None, scan=False, extract=False,
+                 agents=None):
+        """
+        Creates the session, file and file info of a complete upload, moving
+        the spool file into the storage, and starts its scan. The checksums
+        are those of get_checksums, it is hashed here without them.
+        """
+        if self.file_id:
+            raise UploadConflict('The upload is already finalized.')
+        if self.received != self.size:
+            raise UploadConflict(f'{self.received} of {self.size} bytes are '
+                                 f'received.')
+        self.validate_file(System.get_settings())
+
+        path = self.get_spool_path()
+        checksums = checksums or self.get_checksums()
+
+        file_info = {'size': self.size, 'mimetype': self.mimetype,
+                     **checksums}
+        info = FileInfo.objects.create(**file_info, **get_extension_info(
+            self.filename, self.mimetype))
+        field = File._meta.get_field('file')
+        with SpoolFile(open(path, 'rb'), name=self.filename) as content:
+            content.file_info = file_info
+            name = field.storage.save(
+                field.generate_filename(File(user=self.user), self.filename),
+                content, max_length=field.max_length
+            )
+
+        session = Session.objects.create(source='upload')
+        instance = File.objects.create(
+            user=self.user, session=session, info=info, file=name,
+            display_name=self.filename, valid=True
+        )
+        File.track_created([instance])
+        Session.objects.filter(pk=session.pk).update(
+            total=1,
+            counter=1,
+            analyze_progress=100
+        )
+        self.update(file=instance)
+        self.delete_spool()
+
+        if scan:
+            instance.scan(extract=extract, agents=agents)
+        elif extract:
+            instance.extract()
+        return instance
+
+    def delete_spool(self):
+        try:
+            os.remove(self.get_spool_path())
+        except FileNotFoundError:
+            pass
+
+
+@receiver(post_delete, sender=Upload)
+def post_delete_upload(sender, instance, *args, **kwargs):
+    hashers.pop(instance.pk, None)
+    instance.delete_spool()
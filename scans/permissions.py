@@ -28,7 +28,7 @@ class SessionPermissions(BasePermission):
                                                                    view):
             return True
 
-        if view.action in {'retrieve'}:
+        if view.action in {'retrieve', 'events', 'eta'}:
             return AllowAny().has_object_permission(request, view, obj)
 
         return False
@@ -52,7 +52,7 @@ class FilePermissions(BasePermission):
         if view.action == 'cleanup':
             return request.user.has_perm('scans.cleanup')
 
-        if view.action in {'create', 'from_url'}:
+        if view.action in {'create', 'from_url', 'from_urls'}:
             return IsAuthenticatedOrHasAPIKeyWithCaptcha().has_permission(request, view)
 
         if view.action in {'postscan_copy', 'postscan_print',
@@ -86,6 +86,28 @@ class FilePermissions(BasePermission):
         return False
 
 
+class UploadPermissions(BasePermission):
+
+    def has_permission(self, request, view):
+        if request.user.is_superuser or HasAPIKey().has_permission(request,
+                                                                   view):
+            return True
+
+        if view.action == 'create':
+            return IsAuthenticatedOrHasAPIKeyWithCaptcha().has_permission(request, view)
+
+        return True
+
+    def has_object_permission(self, request, view, obj):
+
+        if request.user.is_superuser or HasAPIKey().has_permission(request,
+                                                                   view):
+            return True
+
+        # the id of an anonymous upload is only known to its client
+        return obj.user is None or obj.user == request.user
+
+
 class ScanPermissions(BasePermission):
 
     def has_permission(self, request, view):
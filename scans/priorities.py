@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Case, DateTimeField, DurationField, \
+    ExpressionWrapper, F, IntegerField, Value, When
+from django.utils import timezone
+
+# celery priorities of the tasks of sessions by their source, 0 is the
+# highest with the redis transport
+SOURCE_PRIORITIES = {
+    'upload': 0,
+    'email': 2,
+    'url': 4,
+    'disk': 6,
+    'rescan': 8,
+}
+DEFAULT_PRIORITY = 4
+MAX_PRIORITY = 9
+# the highest priority aging lifts a task to, above the interactive sources
+AGED_PRIORITY_FLOOR = 1
+
+
+def get_priority(source, enqueued_at=None):
+    """
+    Priority of a task of a session, which gains one step for every
+    SCAN_PRIORITY_AGING seconds the task has waited since it was enqueued so
+    bulk work is not starved by interactive work. Aging stops at
+    AGED_PRIORITY_FLOOR, so a waiting bulk task never outranks an upload.
+    """
+    priority = SOURCE_PRIORITIES.get(source, DEFAULT_PRIORITY)
+    if settings.SCAN_PRIORITY_AGING and enqueued_at and \
+            priority > AGED_PRIORITY_FLOOR:
+        waited = (timezone.now() - enqueued_at).total_seconds()
+        priority = max(priority - int(waited // settings.SCAN_PRIORITY_AGING),
+                       AGED_PRIORITY_FLOOR)
+    return min(max(priority, 0), MAX_PRIORITY)
+
+
+def get_priority_ordering(source='source', enqueued_at='created_at'):
+    """
+    Ordering of rows by the priority of the source of their session with
+    aging from the time they were enqueued. The interactive sources, which
+    start above AGED_PRIORITY_FLOOR, go first, the others reach the floor at
+    their enqueued_at plus SCAN_PRIORITY_AGING seconds for every step above.
+    """
+    whens = [When(**{source: name}, then=Value(priority))
+             for name, priority in SOURCE_PRIORITIES.items()]
+    priority = Case(*whens, default=Value(DEFAULT_PRIORITY),
+                    output_field=IntegerField())
+    if not settings.SCAN_PRIORITY_AGING:
+        return [priority.asc()]
+
+    interactive = [name for name, priority in SOURCE_PRIORITIES.items()
+                   if priority < AGED_PRIORITY_FLOOR]
+    tier = Case(When(**{f'{source}__in': interactive}, then=Value(0)),
+                default=Value(1), output_field=IntegerField())
+
+    def get_delay(priority):
+        return Value(timedelta(seconds=max(
+            priority - AGED_PRIORITY_FLOOR, 0) * settings.SCAN_PRIORITY_AGING))
+
+    whens = [When(**{source: name}, then=get_delay(priority))
+             for name, priority in SOURCE_PRIORITIES.items()]
+    delay = Case(*whens, default=get_delay(DEFAULT_PRIORITY),
+                 output_field=DurationField())
+    return [tier.asc(), ExpressionWrapper(
+        F(enqueued_at) + delay, output_field=DateTimeField()).asc()]
@@ -0,0 +1,81 @@
+from time import monotonic
+
+from django.conf import settings
+from django.utils import timezone
+
+from scans.events import publish_progress_on_commit
+
+
+class ProgressReporter:
+    """
+    Buffers the progress of a long running task and writes it to the Celery
+    result meta and the Session row together, at most every
+    PROGRESS_FLUSH_INTERVAL milliseconds or PROGRESS_FLUSH_ITEMS items.
+    Used as a context manager it flushes what is left on exit.
+    """
+
+    def __init__(self, task=None, session_id=None, total=0, interval=None,
+                 items=None):
+        self.task = task
+        self.session_id = session_id
+        self.total = total
+        self.counter = 0
+        self.current_path = None
+        if interval is None:
+            interval = settings.PROGRESS_FLUSH_INTERVAL
+        self.interval = interval / 1000
+        self.items = items or settings.PROGRESS_FLUSH_ITEMS
+        self.flushed_at = 0
+        self.flushed_counter = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.flush()
+
+    @property
+    def progress(self):
+        if not self.total:
+            return 0
+        return round(100 * self.counter / self.total, 1)
+
+    @property
+    def meta(self):
+        return {
+            'total': self.total,
+            'counter': self.counter,
+            'current_path': self.current_path,
+            'progress': self.progress
+        }
+
+    def update(self, current_path=None, step=1):
+        self.counter += step
+        self.current_path = current_path
+        if self.counter - self.flushed_counter >= self.items or \
+                monotonic() - self.flushed_at >= self.interval:
+            self.flush()
+
+    def flush(self, current_path=None):
+        from scans.models.session import Session
+
+        if current_path is not None:
+            self.current_path = current_path
+        meta = self.meta
+        if self.task:
+            self.task.update_state(state='PROGRESS', meta=meta)
+        if self.session_id:
+            Session.objects.filter(pk=self.session_id).update(
+                total=meta['total'],
+                counter=meta['counter'],
+                current_path=meta['current_path'],
+                analyze_progress=meta['progress'],
+                modified_at=timezone.now()
+            )
+            publish_progress_on_commit(
+                self.session_id, total=meta['total'], counter=meta['counter'],
+                current_path=meta['current_path'],
+                analyze_progress=meta['progress'])
+        self.flushed_at = monotonic()
+        self.flushed_counter = self.counter
+        return meta
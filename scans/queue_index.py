@@ -0,0 +1,113 @@
+from time import time
+
+from django.conf import settings
+
+from agents.concurrency import get_limit_key
+from core.utils.broker import get_redis
+
+# scores order the waiting tasks like the redis transport consumes them, by
+# priority and then by the time they were published
+PRIORITY_SPAN = 10 ** 10
+PRIORITIES = range(10)
+TASKS_KEY = 'scan_queue_tasks'
+
+
+def get_queue_key(agent_id):
+    return f'scan_queue:{agent_id}'
+
+
+def get_session_key(agent_id, session_id):
+    return f'scan_queue:{agent_id}:{session_id}'
+
+
+def get_agents_key(session_id):
+    return f'scan_queue_agents:{session_id}'
+
+
+def get_score(priority=None, published_at=None):
+    return (priority or 0) * PRIORITY_SPAN + (published_at or time())
+
+
+def add_task(task_id, agent_id, session_id, priority=None):
+    """
+    Indexes a published scan task in the queue of its agent and in the
+    tasks of its session on that agent. A task which is published again on
+    a retry moves to the end of its queue.
+    """
+    score = get_score(priority)
+    session_key = get_session_key(agent_id, session_id)
+    with get_redis().pipeline() as pipe:
+        pipe.zadd(get_queue_key(agent_id), {task_id: score})
+        pipe.zadd(session_key, {task_id: score})
+        pipe.expire(session_key, settings.SCAN_QUEUE_INDEX_TTL)
+        pipe.sadd(get_agents_key(session_id), agent_id)
+        pipe.expire(get_agents_key(session_id),
+                    settings.SCAN_QUEUE_INDEX_TTL)
+        pipe.hset(TASKS_KEY, task_id, f'{agent_id}:{session_id}')
+        pipe.execute()
+
+
+def remove_task(task_id):
+    """ Drops a task which started or was revoked from the index """
+    connection = get_redis()
+    value = connection.hget(TASKS_KEY, task_id)
+    if value is None:
+        return False
+    agent_id, session_id = value.decode().split(':')
+    with connection.pipeline() as pipe:
+        pipe.zrem(get_queue_key(agent_id), task_id)
+        pipe.zrem(get_session_key(agent_id, session_id), task_id)
+        pipe.hdel(TASKS_KEY, task_id)
+        pipe.execute()
+    return True
+
+
+def prune(agent_id):
+    """
+    Drops the tasks published longer than SCAN_QUEUE_INDEX_TTL ago, whose
+    worker died before they were removed.
+    """
+    expired = time() - settings.SCAN_QUEUE_INDEX_TTL
+    with get_redis().pipeline() as pipe:
+        for priority in PRIORITIES:
+            pipe.zremrangebyscore(get_queue_key(agent_id),
+                                  priority * PRIORITY_SPAN,
+                                  get_score(priority, expired))
+        pipe.execute()
+
+
+def get_eta(session_id):
+    """
+    Position of a session in the queues of its agents and the seconds until
+    its waiting scans are done by the throughput of the agents, the limit of
+    scans they run at once over their average scan time. Every agent costs a
+    few O(log n) lookups.
+    """
+    connection = get_redis()
+    position = waiting = 0
+    eta = None
+    for agent_id in connection.smembers(get_agents_key(session_id)):
+        agent_id = agent_id.decode()
+        session_key = get_session_key(agent_id, session_id)
+        first = connection.zrange(session_key, 0, 0, withscores=True)
+        if not first:
+            connection.srem(get_agents_key(session_id), agent_id)
+            continue
+        prune(agent_id)
+        own = connection.zcard(session_key)
+        ahead = connection.zcount(get_queue_key(agent_id), '-inf',
+                                  f'({first[0][1]}')
+        position = max(position, ahead)
+        waiting += own
+
+        limit, scan_time = connection.hmget(get_limit_key(agent_id),
+                                            'limit', 'scan_time')
+        if scan_time:
+            limit = float(limit or settings.AGENT_CONCURRENCY_INITIAL)
+            agent_eta = (ahead + own) * float(scan_time) / limit
+            eta = max(eta or 0, agent_eta)
+    return {
+        'position': position,
+        'waiting': waiting,
+        'eta': eta if eta is None else round(eta, 1)
+    }
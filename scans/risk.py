@@ -0,0 +1,71 @@
+import os
+
+from core.mimetypes import mimetypes
+
+# the mimetype and category of core.mimetypes by extension
+EXTENSIONS = {}
+for category in mimetypes:
+    for item in category['mimetypes']:
+        for extension in item.get('extensions', []):
+            EXTENSIONS.setdefault(extension.lower(),
+                                  (item['mimetype'], category['cat']))
+
+# documents which can carry macros
+MACRO_MIMETYPES = {
+    'application/msword',
+    'application/vnd.ms-excel',
+    'application/vnd.ms-powerpoint',
+    'application/CDFV2',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'application/vnd.oasis.opendocument.text',
+    'application/vnd.oasis.opendocument.spreadsheet',
+    'application/vnd.oasis.opendocument.presentation',
+}
+
+# lower is scanned first
+EXECUTABLE_RISK = 0
+SCRIPT_RISK = 1
+MACRO_RISK = 2
+ARCHIVE_RISK = 3
+UNKNOWN_RISK = 3
+CATEGORY_RISKS = {
+    'executable': EXECUTABLE_RISK,
+    'web': SCRIPT_RISK,
+    'compress': ARCHIVE_RISK,
+    'application': 4,
+    'text': 5,
+}
+DEFAULT_RISK = 6
+
+
+def get_risk(path):
+    """
+    Risk class of a file by its extension, files without a known extension
+    are ranked with archives.
+    """
+    extension = os.path.splitext(path)[1][1:].lower()
+    if extension not in EXTENSIONS:
+        return UNKNOWN_RISK
+    mimetype, category = EXTENSIONS[extension]
+    if mimetype in MACRO_MIMETYPES:
+        return MACRO_RISK
+    if category != 'executable' and mimetype.startswith('text/x-'):
+        return SCRIPT_RISK
+    return CATEGORY_RISKS.get(category, DEFAULT_RISK)
+
+
+def order_by_risk(paths):
+    """
+    Orders paths by their risk class and then by their size, which the cost
+    of their scans grows with, so the riskiest files are scanned first and
+    as many of them as possible fit in a time budget.
+    """
+    def key(path):
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        return get_risk(path), size
+
+    return sorted(paths, key=key)
@@ -1,6 +1,7 @@
 import os
 
 from kombu.exceptions import OperationalError as KombuOperationError
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.utils.translation import ugettext_lazy as _
 
@@ -12,7 +13,8 @@ from agents.models import Agent
 from scans.models.file import File, FileInfo
 from scans.models.scan import Scan, ScanReport
 from scans.models.session import Session
-from core.utils.files import discover_mimetype
+from scans.models.upload import Upload
+from core.utils.files import discover_mimetype, get_extension_info
 from core.models.system import System
 
 
@@ -116,7 +118,12 @@ class FileSerializer(serializers.ModelSerializer):
                     raise ValidationError(msg.format(size=max_file_size))
 
             allowed_mimetypes = settings['mimetypes']
-            mimetype = discover_mimetype(file)
+            # set by the upload handlers while the file was received
+            file_info = getattr(file, 'file_info', None)
+            if file_info:
+                mimetype = file_info['mimetype']
+            else:
+                mimetype = discover_mimetype(file)
             if allowed_mimetypes and mimetype not in allowed_mimetypes:
                     msg = _('The Uploaded file mimetype {mimetype} is not valid.')
                     raise ValidationError(msg.format(mimetype=mimetype))
@@ -140,15 +147,21 @@ class FileSerializer(serializers.ModelSerializer):
         if not isinstance(user, get_user_model()):
             user = None
 
-        session = Session.objects.create()
+        session = Session.objects.create(source='upload')
 
         size = validated_data.pop('size')
         mimetype = validated_data.pop('mimetype')
-        info = FileInfo.objects.create(size=size, mimetype=mimetype)
+        file_info = getattr(file, 'file_info', None)
+        if file_info:
+            info = FileInfo.objects.create(**file_info, **get_extension_info(
+                file.name, mimetype))
+        else:
+            info = FileInfo.objects.create(size=size, mimetype=mimetype)
         instance = File.objects.create(
             user=user, session=session, info=info, valid=True,
             display_name=file.name.split('/')[-1], **validated_data
         )
+        File.track_created([instance])
         Session.objects.filter(pk=session.pk).update(
             total=1,
             counter=1,
@@ -156,7 +169,8 @@ class FileSerializer(serializers.ModelSerializer):
         )
         # celery_app.control.add_consumer(queue=session_id, reply=True)
 
-        instance.set_file_info()
+        if not file_info:
+            instance.set_file_info()
         if scan:
             instance.scan(extract=extract, agents=agents)
 
@@ -176,16 +190,21 @@ class FileSerializer(serializers.ModelSerializer):
         # celery_app.control.add_consumer(queue=instance.session_id, reply=True)
         new = instance
         new.pk = None
-        session = Session.objects.create()
+        session = Session.objects.create(source='rescan')
         new.session = session
+        new.reset_scan_state()
         new.save()
+        created = [new]
         if extract:
             for child in instance.children.all():
                 new_child = child
                 new_child.pk = None
                 new_child.session = session
                 new_child.parent = new
+                new_child.reset_scan_state()
                 new_child.save()
+                created.append(new_child)
+        File.track_created(created)
         Session.objects.filter(pk=session.pk).update(
             total=1,
             counter=1,
@@ -234,6 +253,44 @@ class FromUrlSerializer(serializers.Serializer):
         return session
 
 
+class FromUrlsSerializer(serializers.Serializer):
+    scan = serializers.BooleanField(write_only=True)
+    urls = serializers.ListField(
+        child=serializers.URLField(), write_only=True, min_length=1,
+        max_length=settings.DOWNLOAD_BULK_MAX_URLS
+    )
+    concurrency = serializers.IntegerField(
+        write_only=True, required=False, min_value=1,
+        max_value=settings.DOWNLOAD_BULK_CONCURRENCY
+    )
+    extract = serializers.BooleanField(write_only=True, default=False)
+    agents = serializers.PrimaryKeyRelatedField(
+        queryset=Agent.objects.filter(active=True), write_only=True, many=True,
+        required=False
+    )
+
+    def create(self, validated_data):
+        extract_settings = System.get_settings()['extract']
+        if extract_settings is None:
+            extract = validated_data.get('extract')
+        else:
+            extract = extract_settings
+
+        user = self.context['request'].user
+        if not isinstance(user, get_user_model()):
+            user = None
+
+        try:
+            session = File.objects.create_from_urls(
+                validated_data['urls'], scan=validated_data['scan'],
+                extract=extract, agents=validated_data.get('agents'),
+                owner=user, concurrency=validated_data.get('concurrency'))
+        except KombuOperationError as e:
+            raise ValidationError(str(e))
+
+        return session
+
+
 class FromPathSerializer(serializers.Serializer):
     scan = serializers.BooleanField(write_only=True)
     file = serializers.CharField(write_only=True)
@@ -276,6 +333,9 @@ class FromDiskSerializer(serializers.Serializer):
         queryset=Agent.objects.filter(active=True), write_only=True, many=True,
         required=False
     )
+    # seconds, the riskiest files are scanned first
+    time_budget = serializers.IntegerField(write_only=True, required=False,
+                                           min_value=1)
 
     def create(self, validated_data):
         paths = validated_data.get('paths')
@@ -292,10 +352,9 @@ class FromDiskSerializer(serializers.Serializer):
             user = None
 
         try:
-            session = File.objects.bulk_create_from_disk(paths, scan=scan,
-                                                         extract=extract,
-                                                         owner=user,
-                                                         agents=agents)
+            session = File.objects.bulk_create_from_disk(
+                paths, scan=scan, extract=extract, owner=user, agents=agents,
+                time_budget=validated_data.get('time_budget'))
         except KombuOperationError as e:
             raise ValidationError(str(e))
 
@@ -331,3 +390,43 @@ class ScanReportSerializer(serializers.ModelSerializer):
     class Meta:
         model = ScanReport
         fields = '__all__'
+
+
+class UploadSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = Upload
+        fields = ('id', 'filename', 'size', 'received', 'chunks', 'mimetype',
+                  'file', 'created_at')
+        read_only_fields = ['file']
+
+    def validate_size(self, value):
+        if value < 1:
+            raise ValidationError(_('The file must not be empty.'))
+        max_file_size = System.get_settings()['max_file_size']
+        if max_file_size and not value <= max_file_size:
+            msg = _('The uploaded file size exceeded {size}.')
+            raise ValidationError(msg.format(size=max_file_size))
+        return value
+
+    def create(self, validated_data):
+        user = self.context['request'].user
+        if not isinstance(user, get_user_model()):
+            user = None
+        instance = Upload.objects.create(user=user, **validated_data)
+        instance.create_spool()
+        return instance
+
+
+class FinalizeUploadSerializer(serializers.Serializer):
+    scan = serializers.BooleanField(default=False)
+    extract = serializers.BooleanField(default=False)
+    agents = serializers.PrimaryKeyRelatedField(
+        queryset=Agent.objects.filter(active=True), many=True, required=False
+    )
+
+    def validate(self, data):
+        extract_settings = System.get_settings()['extract']
+        if extract_settings is not None:
+            data['extract'] = extract_settings
+        return data
@@ -0,0 +1,145 @@
+import os
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+from core.utils.hashing import Hasher, hash_file
+
+BLOBS_FOLDER = 'blobs'
+# private copies of stored files, for the engines to scan
+COPIES_FOLDER = 'copies'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores files in a folder named by the sha256 of their content. Every
+    saved name is a hard link to the same data, so a file saved again takes
+    no space and deleting a name drops one reference to it. The data is freed
+    with its last name and the folder with it.
+
+    The names of a content share one inode, so whatever writes to one of them
+    in place writes to all of them, in every session. The engines scan a
+    private_copy, as they may clean or quarantine a file in place.
+    """
+
+    def get_folder(self, sha256):
+        return os.path.join(BLOBS_FOLDER, sha256[:2], sha256)
+
+    def is_blob(self, name):
+        return name.startswith(BLOBS_FOLDER + '/')
+
+    def link(self, sha256, name):
+        """ Links a new name to a stored copy of the content, if there is one """
+        folder = self.path(self.get_folder(sha256))
+        try:
+            with os.scandir(folder) as entries:
+                source = next((entry.path for entry in entries), None)
+        except FileNotFoundError:
+            return None
+        if source is None:
+            return None
+        return self.add_name(source, sha256, name)
+
+    def add_name(self, source, sha256, name, create=False):
+        name = os.path.join(self.get_folder(sha256), os.path.basename(name))
+        if create:
+            os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+        while True:
+            name = self.get_available_name(name)
+            try:
+                os.link(source, self.path(name))
+            except FileExistsError:
+                continue
+            except OSError:
+                # the source was deleted or the disk has no hard links
+                return None
+            return name
+
+    def save_hashed(self, name, content):
+        """ Copies the content to a new name and returns its checksums """
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        hasher = Hasher()
+        with open(path, 'xb') as f:
+            for chunk in content.chunks(settings.HASH_CHUNK_SIZE):
+                f.write(chunk)
+                hasher.update(chunk)
+        if self.file_permissions_mode is not None:
+            os.chmod(path, self.file_permissions_mode)
+        return hasher.hexdigests()
+
+    def _save(self, name, content):
+        # uploads, downloads, archive members and disk imports are hashed
+        # while they are read
+        sha256 = (getattr(content, 'file_info', None) or {}).get('sha256')
+        if sha256:
+            linked = self.link(sha256, name)
+            if linked:
+                return linked
+
+        temp_name = os.path.join(BLOBS_FOLDER, 'tmp', uuid.uuid4().hex)
+        if sha256 or hasattr(content, 'temporary_file_path'):
+            # moved when it is a temporary file
+            temp_name = super()._save(temp_name, content)
+        else:
+            # the checksums of the copy are left on the content for callers
+            content.checksums = self.save_hashed(temp_name, content)
+            sha256 = content.checksums['sha256']
+        temp_path = self.path(temp_name)
+        try:
+            if not sha256:
+                content.checksums = hash_file(temp_path)
+                sha256 = content.checksums['sha256']
+            folder = self.path(self.get_folder(sha256))
+            while True:
+                linked = self.link(sha256, name) or \
+                    self.add_name(temp_path, sha256, name, create=True)
+                if linked:
+                    return linked
+                # the folder is removed with the last name of its content
+                if os.path.isdir(folder):
+                    # the disk has no hard links
+                    with self.open(temp_name) as f:
+                        return super()._save(name, f)
+        finally:
+            os.remove(temp_path)
+
+    @contextmanager
+    def private_copy(self, name):
+        """ Path of a copy of a stored file of its own for the block """
+        folder = self.path(os.path.join(COPIES_FOLDER, uuid.uuid4().hex))
+        os.makedirs(folder)
+        path = os.path.join(folder, os.path.basename(name))
+        try:
+            shutil.copyfile(self.path(name), path)
+            if self.file_permissions_mode is not None:
+                os.chmod(path, self.file_permissions_mode)
+            yield path
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+
+    def delete_copies(self, seconds):
+        """ Deletes private copies left behind for longer than seconds """
+        before = time.time() - seconds
+        try:
+            entries = list(os.scandir(self.path(COPIES_FOLDER)))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if entry.stat().st_mtime < before:
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+    def delete(self, name):
+        super().delete(name)
+        if name and self.is_blob(name):
+            try:
+                os.rmdir(os.path.dirname(self.path(name)))
+            except OSError:
+                # other names still refer to the content
+                pass
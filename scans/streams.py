@@ -0,0 +1,154 @@
+import asyncio
+import json
+from time import monotonic
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.urls import Resolver404, resolve
+from redis.exceptions import RedisError
+
+from core.utils.broker import get_redis
+from scans.events import get_events_key, get_progress
+
+import logging
+logger = logging.getLogger(__name__)
+
+EVENTS_URL_NAME = 'session-events'
+
+
+def get_header(scope, name):
+    for key, value in scope['headers']:
+        if key == name:
+            return value.decode('latin1')
+    return ''
+
+
+def run(func, *args):
+    """ Runs a short blocking call off the event loop """
+    return sync_to_async(func, thread_sensitive=False)(*args)
+
+
+def subscribe(session_id):
+    pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(get_events_key(session_id))
+    return pubsub
+
+
+def drain(pubsub):
+    """ Whether anything was published since the last call """
+    published = False
+    while pubsub.get_message() is not None:
+        published = True
+    return published
+
+
+class ProgressStream:
+    """
+    ASGI middleware which streams the events of a session as server-sent
+    events to the clients which accept text/event-stream. The request is
+    answered by the events view first, so it is authenticated and permitted
+    like any other, and its snapshot is the first event. Later snapshots are
+    sent as they are published. An open stream waits on the event loop, it
+    holds no worker and no thread.
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    def get_session_id(self, scope):
+        if scope['type'] != 'http' or scope['method'] != 'GET' or \
+                'text/event-stream' not in get_header(scope, b'accept'):
+            return None
+        path = scope['path']
+        root_path = scope.get('root_path', '')
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        try:
+            match = resolve(path)
+        except Resolver404:
+            return None
+        if match.url_name != EVENTS_URL_NAME:
+            return None
+        return match.kwargs['pk']
+
+    async def __call__(self, scope, receive, send):
+        session_id = self.get_session_id(scope)
+        if session_id is None:
+            return await self.application(scope, receive, send)
+
+        messages = []
+
+        async def capture(message):
+            messages.append(message)
+
+        headers = [(key, value) for key, value in scope['headers']
+                   if key != b'accept'] + [(b'accept', b'application/json')]
+        await self.application(dict(scope, headers=headers), receive, capture)
+        if messages[0]['status'] != 200:
+            for message in messages:
+                await send(message)
+            return
+
+        snapshot = json.loads(b''.join(message.get('body', b'')
+                                       for message in messages[1:]))
+        last_event_id = get_header(scope, b'last-event-id')
+        cursor = int(last_event_id) if last_event_id.isdigit() else -1
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', b'text/event-stream'),
+                        (b'cache-control', b'no-cache'),
+                        (b'x-accel-buffering', b'no')]
+        })
+        disconnected = asyncio.ensure_future(self.wait_for_disconnect(receive))
+        try:
+            await self.stream(session_id, snapshot, cursor, send,
+                              disconnected)
+        except RedisError as e:
+            # the client reconnects with the id of its last event
+            logger.warning(f'Events of session {session_id} are not '
+                           f'streamed: {e}')
+        finally:
+            disconnected.cancel()
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def wait_for_disconnect(self, receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    async def send_event(self, send, snapshot):
+        await send({
+            'type': 'http.response.body',
+            'body': f'id: {snapshot["version"]}\n'
+                    f'data: {json.dumps(snapshot)}\n\n'.encode(),
+            'more_body': True
+        })
+
+    async def stream(self, session_id, snapshot, cursor, send, disconnected):
+        interval = settings.SESSION_EVENTS_INTERVAL / 1000
+        await send({'type': 'http.response.body',
+                    'body': f'retry: {settings.SESSION_EVENTS_INTERVAL}\n\n'
+                    .encode(), 'more_body': True})
+        pubsub = await run(subscribe, session_id)
+        try:
+            # read again once subscribed, no event is missed between
+            published = True
+            sent_at = monotonic()
+            while not disconnected.done():
+                if published:
+                    current = await run(get_progress, session_id)
+                    if current and current['version'] > snapshot['version']:
+                        snapshot = current
+                if snapshot['version'] > cursor:
+                    await self.send_event(send, snapshot)
+                    cursor = snapshot['version']
+                    sent_at = monotonic()
+                elif monotonic() - sent_at >= \
+                        settings.SESSION_EVENTS_KEEPALIVE:
+                    await send({'type': 'http.response.body',
+                                'body': b': keepalive\n\n', 'more_body': True})
+                    sent_at = monotonic()
+                await asyncio.wait([disconnected], timeout=interval)
+                published = await run(drain, pubsub)
+        finally:
+            await run(pubsub.close)
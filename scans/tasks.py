@@ -1,33 +1,51 @@
 import os
+import uuid
 import psutil
 from khayyam import *
-import requests
-import mimetypes
 import shutil
+from datetime import timedelta
+from contextlib import ExitStack
 from itertools import islice
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import PyPDF2
-from celery import shared_task
+from celery import shared_task, states
 from celery.exceptions import SoftTimeLimitExceeded
-from celery.signals import before_task_publish, task_postrun
+from celery.signals import before_task_publish, task_postrun, \
+    task_prerun, task_revoked
 
 from django.conf import settings
 from django.db import transaction
-from django.db.utils import DataError
+from django.db.models import F
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from django.core.files import File as FileWrapper
+from redis.exceptions import RedisError
 from rest_framework.exceptions import ValidationError
 
 from core.utils.files import (discover_mimetype, discover_file_info,
-                              is_archive_file,
-                              extract_compressed_file_recursively,
-                              download_file)
+                              get_extension_info, iter_paths,
+                              is_archive_file)
 from core.models.system import System
+from core.utils.hashing import hash_file
+from core.utils.archives import (ExtractionBudget, ExtractedMember,
+                                 SkippedMember, extract_archive,
+                                 get_extraction_executor)
+from agents.breaker import CircuitBreaker
+from agents.concurrency import ConcurrencyLimiter, get_retry_countdown
 from agents.exceptions import AVException
+from scans import queue_index
+from scans.progress import ProgressReporter
+from scans.risk import order_by_risk
 
 import logging
 logger = logging.getLogger(__name__)
 
+UNSCANNED_NOTES = 'Not scanned within the time budget'
+# tasks which are indexed by the queue position of their session
+INDEXED_TASKS = ('scans.tasks.perform_scan', 'scans.tasks.perform_scan_batch')
+
 
 @before_task_publish.connect
 def register_task_id(sender=None, headers=None, body=None, **kwargs):
@@ -38,63 +56,111 @@ def register_task_id(sender=None, headers=None, body=None, **kwargs):
         if session_id:
             TaskLog.objects.create(session_id=session_id,
                                    task_id=headers['id'])
+        agent_id = properties.get('agent_id')
+        if session_id and agent_id:
+            try:
+                queue_index.add_task(headers['id'], agent_id, session_id,
+                                     properties.get('priority'))
+            except RedisError as e:
+                logger.warning(f'Task {headers["id"]} is not indexed: {e}')
+
+
+@task_prerun.connect
+def unindex_task(sender=None, task_id=None, **kwargs):
+    if sender.name in INDEXED_TASKS:
+        try:
+            queue_index.remove_task(task_id)
+        except RedisError as e:
+            logger.warning(f'Task {task_id} is not unindexed: {e}')
+
+
+@task_revoked.connect
+def unindex_revoked_task(sender=None, request=None, **kwargs):
+    unindex_task(sender=sender, task_id=request.id)
 
 
 @task_postrun.connect
 def remove_task_id(sender=None, headers=None, body=None, **kwargs):
     from scans.models.session import TaskLog
+    # a retried task is published again with the same id
+    if kwargs.get('state') == states.RETRY:
+        return
     if sender.name.startswith('scans.tasks'):
         TaskLog.objects.filter(task_id=sender.request.id).delete()
 
 
+def ingest_in_chunks(items, ingest, session, reporter, workers, scan=False,
+                     extract=False, agents=None, owner=None, skip=None):
+    """
+    Runs ingest on every item on a pool of threads, in chunks of
+    INGEST_CHUNK_SIZE items whose rows are created and scanned or extracted
+    together. Reading the next chunk overlaps with creating the rows of the
+    last one. skip returns the records of a chunk which is not to be read,
+    or None.
+    """
+    from scans.models.file import File
+    from scans.utils import create_ingested
+
+    def flush(chunk, records):
+        records = list(records)
+        instances = create_ingested(records, session, owner=owner)
+        reporter.update(chunk[-1], step=len(chunk))
+        session.update_progress()
+
+        valid = [instance for instance in instances if instance.valid]
+        if scan and valid:
+            File.objects.filter(pk__in=[instance.pk for instance in valid]) \
+                .scan(session.pk, extract=extract, agents=agents)
+        elif extract:
+            for record, instance in zip(records, instances):
+                if instance.valid and record['archive']:
+                    instance.extract()
+
+    items = iter(items)
+    chunks = iter(lambda: list(islice(items, settings.INGEST_CHUNK_SIZE)), [])
+    pending = None
+    with reporter, ThreadPoolExecutor(max_workers=workers) as executor:
+        for chunk in chunks:
+            records = skip(chunk) if skip else None
+            if records is None:
+                records = executor.map(ingest, chunk)
+            if pending:
+                flush(*pending)
+            pending = chunk, records
+        if pending:
+            flush(*pending)
+        reporter.current_path = None
+
+    return reporter.meta
+
+
 @shared_task(bind=True, name='scans.tasks.bulk_create_from_disk')
 def bulk_create_from_disk(self, session_id, paths, scan=False, extract=False,
                           agent_pks=None, owner_id=None):
-    from scans.models.file import File, FileInfo
     from scans.models.session import Session
+    from scans.utils import ingest_file, skipped_record
     from agents.models import Agent
     from django.contrib.auth import get_user_model
     from core.models.system import System
     User = get_user_model()
     owner = User.objects.get(pk=owner_id) if owner_id else None
     session = Session.objects.get(pk=session_id)
-    unpacked_paths = []
-    counter = 0
+    reporter = ProgressReporter(self, session.pk)
+    reporter.flush('Files are being indexed...')
 
-    self.update_state(
-        state='PROGRESS',
-        meta={
-            'total': 0,
-            'counter': 0,
-            'current_path': 'Files are being indexed...',
-            'progress': 0
-        }
-    )
-    Session.objects.filter(pk=session.pk).update(
-        total=0,
-        counter=0,
-        current_path='Files are being indexed...',
-        analyze_progress=0
-    )
-
-    for path in paths:
-        if os.path.isdir(path):
-            gen = os.walk(path)
-            for root, dirs, files in gen:
-                for file in files:
-                    unpacked_paths.append(
-                        os.path.join(root, file)
-                    )
-        else:
-            unpacked_paths.append(path)
-
-    unpacked_paths = list(set(unpacked_paths))
-    total_paths = len(unpacked_paths)
+    if session.deadline:
+        # the riskiest files are scanned first when the time is limited
+        paths = order_by_risk(iter_paths(paths))
+        total_paths = len(paths)
+    else:
+        # Counting is a metadata only walk, files are read in the second one
+        total_paths = sum(1 for _ in iter_paths(paths))
 
     if not total_paths:
         Session.objects.filter(pk=session.pk).update(
             total=total_paths,
             counter=0,
+            current_path=None,
             analyze_progress=100,
             progress=100
         )
@@ -106,94 +172,45 @@ def bulk_create_from_disk(self, session_id, paths, scan=False, extract=False,
         }
 
     system_settings = System.get_settings()
+    agents = Agent.objects.filter(pk__in=agent_pks) if agent_pks else None
+    ingest = partial(ingest_file, owner=owner,
+                     allowed_mimetypes=system_settings['mimetypes'],
+                     max_file_size=system_settings['max_file_size'],
+                     check_archive=extract and not scan)
+
+    def skip(chunk):
+        if session.deadline and timezone.now() >= session.deadline:
+            return [skipped_record(path, UNSCANNED_NOTES) for path in chunk]
+        return None
+
+    paths = iter(paths) if session.deadline else iter_paths(paths)
+    reporter.total = total_paths
+    return ingest_in_chunks(paths, ingest, session, reporter,
+                            settings.INGEST_WORKERS, scan=scan,
+                            extract=extract, agents=agents, owner=owner,
+                            skip=skip)
+
+
+@shared_task(name='scans.tasks.expire_session')
+def expire_session(session_id):
+    """
+    Reports the files of a session whose time budget ran out as unscanned,
+    their pending scans are completed with status 408.
+    """
+    from scans.models.scan import Scan
 
-    for path in unpacked_paths:
-        counter += 1
-        self.update_state(
-            state='PROGRESS',
-            meta={
-                'total': total_paths,
-                'counter': counter,
-                'current_path': path,
-                'progress': round(100 * counter / total_paths, 1)
-            }
-        )
-        Session.objects.filter(pk=session.pk).update(
-            total=total_paths,
-            counter=counter,
-            current_path=path,
-            analyze_progress=round(100 * counter / total_paths, 1)
-        )
-        try:
-            with open(path, 'rb') as f:
-                f = FileWrapper(f)
-                f.name = os.path.split(f.name)[-1]
-                allowed_mimetypes = system_settings['mimetypes']
-                max_file_size = system_settings['max_file_size']
-                mimetype = discover_mimetype(f)
-                mimetype_not_allowed = allowed_mimetypes and (
-                            mimetype not in allowed_mimetypes)
-                size_not_allowed = max_file_size and (
-                    not f.size <= max_file_size)
-
-                if mimetype_not_allowed:
-                    msg = f'The Uploaded file mimetype {mimetype} is not valid.'
-                elif size_not_allowed:
-                    msg = f'The uploaded file size exceeded {max_file_size}.'
-                if mimetype_not_allowed or size_not_allowed:
-                    with transaction.atomic():
-                        info = FileInfo.objects.create(size=f.size,
-                                                       mimetype=mimetype)
-                        instance = File.objects.create(
-                            user=owner, file=None, session=session,
-                            info=info, display_name=f.name,
-                            notes=msg, deleted=True, progress=100,
-                        )
-                        instance.session.update_progress()
-                    continue
-
-                info = FileInfo.objects.create(size=f.size, mimetype=mimetype)
-                instance = File.objects.create(
-                    user=owner, file=f, info=info, display_name=f.name,
-                    session=session, valid=True
-                )
-                instance.update_scan_state()
-                instance.session.update_progress()
-                instance.set_file_info()
-                if scan:
-                    if agent_pks:
-                        agents = Agent.objects.filter(pk__in=agent_pks)
-                    else:
-                        agents = None
-                    instance.scan(extract=extract, agents=agents)
-
-                elif extract:
-                    instance.extract()
-        except FileNotFoundError:
-            instance = File.objects.create(
-                user=owner, file=None, session=session,
-                display_name=os.path.split(path)[-1],
-                notes=f'No such file or directory: "{path}"', deleted=True,
-                progress=100
-            )
-            instance.session.update_progress()
-
-        except DataError as e:
-            instance = File.objects.create(
-                user=owner, file=None, session=session,
-                display_name=os.path.split(path)[-1],
-                notes=f'{str(e)}: "{path}"', deleted=True, progress=100
-            )
-            instance.session.update_progress()
-
-    Session.objects.filter(pk=session.pk).update(current_path=None)
-
-    return {
-        'total': total_paths,
-        'counter': counter,
-        'current_path': None,
-        'progress': round(100 * counter / total_paths, 1)
-    }
+    scans = list(Scan.objects.select_related(
+        'file', 'file__info', 'file__session', 'agent').filter(
+        file__session_id=session_id, status_code=None))
+    Scan.revoke(scans)
+    for instance in scans:
+        if instance.complete(status_code=408, error=UNSCANNED_NOTES,
+                             parked=False):
+            instance.log()
+    Scan.objects.filter(pk__in=[scan.pk for scan in scans]) \
+        .release_waiters()
+    logger.info(f'{len(scans)} scans of session ID {session_id} expired')
+    return len(scans)
 
 
 @shared_task(bind=True, name='scans.tasks.create_from_path')
@@ -233,6 +250,7 @@ def create_from_path(self, session_id, path, scan=False, extract=False,
             file=path, session=session, info=info,
             user=owner, valid=True
         )
+        File.track_created([instance])
         instance.set_file_info()
         if scan:
             if agent_pks:
@@ -249,10 +267,9 @@ def create_from_path(self, session_id, path, scan=False, extract=False,
 
 @shared_task(bind=True, name='scans.tasks.create_from_url')
 def create_from_url(self, session_id, url, save_as=None, scan=False,
-                    extract=False,
-                    agent_pks=None, owner_id=None):
-    from scans.models.file import File, FileInfo
+                    extract=False, agent_pks=None, owner_id=None):
     from scans.models.session import Session
+    from scans.utils import download_url, create_ingested
     from core.models.system import System
     from agents.models import Agent
     from django.contrib.auth import get_user_model
@@ -268,125 +285,22 @@ def create_from_url(self, session_id, url, save_as=None, scan=False,
         analyze_progress=0
     )
 
-    try:
-        response = requests.head(url, allow_redirects=True)
-    except requests.exceptions.RequestException:
-        msg = 'There was an error downloading file.'
-        instance = File.objects.create(
-            user=owner, file=None, session=session,
-            display_name=url,
-            notes=msg, deleted=True
-        )
-        instance.file.delete(save=False)
-
-        Session.objects.filter(pk=session.pk).update(
-            total=1,
-            counter=1,
-            current_path=None,
-            analyze_progress=100
-        )
-        instance.update_scan_state()
-        if instance.parent:
-            instance.parent.update_scan_state()
-        instance.session.update_progress()
-        return
-
-    size = int(response.headers.get('content-length', 0))
-
+    # the size is enforced while the file is downloaded
     system_settings = System.get_settings()
-
-    max_file_size = system_settings['max_file_size']
-
-    size_not_allowed = max_file_size and not size <= max_file_size
-
-    if size_not_allowed:
-        msg = f'The uploaded file size exceeded {max_file_size}.'
-        info = FileInfo.objects.create(size=size)
-        instance = File.objects.create(
-            user=owner, file=None, info=info, session=session,
-            display_name=url,
-            notes=msg, deleted=True
-        )
-        instance.file.delete(save=False)
-        Session.objects.filter(pk=session.pk).update(
-            total=1,
-            counter=1,
-            current_path=None,
-            analyze_progress=100
-        )
-        instance.update_scan_state()
-        if instance.parent:
-            instance.parent.update_scan_state()
-        instance.session.update_progress()
-        return
-
-    try:
-        file = download_file(url, save_as)
-    except Exception as e:
-        msg = str(e)
-        instance = File.objects.create(
-            user=owner, file=None, session=session,
-            display_name=url,
-            notes=msg, deleted=True
-        )
-        Session.objects.filter(pk=session.pk).update(
-            total=1,
-            counter=1,
-            current_path=None,
-            analyze_progress=100
-        )
-        instance.file.delete(save=False)
-        instance.update_scan_state()
-        if instance.parent:
-            instance.parent.update_scan_state()
-        instance.session.update_progress()
-        return
-
-    allowed_mimetypes = system_settings['mimetypes']
-    mimetype = discover_mimetype(file)
-    mimetype_not_allowed = allowed_mimetypes and mimetype not in \
-                           system_settings['mimetypes']
-
-    if mimetype_not_allowed:
-        msg = f'The Uploaded file mimetype {mimetype} is not valid.'
-        with transaction.atomic():
-            info = FileInfo.objects.create(size=file.size, mimetype=mimetype)
-            instance = File.objects.create(
-                user=owner, file=file, session=session, info=info,
-                display_name=file.name,
-                notes=msg, deleted=True
-            )
-            instance.file.delete(save=False)
-            Session.objects.filter(pk=session.pk).update(
-                total=1,
-                counter=1,
-                current_path=None,
-                analyze_progress=100
-            )
-            instance.file.delete(save=False)
-            instance.update_scan_state()
-            if instance.parent:
-                instance.parent.update_scan_state()
-            instance.session.update_progress()
-            return
-
-    info = FileInfo.objects.create(size=file.size, mimetype=mimetype)
-    instance = File.objects.create(
-        user=owner, file=file, display_name=file.name, info=info,
-        session=session, valid=True
-    )
+    record = download_url(url, save_as=save_as, owner=owner,
+                          allowed_mimetypes=system_settings['mimetypes'],
+                          max_file_size=system_settings['max_file_size'])
+    instance, = create_ingested([record], session, owner=owner)
     Session.objects.filter(pk=session.pk).update(
         total=1,
         counter=1,
         current_path=None,
         analyze_progress=100
     )
-    instance.file.delete(save=False)
-    instance.update_scan_state()
-    if instance.parent:
-        instance.parent.update_scan_state()
-    instance.session.update_progress()
-    instance.set_file_info()
+    if not instance.valid:
+        instance.session.update_progress()
+        return
+
     if scan:
         if agent_pks:
             agents = Agent.objects.filter(pk__in=agent_pks)
@@ -398,42 +312,70 @@ def create_from_url(self, session_id, url, save_as=None, scan=False,
         instance.extract()
 
 
+@shared_task(bind=True, name='scans.tasks.create_from_urls')
+def create_from_urls(self, session_id, urls, scan=False, extract=False,
+                     agent_pks=None, owner_id=None, concurrency=None):
+    """
+    Downloads urls into one session, at most concurrency of them at once.
+    """
+    from scans.models.session import Session
+    from scans.utils import download_url
+    from core.models.system import System
+    from agents.models import Agent
+    from django.contrib.auth import get_user_model
+
+    User = get_user_model()
+    owner = User.objects.get(pk=owner_id) if owner_id else None
+    session = Session.objects.get(pk=session_id)
+    reporter = ProgressReporter(self, session.pk, total=len(urls))
+    reporter.flush('Files are being downloaded...')
+
+    system_settings = System.get_settings()
+    agents = Agent.objects.filter(pk__in=agent_pks) if agent_pks else None
+    fetch = partial(download_url, owner=owner,
+                    allowed_mimetypes=system_settings['mimetypes'],
+                    max_file_size=system_settings['max_file_size'],
+                    check_archive=extract and not scan)
+    concurrency = min(concurrency or settings.DOWNLOAD_BULK_CONCURRENCY,
+                      settings.DOWNLOAD_BULK_CONCURRENCY)
+
+    return ingest_in_chunks(urls, fetch, session, reporter, concurrency,
+                            scan=scan, extract=extract, agents=agents,
+                            owner=owner)
+
+
 @shared_task(name='scans.tasks.set_file_info')
 def set_file_info(file_id):
     from scans.models.file import File, FileInfo
     with transaction.atomic():
         instance = File.objects.select_for_update().get(pk=file_id)
         if not instance.deleted:
-            file_info = discover_file_info(instance.file)
-            allow_extensions = mimetypes.guess_all_extensions(
-                instance.info.mimetype)
-            extension = os.path.splitext(instance.file.name)[1][1:].lower()
-
-            ext_match = True
-            if allow_extensions and extension not in allow_extensions:
-                ext_match = False
+            try:
+                file_info = hash_file(instance.file.path)
+            except NotImplementedError:
+                # storages without local paths are read through the storage
+                file_info = discover_file_info(instance.file)
             if instance.info:
-                instance.info.update(**file_info, extension=extension,
-                                     ext_match=ext_match)
+                file_info.update(get_extension_info(
+                    instance.file.name, instance.info.mimetype))
+                instance.info.update(**file_info)
             else:
-                if instance.info:
-                    instance.info.update(**file_info, extension=extension,
-                                         ext_match=ext_match)
-                else:
-                    info = FileInfo.objects.create(**file_info,
-                                                   extension=extension,
-                                                   ext_match=ext_match)
-                    instance.info = info
-                    instance.save(update_fields=['info'])
+                file_info.update(get_extension_info(instance.file.name, ''))
+                info = FileInfo.objects.create(**file_info)
+                instance.info = info
+                instance.save(update_fields=['info'])
 
 
 @shared_task(name='scans.tasks.extract_file')
 def extract_file(file_id):
     from scans.models.file import File, FileInfo
+    from scans.models.session import Session
+    from scans.utils import bulk_create
     from core.models.system import System
 
     with transaction.atomic():
-        instance = File.objects.select_for_update().get(pk=file_id)
+        instance = File.objects.select_for_update().select_related(
+            'session').get(pk=file_id)
         if instance.deleted:
             instance.update(notes='File has been deleted.')
             return []
@@ -446,45 +388,58 @@ def extract_file(file_id):
 
             print(
                 f'Extracting File (ID={file_id}) {instance.display_name}')
+            session = instance.session
+            budget = ExtractionBudget(size=session.extracted_size,
+                                      members=session.extracted_members)
+            storage = instance.file.storage
+            folder, filename = os.path.split(instance.file.name)
+            folder = os.path.join(
+                folder, '.'.join(['tmp', filename, str(uuid.uuid4())]))
+            members = []
             try:
-                extracted_path = extract_compressed_file_recursively(
-                    instance.file.path
-                )
+                for member in extract_archive(
+                        instance.file.path, storage, folder, budget,
+                        executor=get_extraction_executor()):
+                    members.append(member)
             except Exception as e:
+                for member in members:
+                    if isinstance(member, ExtractedMember):
+                        storage.delete(member.file)
                 instance.update(notes=str(e))
                 return []
+            finally:
+                Session.objects.filter(pk=session.pk).update(
+                    extracted_size=F('extracted_size') + (
+                            budget.size - session.extracted_size),
+                    extracted_members=F('extracted_members') + (
+                            budget.members - session.extracted_members)
+                )
 
-    system_settings = System.get_settings()
-    tree = System.walk_path_recursively(extracted_path)
+    allowed_mimetypes = System.get_settings()['mimetypes']
+    infos = bulk_create(FileInfo, [
+        FileInfo(**member.info) for member in members
+        if isinstance(member, ExtractedMember)
+    ])
+    infos = iter(infos)
     files = []
-    allowed_mimetypes = system_settings['mimetypes']
-
-    for item in tree:
-        with open(item, 'rb') as f:
-            f = FileWrapper(f)
-            mimetype = discover_mimetype(f)
-            mimetype_not_allowed = allowed_mimetypes and (
-                        mimetype not in allowed_mimetypes)
-            if mimetype_not_allowed:
-                msg = f'The Uploaded file mimetype {mimetype} is not valid.'
-                with transaction.atomic():
-                    info = FileInfo.objects.create(size=f.size,
-                                                   mimetype=mimetype)
-                    File.objects.create(
-                        session=instance.session,
-                        info=info,
-                        parent=instance,
-                        user=instance.user,
-                        file=None,
-                        display_name=os.path.split(f.name)[-1],
-                        notes=msg, deleted=True
-                    )
-                    continue
-            info = FileInfo.objects.create(size=f.size, mimetype=mimetype)
-            file = File(parent=instance, user=instance.user, valid=True,
-                        file=item, info=info, session=instance.session,
-                        display_name=os.path.split(f.name)[-1])
-            files.append(file)
+    for member in members:
+        if isinstance(member, SkippedMember):
+            values = {'deleted': True, 'progress': 100}
+        elif allowed_mimetypes and \
+                member.info['mimetype'] not in allowed_mimetypes:
+            storage.delete(member.file)
+            mimetype = member.info['mimetype']
+            values = {
+                'info': next(infos), 'deleted': True, 'progress': 100,
+                'notes': f'The Uploaded file mimetype {mimetype} is not valid.'
+            }
+        else:
+            values = {'info': next(infos), 'file': member.file, 'valid': True}
+        files.append(File(**{
+            'parent': instance, 'user': instance.user, 'session': session,
+            'display_name': member.name[:256], 'notes': member.notes,
+            **values
+        }))
 
     instances = []
     generator = iter(files)
@@ -493,60 +448,269 @@ def extract_file(file_id):
         items = list(islice(generator, batch_size))
         if not items:
             break
-        instances += File.objects.bulk_create(items, batch_size)
-    for child in instances:
-        child.set_file_info()
+        instances += bulk_create(File, items)
+    File.track_created(instances)
 
     return instances
 
 
-@shared_task(name='scans.tasks.perform_scan', soft_time_limit=60)
-def perform_scan(scan_id):
+def run_scan(instance):
+    """
+    Scans a private copy of the file of a scan on its agent, returns the
+    result to complete the scan with.
+    """
+    file = instance.file.file
+    try:
+        av = instance.agent.av
+        with av, file.storage.private_copy(file.name) as path:
+            stdout, scan_time, infected_num, threats = av.scan(path)
+    except ModuleNotFoundError as e:
+        return {'status_code': 404, 'error': str(e)}
+    except AVException as e:
+        return {'status_code': 498, 'error': str(e)}
+    except (TimeoutError, OSError, EOFError) as e:
+        return {'status_code': 499, 'error': str(e)}
+    return {'status_code': 200,
+            'stdout': stdout,
+            'scan_time': scan_time,
+            'infected_num': infected_num,
+            'threats': threats and threats[:512]}
+
+
+def get_slot_ttl(task):
+    """ Seconds a task may run, so the agent slot it holds outlives it """
+    time_limit, soft_time_limit = task.request.timelimit or (None, None)
+    if time_limit:
+        return time_limit
+    soft_time_limit = soft_time_limit or task.soft_time_limit
+    return soft_time_limit and soft_time_limit + settings.SCAN_TIMEOUT_GRACE
+
+
+def fail_busy(scans, retries):
+    """ Fails the scans of an agent which stayed busy through the retries """
+    for instance in scans:
+        if instance.complete(status_code=499, error=f'Agent was busy for '
+                                                    f'{retries} retries'):
+            instance.log()
+            instance.resolve_waiters()
+
+
+@shared_task(bind=True, name='scans.tasks.perform_scan', soft_time_limit=60)
+def perform_scan(self, scan_id, coalesce=True):
     from scans.models.scan import Scan
 
     logger.info(f'Starting to scan ID {scan_id}')
 
-    instance = Scan.objects.select_related('file').get(pk=scan_id)
+    instance = Scan.objects.select_related(
+        'file', 'file__info', 'file__session', 'agent').get(pk=scan_id)
 
+    if instance.status_code is not None:
+        # e.g. skipped once the verdict of its file was decided
+        logger.info(f'Scan ID {scan_id} is already complete')
+        return
+
+    if coalesce and instance.attach_to_leader():
+        logger.info(f'Scan ID {scan_id} is waiting for in-flight scan ID '
+                    f'{instance.leader_id}')
+        return
+
+    limiter = breaker = None
+    if not self.request.called_directly and instance.agent_id:
+        breaker = CircuitBreaker(instance.agent_id)
+        if not breaker.allow():
+            logger.info(f'Scan ID {scan_id} is parked, its agent is down')
+            Scan.objects.filter(pk=scan_id).park()
+            return
+        limiter = ConcurrencyLimiter(instance.agent_id)
+        if not limiter.acquire(get_slot_ttl(self)):
+            max_retries = settings.AGENT_CONCURRENCY_MAX_RETRIES
+            if self.request.retries >= max_retries:
+                fail_busy([instance], self.request.retries)
+                return
+            # the agent is busy, the worker goes on with other agents, the
+            # task is published again with the priority it aged to since its
+            # scan was enqueued
+            countdown = get_retry_countdown(self.request.retries)
+            priority = instance.file.session.get_priority(instance.created_at)
+            raise self.retry(countdown=countdown,
+                             max_retries=max_retries,
+                             priority=priority,
+                             session_id=instance.file.session_id,
+                             agent_id=instance.agent_id)
+
+    if not self.request.called_directly:
+        # failed by the sweep if the worker is killed at the hard limit
+        Scan.objects.filter(pk=scan_id).start(get_slot_ttl(self))
+
+    # only scans which reached the engine adjust the limit of the agent
+    engine_called = False
     try:
         if instance.file.file:
-            try:
-                stdout, scan_time, infected_num, threats = instance.agent.av.scan(
-                    instance.file.file.path)
-                instance.update(status_code=200,
-                                stdout=stdout,
-                                scan_time=scan_time,
-                                infected_num=infected_num)
-            except ModuleNotFoundError as e:
-                instance.update(status_code=404,
-                                error=str(e))
-            except AVException as e:
-                instance.update(status_code=498,
-                                error=str(e))
-            except (TimeoutError, OSError, EOFError) as e:
-                instance.update(status_code=499,
-                                error=str(e))
-
+            verdict = instance.get_cached_verdict()
+            if verdict:
+                logger.info(f'Scan ID {scan_id} verdict served from cache')
+                instance.complete(**verdict)
+                return
+            engine_called = True
+            result = run_scan(instance)
+            engine_called = result['status_code'] != 404
+            instance.complete(**result)
+            instance.cache_verdict()
         else:
-            instance.update(status_code=499,
-                            error='Source file does not exist')
+            instance.complete(status_code=499,
+                              error='Source file does not exist')
 
     except SoftTimeLimitExceeded as e:
         logger.info(f'Job of scan ID {scan_id} timed out.')
-        instance.update(status_code=499,
-                        error=str(e))
+        instance.complete(status_code=499,
+                          error=str(e))
     finally:
-        instance.file.update_scan_state()
-        if instance.file.parent:
-            instance.file.parent.update_scan_state()
-        instance.file.session.update_progress()
         instance.log()
+        instance.resolve_waiters()
+        if limiter:
+            error = engine_called and instance.status_code == 499
+            limiter.release(
+                scan_time=instance.scan_time if engine_called else None,
+                error=error)
+            if engine_called:
+                record_agent_result(breaker, instance.status_code)
+
+
+def record_agent_result(breaker, status_code):
+    """ Feeds the result of a scan to the circuit breaker of its agent """
+    from scans.models.scan import Scan
+
+    if status_code == 499:
+        if breaker.record_failure():
+            logger.warning(f'Agent {breaker.agent_id} is down, its scans '
+                           f'are parked')
+    elif status_code == 200 and breaker.record_success():
+        logger.info(f'Agent {breaker.agent_id} recovered')
+        Scan.objects.filter(agent_id=breaker.agent_id).resume_parked()
+
+
+@shared_task(bind=True, name='scans.tasks.perform_scan_batch',
+             soft_time_limit=300)
+def perform_scan_batch(self, scan_ids, coalesce=True):
+    """
+    Scans the files of scans of one agent in one run of its engine. A file
+    the output has no result for is scanned on its own, as are all of them
+    if the engine fails on the batch.
+    """
+    from scans.models.scan import Scan
+
+    logger.info(f'Starting to scan IDs {scan_ids} in a batch')
+
+    scans = list(Scan.objects.select_related(
+        'file', 'file__info', 'file__session', 'agent').filter(
+        pk__in=scan_ids, status_code=None, leader=None))
+    if not scans:
+        return
+
+    limiter = breaker = None
+    if not self.request.called_directly and scans[0].agent_id:
+        breaker = CircuitBreaker(scans[0].agent_id)
+        if not breaker.allow():
+            Scan.objects.filter(pk__in=scan_ids).park()
+            return
+        limiter = ConcurrencyLimiter(scans[0].agent_id)
+        if not limiter.acquire(get_slot_ttl(self)):
+            max_retries = settings.AGENT_CONCURRENCY_MAX_RETRIES
+            if self.request.retries >= max_retries:
+                fail_busy(scans, self.request.retries)
+                return
+            countdown = get_retry_countdown(self.request.retries)
+            priority = scans[0].file.session.get_priority(
+                min(scan.created_at for scan in scans))
+            raise self.retry(countdown=countdown,
+                             max_retries=max_retries,
+                             priority=priority,
+                             session_id=scans[0].file.session_id,
+                             agent_id=scans[0].agent_id)
+
+    pending = {}
+    fallback = []
+    for instance in scans:
+        if coalesce and instance.attach_to_leader():
+            continue
+        if not instance.file.file:
+            fallback.append(instance)
+            continue
+        verdict = instance.get_cached_verdict()
+        if verdict:
+            instance.complete(**verdict)
+            instance.log()
+            instance.resolve_waiters()
+            continue
+        pending[instance.file.file.name] = instance
+
+    if len(pending) == 1:
+        fallback += pending.values()
+        pending = {}
+    if pending and not self.request.called_directly:
+        Scan.objects.filter(pk__in=[instance.pk for instance in
+                                    pending.values()]).start(
+            get_slot_ttl(self))
+
+    scan_time = None
+    error = False
+    try:
+        if pending:
+            storage = scans[0].file.file.storage
+            av = scans[0].agent.av
+            with av, ExitStack() as copies:
+                names = {copies.enter_context(storage.private_copy(name)):
+                         name for name in pending}
+                stdout, batch_time, results = av.scan_batch(list(names))
+            results = {names[path]: result
+                       for path, result in results.items()}
+            scan_time = batch_time / len(pending)
+            for name, instance in pending.items():
+                if name not in results:
+                    fallback.append(instance)
+                    continue
+                file_stdout, infected_num, threats = results[name]
+                instance.complete(status_code=200,
+                                  stdout=file_stdout,
+                                  scan_time=scan_time,
+                                  infected_num=infected_num,
+                                  threats=threats and threats[:512])
+                instance.cache_verdict()
+    except ModuleNotFoundError as e:
+        for instance in pending.values():
+            instance.complete(status_code=404, error=str(e))
+    except AVException as e:
+        logger.info(f'Batch of scan IDs {scan_ids} failed, scanning the '
+                    f'files one by one: {e}')
+        fallback += [instance for instance in pending.values()
+                     if instance.status_code is None]
+    except (TimeoutError, OSError, EOFError, SoftTimeLimitExceeded) as e:
+        error = True
+        for instance in pending.values():
+            instance.complete(status_code=499, error=str(e))
+    finally:
+        for instance in pending.values():
+            if instance not in fallback:
+                instance.log()
+                instance.resolve_waiters()
+        if limiter:
+            limiter.release(scan_time=scan_time, error=error)
+            if error or scan_time is not None:
+                record_agent_result(breaker, 499 if error else 200)
+
+    # started again by their own runs
+    Scan.objects.filter(pk__in=[instance.pk for instance in fallback]) \
+        .update(expires_at=None)
+    for instance in fallback:
+        instance.perform(_async=not self.request.called_directly,
+                         coalesce=False)
 
 
 @shared_task(name='scans.tasks.scan_file')
 def scan_file(file_id, _async=True, extract=False, agent_pks=None):
     from scans.models.file import File
     from scans.models.scan import Scan
+    from scans.utils import bulk_create
     from agents.models import Agent
 
     instance = File.objects.get(pk=file_id)
@@ -555,6 +719,8 @@ def scan_file(file_id, _async=True, extract=False, agent_pks=None):
         children = instance.children.all()
         if not children.exists():
             children = extract_file(file_id)
+        # skipped and rejected members are not scanned
+        children = [child for child in children if child.valid]
 
         if children:
             files_to_scan = children
@@ -573,6 +739,7 @@ def scan_file(file_id, _async=True, extract=False, agent_pks=None):
 
     if files_to_scan:
         agents_exist = queryset.count()
+        pending = []
 
         for file_to_scan in files_to_scan:
             if file_to_scan.deleted or not file_to_scan.valid:
@@ -584,19 +751,25 @@ def scan_file(file_id, _async=True, extract=False, agent_pks=None):
                                 av_name=agent.av_name)
                     scans.append(scan)
 
-                scan_instances = Scan.objects.bulk_create(scans)
+                with transaction.atomic():
+                    scan_instances = bulk_create(Scan, scans)
+                    File.objects.filter(pk=file_to_scan.pk).update(
+                        scans_total=F('scans_total') + len(scan_instances))
                 file_to_scan.update_scan_state()
-                instance.session.update_progress()
-
-                for scan in scan_instances:
-                    scan.perform(_async=_async)
+                pending += scan_instances
             else:
-                File.objects.filter(pk=instance.pk).update(progress=100,
-                                                           notes='No scanner found')
-                instance.session.update_progress()
+                file_to_scan.mark_scanned(notes='No scanner found')
+
+        Scan.perform_many(pending, _async=_async)
     else:
-        File.objects.filter(pk=instance.pk).update(progress=100)
-        instance.session.update_progress()
+        instance.mark_scanned()
+
+
+@shared_task(name='scans.tasks.scan_files')
+def scan_files(file_ids, _async=True, extract=False, agent_pks=None):
+    for file_id in file_ids:
+        scan_file(file_id, _async=_async, extract=extract,
+                  agent_pks=agent_pks)
 
 
 @shared_task(bind=True, name='scans.tasks.postscan_print')
@@ -692,32 +865,15 @@ def postscan_copy(self, session_id, path):
 
     print(f'Starting to copy {count} files to {dst_dir}')
 
+    reporter = ProgressReporter(self, total=count)
     for file in clean_files:
-        counter += 1
         dst_path = os.path.join(dst_dir, file.display_name or
                                 os.path.split(file.file.path)[-1])
         shutil.copyfile(file.file.path, dst_path)
         print(f'Copied {file.file.path} to {dst_path}')
+        reporter.update(file.file.path)
 
-        self.update_state(
-            state='PROGRESS',
-            meta={
-                'total': count,
-                'counter': counter,
-                'current_path': file.file.path,
-                'progress': round(100 * counter / count, 1)
-            }
-        )
-
-    self.update_state(
-        state='PROGRESS',
-        meta={
-            'total': count,
-            'counter': counter,
-            'current_path': _('Finishing copy ...'),
-            'progress': round(100 * counter / count, 1)
-        }
-    )
+    reporter.flush(_('Finishing copy ...'))
     System.unmount(devname)
     # System.mount(devname, path)
 
@@ -778,22 +934,15 @@ def postscan_ftp(self, session_id):
     print(f'Starting to copy {count} files to FTP host {ftp_host}')
 
     try:
-        for file in clean_files:
-            f = open(file.file.path, 'rb')
-            file_name = file.display_name or os.path.split(file.file.path)[-1]
-            ftp.storbinary(f"STOR {file_name}", f)
-            f.close()
-            counter += 1
-            self.update_state(
-                state='PROGRESS',
-                meta={
-                    'total': count,
-                    'counter': counter,
-                    'current_path': file.file.path,
-                    'progress': round(100 * counter / count, 1)
-                }
-            )
-            print(f'Copied {file.file.path} to {ftp.pwd()}/{file_name}')
+        with ProgressReporter(self, total=count) as reporter:
+            for file in clean_files:
+                f = open(file.file.path, 'rb')
+                file_name = file.display_name or \
+                    os.path.split(file.file.path)[-1]
+                ftp.storbinary(f"STOR {file_name}", f)
+                f.close()
+                reporter.update(file.file.path)
+                print(f'Copied {file.file.path} to {ftp.pwd()}/{file_name}')
     finally:
         ftp.quit()
 
@@ -849,21 +998,13 @@ def postscan_sftp(self, session_id):
     print(f'Starting to copy {count} files to SFTP host {sftp_host}')
 
     try:
-        for file in clean_files:
-            file_name = file.display_name or os.path.split(file.file.path)[-1]
-            sftp.put(localpath=file.file.path, remotepath=file_name)
-
-            counter += 1
-            self.update_state(
-                state='PROGRESS',
-                meta={
-                    'total': count,
-                    'counter': counter,
-                    'current_path': file.file.path,
-                    'progress': round(100 * counter / count, 1)
-                }
-            )
-            print(f'Copied {file.file.path} to {sftp.getcwd()}/{file_name}')
+        with ProgressReporter(self, total=count) as reporter:
+            for file in clean_files:
+                file_name = file.display_name or \
+                    os.path.split(file.file.path)[-1]
+                sftp.put(localpath=file.file.path, remotepath=file_name)
+                reporter.update(file.file.path)
+                print(f'Copied {file.file.path} to {sftp.getcwd()}/{file_name}')
     finally:
         sftp.close()
 
@@ -918,28 +1059,29 @@ def postscan_webdav(self, session_id, username=None, password=None):
         client.mkdir(directory)
     print(
         f'Starting to copy {count} files to WebDav host {options["webdav_hostname"]}')
-    for file in clean_files:
-        file_name = file.display_name or os.path.split(file.file.path)[-1]
-        client.upload_file(remote_path=f'{directory}/{file_name}',
-                           local_path=file.file.path)
-
-        counter += 1
-        self.update_state(
-            state='PROGRESS',
-            meta={
-                'total': count,
-                'counter': counter,
-                'current_path': file.file.path,
-                'progress': round(100 * counter / count, 1)
-            }
-        )
-        print(f'Copied {file.file.path} to {directory}/{file_name}')
+    with ProgressReporter(self, total=count) as reporter:
+        for file in clean_files:
+            file_name = file.display_name or os.path.split(file.file.path)[-1]
+            client.upload_file(remote_path=f'{directory}/{file_name}',
+                               local_path=file.file.path)
+            reporter.update(file.file.path)
+            print(f'Copied {file.file.path} to {directory}/{file_name}')
 
 
 @shared_task(name='scans.tasks.cleanup')
 def cleanup(days_older_than):
     from scans.models.file import File
+    from scans.models.scan import Scan
+    from scans.models.upload import Upload
     File.objects.cleanup_disk(days_older_than)
+    File._meta.get_field('file').storage.delete_copies(
+        days_older_than * 24 * 60 * 60)
+    Scan.objects.all().fail_expired()
+    # abandoned uploads, their spool files are deleted with them
+    Upload.objects.filter(
+        file=None,
+        modified_at__lt=timezone.now() - timedelta(days=days_older_than)
+    ).delete()
 
 
 @shared_task
@@ -1053,7 +1195,8 @@ def scan_path(path, av_name, host):
     from scans.backends import Scanner
     try:
         scanner = Scanner(av_name, host, 18811)
-        stdout, scan_time, infected_num, threats = scanner.av.scan(path)
+        with scanner.av as av:
+            stdout, scan_time, infected_num, threats = av.scan(path)
         return {
             'path': path,
             'status_code': 200,
@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from datetime import timedelta
+
+from celery.result import AsyncResult
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models.system import System
+from scans.models.session import Session
+from scans.models.file import File
+from scans.tasks import bulk_create_from_disk
+
+
+@patch.object(bulk_create_from_disk, 'update_state')
+@patch('core.mixins.AsyncMixin.perform_async',
+       return_value=AsyncResult('test'))
+class BulkCreateFromDisk(TestCase):
+
+    def setUp(self):
+        System.reset_settings()
+        self.path = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.path, 'nested', 'deeper'))
+        for name in ('a.txt', 'nested/b.txt', 'nested/deeper/c.txt'):
+            with open(os.path.join(self.path, name), 'w') as f:
+                f.write(f'content of {name}')
+        self.session = Session.objects.create(source='disk')
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+        for instance in File.objects.exclude(file=None).exclude(file=''):
+            instance.file.delete(save=False)
+
+    def test_ok(self, perform_async, update_state):
+        paths = [self.path, os.path.join(self.path, 'nested'),
+                 '/nonexistent/missing.txt']
+        result = bulk_create_from_disk(self.session.pk, paths, scan=True)
+
+        self.assertEqual(result['total'], 4)
+        self.assertEqual(result['counter'], 4)
+        files = File.objects.filter(session=self.session)
+        self.assertEqual(files.count(), 4)
+        self.assertEqual(files.filter(valid=True).count(), 3)
+        self.assertEqual(files.filter(deleted=True).count(), 1)
+        for instance in files.filter(valid=True):
+            self.assertEqual(instance.info.mimetype, 'text/plain')
+            self.assertEqual(len(instance.info.sha256), 64)
+        self.assertEqual(perform_async.call_count, 1)
+
+    def test_empty(self, perform_async, update_state):
+        result = bulk_create_from_disk(self.session.pk, [])
+        self.assertEqual(result['progress'], 100)
+        perform_async.assert_not_called()
+
+    def test_risk_order(self, perform_async, update_state):
+        for name in ('setup.exe', 'macro.doc', 'archive.zip'):
+            with open(os.path.join(self.path, name), 'w') as f:
+                f.write(f'content of {name}')
+        Session.objects.filter(pk=self.session.pk).update(
+            deadline=timezone.now() + timedelta(minutes=1))
+        bulk_create_from_disk(self.session.pk, [self.path])
+        names = list(File.objects.filter(session=self.session).order_by(
+            'pk').values_list('display_name', flat=True))
+        self.assertEqual(names[:3], ['setup.exe', 'macro.doc', 'archive.zip'])
+        self.assertEqual(len(names), 6)
+
+    def test_deadline_passed(self, perform_async, update_state):
+        Session.objects.filter(pk=self.session.pk).update(
+            deadline=timezone.now())
+        result = bulk_create_from_disk(self.session.pk, [self.path],
+                                       scan=True)
+        self.assertEqual(result['counter'], 3)
+        files = File.objects.filter(session=self.session)
+        self.assertFalse(files.filter(valid=True).exists())
+        self.assertEqual(files.filter(
+            notes='Not scanned within the time budget').count(), 3)
+        perform_async.assert_not_called()
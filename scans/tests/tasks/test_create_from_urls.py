@@ -0,0 +1,86 @@
+import hashlib
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from celery.result import AsyncResult
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.test import TestCase, override_settings
+
+from core.models.system import System
+from core.utils.downloads import DownloadError, DownloadTooLarge
+from core.utils.files import generate_photo_file
+from scans.models.file import File
+from scans.models.session import Session
+from scans.tasks import create_from_url, create_from_urls
+
+CONTENT = generate_photo_file().read()
+
+
+def fake_download(url, save_as=None, max_size=None, **kwargs):
+    if 'large' in url:
+        raise DownloadTooLarge(max_size, 10 ** 9)
+    if 'down' in url:
+        raise DownloadError('There was an error downloading file.')
+    file = TemporaryUploadedFile(save_as or url.split('/')[-1], None, 0,
+                                 None)
+    file.write(CONTENT)
+    file.seek(0)
+    file.size = len(CONTENT)
+    file.file_info = {'size': len(CONTENT), 'mimetype': 'image/png',
+                      'md5': hashlib.md5(CONTENT).hexdigest(),
+                      'sha1': hashlib.sha1(CONTENT).hexdigest(),
+                      'sha256': hashlib.sha256(CONTENT).hexdigest()}
+    return file
+
+
+@patch.object(create_from_urls, 'update_state')
+@patch('scans.utils.download', side_effect=fake_download)
+@patch('core.mixins.AsyncMixin.perform_async',
+       return_value=AsyncResult('test'))
+class CreateFromUrls(TestCase):
+
+    def setUp(self):
+        System.reset_settings()
+        self.session = Session.objects.create(source='url')
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_ok(self, perform_async, download, update_state):
+        urls = ['http://a/one.png', 'http://a/large', 'http://a/down',
+                'http://b/two.png']
+        meta = create_from_urls(self.session.pk, urls, scan=True,
+                                concurrency=2)
+        self.assertEqual(meta['counter'], 4)
+
+        files = {file.display_name: file
+                 for file in File.objects.filter(session=self.session)}
+        self.assertEqual(len(files), 4)
+        self.assertTrue(files['one.png'].valid)
+        self.assertEqual(files['two.png'].file.read(), CONTENT)
+        self.assertEqual(files['two.png'].info.sha256,
+                         hashlib.sha256(CONTENT).hexdigest())
+        self.assertTrue(files['http://a/large'].deleted)
+        self.assertEqual(files['http://a/large'].info.size, 10 ** 9)
+        self.assertEqual(files['http://a/down'].notes,
+                         'There was an error downloading file.')
+
+        # the valid files are scanned together
+        perform_async.assert_called_once()
+        self.assertEqual(
+            sorted(perform_async.call_args[0][0].args[0]),
+            sorted([files['one.png'].pk, files['two.png'].pk]))
+
+    def test_create_from_url(self, perform_async, download, update_state):
+        create_from_url(self.session.pk, 'http://a/one.png', save_as='x.png',
+                        scan=True)
+        file = File.objects.get(session=self.session)
+        self.assertTrue(file.valid)
+        self.assertEqual(file.display_name, 'x.png')
+        self.assertEqual(file.file.read(), CONTENT)
+        perform_async.assert_called_once()
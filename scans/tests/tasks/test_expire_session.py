@@ -0,0 +1,32 @@
+from django.test import TestCase
+
+from agents.models import Agent
+from core.models.system import System
+from scans.models.file import File, FileInfo
+from scans.models.scan import Scan
+from scans.models.session import Session
+from scans.tasks import expire_session
+
+
+class ExpireSession(TestCase):
+
+    def setUp(self):
+        System.reset_settings()
+        self.session = Session.objects.create(source='disk')
+        agent = Agent.objects.create(api_ip='192.168.100.158',
+                                     av_name='clamav')
+        for scan_status in (200, None):
+            file = File.objects.create(session=self.session, valid=True,
+                                       info=FileInfo.objects.create(),
+                                       scans_total=1)
+            File.track_created([file])
+            Scan.objects.create(agent=agent, file=file, av_name='clamav',
+                                status_code=scan_status)
+
+    def test_ok(self):
+        self.assertEqual(expire_session(self.session.pk), 1)
+        scan = Scan.objects.get(status_code=408)
+        self.assertEqual(scan.error, 'Not scanned within the time budget')
+        self.assertEqual(scan.file.progress, 100)
+        self.assertIsNone(scan.file.infected)
+        self.assertEqual(expire_session(self.session.pk), 0)
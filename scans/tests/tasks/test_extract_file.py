@@ -0,0 +1,45 @@
+import io
+import zipfile
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from scans.models.session import Session
+from scans.models.file import File, FileInfo
+from scans.tasks import extract_file
+from core.models.system import System
+
+
+@override_settings(EXTRACT_MAX_SIZE=0, EXTRACT_MAX_MEMBERS=0,
+                   EXTRACT_MAX_RATIO=100, EXTRACT_MAX_DEPTH=5)
+class ExtractFile(TestCase):
+
+    def setUp(self):
+        System.reset_settings()
+        content = io.BytesIO()
+        with zipfile.ZipFile(content, 'w', zipfile.ZIP_DEFLATED) as f:
+            f.writestr('clean.txt', b'Some file content')
+            f.writestr('bomb.txt', b'0' * 1000000)
+        self.session = Session.objects.create()
+        self.file = File.objects.create(
+            file=ContentFile(content.getvalue(), name='archive.zip'),
+            session=self.session, info=FileInfo.objects.create(), valid=True)
+
+    def tearDown(self):
+        for file in File.objects.exclude(file=None).exclude(file=''):
+            file.file.delete(save=False)
+
+    def test_budget(self):
+        children = extract_file(self.file.pk)
+        valid, skipped = sorted(children, key=lambda child: not child.valid)
+        self.assertEqual(valid.display_name, 'clean.txt')
+        self.assertEqual(valid.info.size, 17)
+        self.assertTrue(valid.info.sha256)
+        self.assertTrue(skipped.deleted)
+        self.assertIn('Compression ratio', skipped.notes)
+
+        self.file.refresh_from_db()
+        self.session.refresh_from_db()
+        self.assertEqual(self.file.children_total, 1)
+        self.assertEqual(self.session.extracted_members, 1)
+        self.assertEqual(self.session.extracted_size, 17)
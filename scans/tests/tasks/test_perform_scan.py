@@ -0,0 +1,232 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from scans.models.session import Session
+from scans.models.file import File, FileInfo
+from scans.models.scan import Scan
+from scans.tasks import perform_scan
+from agents.models import Agent
+from core.models.system import System
+
+SHA256 = 'a' * 64
+
+
+@override_settings(VERDICT_CACHE_TTL=60)
+class VerdictCache(TestCase):
+
+    def setUp(self):
+        System.reset_settings()
+        caches['verdicts'].clear()
+        session = Session.objects.create()
+        info = FileInfo.objects.create(sha256=SHA256)
+        self.agent = Agent.objects.create(
+            api_ip='192.168.100.158', av_name='clamav',
+            status={'status_code': 200, 'version': '0.103',
+                    'last_update': '2022-02-12 10:00:00'})
+        self.file = File.objects.create(
+            file=ContentFile(b'Some file content', name='test.pdf'),
+            session=session, info=info, valid=True)
+
+    def scan(self, file):
+        scan = Scan.objects.create(agent=self.agent, file=file,
+                                   av_name=self.agent.av_name)
+        perform_scan(scan.pk)
+        scan.refresh_from_db()
+        return scan
+
+    @patch('agents.models.Agent.get_av')
+    def test_hit(self, get_av):
+        get_av.return_value.scan.return_value = (
+            'Infected files: 1', 1.5, 1, 'Eicar-Signature')
+        first = self.scan(self.file)
+        self.assertEqual(get_av.call_count, 1)
+
+        second = self.scan(File.objects.create(
+            file=ContentFile(b'Some file content', name='copy.pdf'),
+            session=self.file.session, info=self.file.info, valid=True))
+        self.assertEqual(get_av.call_count, 1)
+        for field in ('status_code', 'stdout', 'infected_num', 'threats'):
+            self.assertEqual(getattr(second, field), getattr(first, field))
+
+    @patch('agents.models.Agent.get_av')
+    def test_signature_change(self, get_av):
+        get_av.return_value.scan.return_value = ('OK', 1.5, 0, None)
+        self.scan(self.file)
+        Agent.objects.filter(pk=self.agent.pk).update(status={
+            'status_code': 200, 'version': '0.103',
+            'last_update': '2022-02-13 10:00:00'})
+        self.agent.refresh_from_db()
+        self.scan(File.objects.create(
+            file=ContentFile(b'Some file content', name='copy.pdf'),
+            session=self.file.session, info=self.file.info, valid=True))
+        self.assertEqual(get_av.call_count, 2)
+
+
+@override_settings(VERDICT_CACHE_TTL=0)
+class Coalescing(TestCase):
+
+    def setUp(self):
+        System.reset_settings()
+        info = FileInfo.objects.create(sha256=SHA256)
+        self.agent = Agent.objects.create(api_ip='192.168.100.158',
+                                          av_name='clamav')
+        self.scans = []
+        for name in ('first.pdf', 'second.pdf'):
+            file = File.objects.create(
+                file=ContentFile(b'Some file content', name=name),
+                session=Session.objects.create(), info=info, valid=True,
+                scans_total=1)
+            self.scans.append(Scan.objects.create(
+                agent=self.agent, file=file, av_name=self.agent.av_name))
+
+    @patch('agents.models.Agent.get_av')
+    def test_waiter_receives_result(self, get_av):
+        get_av.return_value.scan.return_value = (
+            'Infected files: 1', 1.5, 1, 'Eicar-Signature')
+        leader, waiter = self.scans
+        # a worker runs the leader
+        Scan.objects.filter(pk=leader.pk).start(60)
+
+        perform_scan(waiter.pk)
+        waiter.refresh_from_db()
+        self.assertEqual(waiter.leader, leader)
+        self.assertIsNone(waiter.status_code)
+
+        perform_scan(leader.pk)
+        waiter.refresh_from_db()
+        self.assertEqual(get_av.call_count, 1)
+        self.assertEqual(waiter.status_code, 200)
+        self.assertEqual(waiter.infected_num, 1)
+        self.assertTrue(waiter.file.infected)
+        self.assertEqual(waiter.file.progress, 100)
+
+    @patch('agents.models.Agent.get_av')
+    def test_queued_leader(self, get_av):
+        get_av.return_value.scan.return_value = ('OK', 1.5, 0, None)
+        perform_scan(self.scans[1].pk)
+        self.assertEqual(get_av.call_count, 1)
+        self.assertEqual(Scan.objects.get(pk=self.scans[1].pk).status_code,
+                         200)
+
+    @patch('scans.models.scan.Scan.perform')
+    def test_waiters_of_dead_leader(self, perform):
+        leader, waiter = self.scans
+        Scan.objects.filter(pk=leader.pk).start(-1)
+        Scan.objects.filter(pk=waiter.pk).update(leader=leader)
+
+        self.assertEqual(Scan.objects.all().fail_expired(), [leader.pk])
+        waiter.refresh_from_db()
+        self.assertIsNone(waiter.status_code)
+        self.assertIsNone(waiter.leader)
+        perform.assert_called_once_with(coalesce=False)
+
+    @patch('scans.models.scan.Scan.perform')
+    def test_waiters_of_leader_died_after_result(self, perform):
+        leader, waiter = self.scans
+        Scan.objects.filter(pk=leader.pk).update(
+            status_code=200, modified_at=timezone.now() - timedelta(hours=1))
+        Scan.objects.filter(pk=waiter.pk).update(leader=leader)
+
+        Scan.objects.all().fail_expired()
+        waiter.refresh_from_db()
+        self.assertIsNone(waiter.leader)
+        perform.assert_called_once_with(coalesce=False)
+
+    @patch('agents.models.Agent.get_av')
+    def test_not_coalesced(self, get_av):
+        get_av.return_value.scan.return_value = ('OK', 1.5, 0, None)
+        perform_scan(self.scans[1].pk, coalesce=False)
+        self.assertEqual(get_av.call_count, 1)
+
+
+class Routing(TestCase):
+
+    def setUp(self):
+        self.agent = Agent.objects.create(api_ip='192.168.100.158',
+                                          av_name='clamav')
+        file = File.objects.create(
+            file=ContentFile(b'Some file content', name='test.pdf'),
+            session=Session.objects.create(), valid=True)
+        self.scan = Scan.objects.create(agent=self.agent, file=file,
+                                        av_name=self.agent.av_name)
+
+    @patch('core.mixins.AsyncMixin.perform_async')
+    def test_agent_queue(self, perform_async):
+        self.scan.perform()
+        self.assertEqual(perform_async.call_args.kwargs['queue'],
+                         self.agent.queue_name)
+
+    @override_settings(AGENT_QUEUES=False)
+    @patch('core.mixins.AsyncMixin.perform_async')
+    def test_default_queue(self, perform_async):
+        self.scan.perform()
+        self.assertIsNone(perform_async.call_args.kwargs['queue'])
+
+
+@override_settings(AGENT_CONCURRENCY_MAX_RETRIES=3)
+@patch('scans.tasks.CircuitBreaker.allow', return_value=True)
+@patch('scans.tasks.ConcurrencyLimiter.acquire', return_value=False)
+class BusyAgent(TestCase):
+
+    def setUp(self):
+        System.reset_settings()
+        agent = Agent.objects.create(api_ip='192.168.100.158',
+                                     av_name='clamav')
+        file = File.objects.create(
+            file=ContentFile(b'Some file content', name='test.pdf'),
+            session=Session.objects.create(), info=FileInfo.objects.create(),
+            valid=True)
+        self.scan = Scan.objects.create(agent=agent, file=file,
+                                        av_name=agent.av_name)
+
+    @patch('scans.tasks.perform_scan.retry', side_effect=Exception('retry'))
+    def test_retried_with_backoff(self, retry, acquire, allow):
+        with self.assertRaisesMessage(Exception, 'retry'):
+            perform_scan.apply((self.scan.pk,), retries=2, throw=True)
+        self.assertEqual(retry.call_args[1]['countdown'], 8)
+        self.assertEqual(retry.call_args[1]['max_retries'], 3)
+        # the slot outlives the time limit of the task
+        self.assertGreaterEqual(acquire.call_args[0][0], 60)
+
+    def test_failed_after_retries(self, acquire, allow):
+        perform_scan.apply((self.scan.pk,), retries=3, throw=True)
+        self.scan.refresh_from_db()
+        self.assertEqual(self.scan.status_code, 499)
+        self.assertEqual(self.scan.error, 'Agent was busy for 3 retries')
+
+
+@patch('scans.tasks.ConcurrencyLimiter')
+@patch('scans.tasks.CircuitBreaker')
+class AgentFeedback(TestCase):
+
+    def setUp(self):
+        System.reset_settings()
+        agent = Agent.objects.create(api_ip='192.168.100.158',
+                                     av_name='clamav')
+        self.file = File.objects.create(
+            session=Session.objects.create(), info=FileInfo.objects.create(),
+            valid=True)
+        self.scan = Scan.objects.create(agent=agent, file=self.file,
+                                        av_name=agent.av_name)
+
+    def test_missing_file_is_not_an_agent_failure(self, breaker, limiter):
+        perform_scan.apply((self.scan.pk,), throw=True)
+        self.scan.refresh_from_db()
+        self.assertEqual(self.scan.error, 'Source file does not exist')
+        breaker.return_value.record_failure.assert_not_called()
+
+    @patch('scans.models.scan.Scan.get_cached_verdict',
+           return_value={'status_code': 200, 'infected_num': 0})
+    def test_cached_verdict_is_not_an_agent_success(self, verdict, breaker,
+                                                    limiter):
+        self.file.file = ContentFile(b'Some file content', name='test.pdf')
+        self.file.save()
+        perform_scan.apply((self.scan.pk,), throw=True)
+        self.scan.refresh_from_db()
+        self.assertEqual(self.scan.status_code, 200)
+        breaker.return_value.record_success.assert_not_called()
@@ -0,0 +1,71 @@
+import os
+from unittest.mock import patch
+
+from django.core.files.base import ContentFile
+from django.test import TestCase
+
+from scans.models.session import Session
+from scans.models.file import File, FileInfo
+from scans.models.scan import Scan
+from scans.tasks import perform_scan_batch
+from agents.exceptions import AVException
+from agents.models import Agent
+from core.models.system import System
+
+
+@patch('agents.models.Agent.get_av')
+class Batch(TestCase):
+
+    def setUp(self):
+        System.reset_settings()
+        session = Session.objects.create()
+        self.agent = Agent.objects.create(api_ip='192.168.100.158',
+                                          av_name='clamav')
+        self.scans = []
+        for i in range(3):
+            file = File.objects.create(
+                file=ContentFile(f'Content {i}'.encode(), name=f'{i}.pdf'),
+                session=session, info=FileInfo.objects.create(), valid=True,
+                scans_total=1)
+            self.scans.append(Scan.objects.create(
+                agent=self.agent, file=file, av_name=self.agent.av_name))
+        self.paths = [scan.file.file.path for scan in self.scans]
+
+    def test_one_run(self, get_av):
+        get_av.return_value.scan_batch.side_effect = lambda paths: ('', 3, {
+            paths[0]: ('OK', 0, None),
+            paths[1]: ('Eicar FOUND', 1, 'Eicar'),
+        })
+        get_av.return_value.scan.return_value = ('OK', 1, 0, None)
+        perform_scan_batch([scan.pk for scan in self.scans])
+
+        get_av.return_value.scan_batch.assert_called_once()
+        # the engine is given private copies of the files
+        paths = get_av.return_value.scan_batch.call_args[0][0]
+        self.assertFalse(set(paths) & set(self.paths))
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+        # the file without a result is scanned on its own
+        get_av.return_value.scan.assert_called_once()
+        self.assertEqual(
+            os.path.basename(get_av.return_value.scan.call_args[0][0]),
+            os.path.basename(self.paths[2]))
+        for scan in self.scans:
+            scan.refresh_from_db()
+            self.assertEqual(scan.status_code, 200)
+        self.assertEqual(self.scans[0].scan_time, 1)
+        self.assertEqual(self.scans[1].infected_num, 1)
+        self.assertEqual(self.scans[1].threats, 'Eicar')
+        self.assertEqual(self.scans[1].file.infected, True)
+
+    def test_failed_batch(self, get_av):
+        get_av.return_value.scan_batch.side_effect = AVException('Failed')
+        get_av.return_value.scan.return_value = ('OK', 1, 0, None)
+        perform_scan_batch([scan.pk for scan in self.scans])
+        self.assertEqual(get_av.return_value.scan.call_count, 3)
+        self.assertFalse(Scan.objects.filter(status_code=None).exists())
+
+    def test_unreachable(self, get_av):
+        get_av.return_value.scan_batch.side_effect = EOFError('Closed')
+        perform_scan_batch([scan.pk for scan in self.scans])
+        self.assertEqual(Scan.objects.filter(status_code=499).count(), 3)
+        get_av.return_value.scan.assert_not_called()
@@ -0,0 +1,143 @@
+from unittest.mock import patch
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from scans.models.session import Session
+from scans.models.file import File, FileInfo
+from scans.models.scan import Scan
+from scans.tasks import perform_scan, scan_file
+from agents.models import Agent
+from core.models.system import System
+
+
+@override_settings(VERDICT_CACHE_TTL=0, SCAN_COALESCE_WINDOW=0)
+class ScanState(TestCase):
+
+    def setUp(self):
+        System.reset_settings()
+        self.session = Session.objects.create()
+        self.parent = File.objects.create(
+            file=ContentFile(b'Archive content', name='archive.zip'),
+            session=self.session, info=FileInfo.objects.create(),
+            valid=True)
+        File.track_created([self.parent])
+        self.children = [
+            File.objects.create(
+                file=ContentFile(content, name=f'{content.decode()}.txt'),
+                session=self.session, info=FileInfo.objects.create(),
+                parent=self.parent, valid=True)
+            for content in (b'first', b'second')
+        ]
+        File.track_created(self.children)
+        for av_name in ('clamav', 'eset'):
+            Agent.objects.create(api_ip='192.168.100.158', av_name=av_name)
+
+    def scan(self):
+        for child in self.children:
+            scan_file(child.pk, _async=False)
+        self.parent.refresh_from_db()
+        self.session.refresh_from_db()
+
+    @patch('agents.models.Agent.get_av')
+    def test_clean(self, get_av):
+        get_av.return_value.scan.return_value = ('OK', 1.5, 0, None)
+        self.scan()
+        self.assertEqual(self.parent.children_total, 2)
+        self.assertEqual(self.parent.children_completed, 2)
+        self.assertEqual(self.parent.progress, 100)
+        self.assertIs(self.parent.infected, False)
+        self.assertEqual(self.session.files_total, 1)
+        self.assertEqual(self.session.files_completed, 1)
+        self.assertEqual(self.session.progress, 100)
+
+    @patch('agents.models.Agent.get_av')
+    def test_infected_child(self, get_av):
+        get_av.return_value.scan.side_effect = [
+            ('OK', 1.5, 0, None),
+            ('OK', 1.5, 0, None),
+            ('Infected files: 1', 1.5, 1, 'Eicar-Signature'),
+            ('Infected files: 1', 1.5, 1, 'Eicar-Signature'),
+        ]
+        self.scan()
+        first, second = File.objects.filter(
+            pk__in=[child.pk for child in self.children]).order_by('pk')
+        self.assertEqual(second.scans_infected, 2)
+        self.assertIs(first.infected, False)
+        self.assertIs(second.infected, True)
+        self.assertIs(self.parent.infected, True)
+        self.assertEqual(self.session.files_infected, 1)
+
+    @patch('agents.models.Agent.get_av')
+    def test_counted_once(self, get_av):
+        get_av.return_value.scan.return_value = ('OK', 1.5, 0, None)
+        self.scan()
+        scan = Scan.objects.filter(file=self.children[0]).first()
+        # a redelivered task does not count its scan again
+        perform_scan(scan.pk)
+        self.assertFalse(scan.complete(status_code=200, infected_num=0))
+        child = File.objects.get(pk=self.children[0].pk)
+        self.assertEqual(child.scans_total, 2)
+        self.assertEqual(child.scans_completed, 2)
+
+
+@override_settings(VERDICT_CACHE_TTL=0, SCAN_COALESCE_WINDOW=0)
+class EarlyDecision(TestCase):
+
+    def setUp(self):
+        System.reset_settings()
+        System.update_settings({'early_decision': True,
+                                'clean_acceptance_index': 0.5,
+                                'valid_acceptance_index': 0.25})
+        self.session = Session.objects.create()
+        self.file = File.objects.create(
+            file=ContentFile(b'Content', name='file.txt'),
+            session=self.session, info=FileInfo.objects.create(),
+            valid=True, scans_total=4)
+        File.track_created([self.file])
+        self.scans = [
+            Scan.objects.create(
+                file=self.file, av_name=av_name,
+                agent=Agent.objects.create(api_ip='192.168.100.158',
+                                           av_name=av_name))
+            for av_name in ('clamav', 'eset', 'kaspersky', 'avast')
+        ]
+
+    @patch('agents.models.Agent.get_av')
+    def test_infected(self, get_av):
+        get_av.return_value.scan.return_value = (
+            'Infected files: 1', 1.5, 1, 'Eicar-Signature')
+        perform_scan(self.scans[0].pk)
+        self.file.refresh_from_db()
+        self.assertIsNone(self.file.infected)
+
+        perform_scan(self.scans[1].pk)
+        self.file.refresh_from_db()
+        self.assertEqual(self.file.progress, 100)
+        self.assertIs(self.file.infected, True)
+        self.assertEqual(Scan.objects.filter(status_code=410).count(), 2)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.files_completed, 1)
+
+        # a skipped scan is not scanned when its task runs anyway
+        perform_scan(self.scans[2].pk)
+        self.assertEqual(get_av.return_value.scan.call_count, 2)
+
+    @patch('agents.models.Agent.get_av')
+    def test_clean(self, get_av):
+        get_av.return_value.scan.return_value = ('OK', 1.5, 0, None)
+        for scan in self.scans[:3]:
+            perform_scan(scan.pk)
+        self.file.refresh_from_db()
+        self.assertEqual(self.file.progress, 100)
+        self.assertIs(self.file.infected, False)
+        self.assertEqual(self.file.scans_errored, 0)
+
+    @patch('agents.models.Agent.get_av')
+    def test_disabled(self, get_av):
+        System.update_settings({'early_decision': False})
+        get_av.return_value.scan.return_value = (
+            'Infected files: 1', 1.5, 1, 'Eicar-Signature')
+        for scan in self.scans[:2]:
+            perform_scan(scan.pk)
+        self.assertFalse(Scan.objects.filter(status_code=410).exists())
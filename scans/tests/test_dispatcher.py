@@ -0,0 +1,93 @@
+import asyncio
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.files.base import ContentFile
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+from redis.exceptions import ConnectionError
+
+from scans.dispatcher import ScanDispatcher
+from scans.models.session import Session
+from scans.models.file import File, FileInfo
+from scans.models.scan import Scan
+from agents.models import Agent
+from core.models.system import System
+
+
+@override_settings(AGENT_CONCURRENCY_INITIAL=2, VERDICT_CACHE_TTL=0)
+@patch('agents.concurrency.get_redis', side_effect=ConnectionError)
+@patch('agents.models.Agent.get_av')
+class Dispatcher(TransactionTestCase):
+
+    def setUp(self):
+        System.reset_settings()
+        session = Session.objects.create()
+        self.agent = Agent.objects.create(api_ip='192.168.100.158',
+                                          av_name='clamav')
+        for i in range(3):
+            file = File.objects.create(
+                file=ContentFile(f'Content {i}'.encode(), name=f'{i}.pdf'),
+                session=session, info=FileInfo.objects.create(), valid=True,
+                scans_total=1)
+            Scan.objects.create(agent=self.agent, file=file,
+                                av_name=self.agent.av_name)
+
+    def dispatch(self, dispatcher):
+        async def run():
+            tasks = await dispatcher.dispatch()
+            await asyncio.gather(*tasks)
+            await dispatcher.flush()
+            return len(tasks)
+        return asyncio.run(run())
+
+    def test_limited_by_agent(self, get_av, get_redis):
+        get_av.return_value.scan.return_value = ('OK', 1, 0, None)
+        dispatcher = ScanDispatcher(threads=4)
+        self.assertEqual(self.dispatch(dispatcher), 2)
+        self.assertEqual(Scan.objects.filter(status_code=200).count(), 2)
+        self.assertEqual(self.dispatch(dispatcher), 1)
+        self.assertFalse(Scan.objects.filter(status_code=None).exists())
+        self.assertEqual(dispatcher.in_flight[self.agent.pk], 0)
+        self.assertFalse(File.objects.filter(progress=None).exists())
+
+    def test_claimed_once(self, get_av, get_redis):
+        get_av.return_value.scan.return_value = ('OK', 1, 0, None)
+        Scan.objects.update(claimed_at='2100-01-01T00:00:00Z')
+        self.assertEqual(self.dispatch(ScanDispatcher(threads=4)), 0)
+
+    def test_timeout(self, get_av, get_redis):
+        get_av.return_value.scan.side_effect = lambda path: time.sleep(0.5)
+        self.dispatch(ScanDispatcher(threads=4, timeout=0.1))
+        self.assertEqual(Scan.objects.filter(status_code=499).count(), 2)
+
+    def test_started_not_claimed_again(self, get_av, get_redis):
+        get_av.return_value.scan.return_value = ('OK', 1, 0, None)
+        Scan.objects.update(claimed_at=timezone.now() - timedelta(hours=1))
+        Scan.objects.all()[:1].get().file.scans.all().start(3600)
+        dispatcher = ScanDispatcher(threads=4)
+        # the stale claims which were not started are taken again
+        self.assertEqual(len(dispatcher.claim({self.agent.pk: 3})), 2)
+
+    def test_running_not_claimed_again(self, get_av, get_redis):
+        dispatcher = ScanDispatcher(threads=4)
+        dispatcher.running.add(Scan.objects.order_by('pk').first().pk)
+        Scan.objects.update(claimed_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(len(dispatcher.claim({self.agent.pk: 3})), 2)
+
+    def test_timed_out_call_holds_slot(self, get_av, get_redis):
+        get_av.return_value.scan.side_effect = lambda path: time.sleep(0.5)
+        dispatcher = ScanDispatcher(threads=4, timeout=0.1)
+
+        async def run():
+            tasks = await dispatcher.dispatch()
+            await asyncio.sleep(0.3)
+            # timed out, but the engine calls are still running
+            in_flight = dispatcher.in_flight[self.agent.pk]
+            await asyncio.gather(*tasks)
+            await dispatcher.flush()
+            return in_flight
+        self.assertEqual(asyncio.run(run()), 2)
+        self.assertEqual(dispatcher.in_flight[self.agent.pk], 0)
+        self.assertEqual(Scan.objects.filter(status_code=499).count(), 2)
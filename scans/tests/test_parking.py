@@ -0,0 +1,66 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.utils import timezone
+
+from agents.breaker import CLOSED, OPEN
+from agents.models import Agent
+from core.models.system import System
+from scans.models.file import File, FileInfo
+from scans.models.scan import Scan
+from scans.models.session import Session
+
+
+@patch('scans.models.scan.CircuitBreaker')
+class Parking(TestCase):
+
+    def setUp(self):
+        System.reset_settings()
+        session = Session.objects.create()
+        self.agent = Agent.objects.create(api_ip='192.168.100.158',
+                                          av_name='clamav')
+        file = File.objects.create(session=session, valid=True,
+                                   info=FileInfo.objects.create(),
+                                   scans_total=1)
+        self.scan = Scan.objects.create(agent=self.agent, file=file,
+                                        av_name=self.agent.av_name)
+
+    def test_parked_while_open(self, breaker):
+        breaker.return_value.get_state.return_value = OPEN
+        Scan.perform_many([self.scan])
+        self.scan.refresh_from_db()
+        self.assertTrue(self.scan.parked)
+
+        breaker.return_value.get_state.return_value = CLOSED
+        pk_list = Scan.objects.filter(agent=self.agent).resume_parked()
+        self.assertEqual(pk_list, [self.scan.pk])
+        self.scan.refresh_from_db()
+        self.assertFalse(self.scan.parked)
+
+    def test_fail_parked(self, breaker):
+        Scan.objects.filter(pk=self.scan.pk).park()
+        scans = Scan.objects.filter(agent=self.agent)
+        scans.fail_parked('Agent is down')
+        self.assertTrue(scans.get().parked)
+
+        Scan.objects.filter(pk=self.scan.pk).update(
+            modified_at=timezone.now() - timedelta(hours=1))
+        scans.fail_parked('Agent is down')
+        self.scan.refresh_from_db()
+        self.assertEqual(self.scan.status_code, 499)
+        self.assertEqual(self.scan.error, 'Agent is down')
+        self.assertFalse(self.scan.parked)
+
+    def test_fail_expired(self, breaker):
+        scans = Scan.objects.filter(agent=self.agent)
+        scans.start(60)
+        self.assertEqual(scans.fail_expired(), [])
+
+        scans.start(-1)
+        self.assertEqual(scans.fail_expired(), [self.scan.pk])
+        self.scan.refresh_from_db()
+        self.assertEqual(self.scan.status_code, 499)
+        self.assertEqual(self.scan.error,
+                         'Scan was killed after its time limit')
+        self.assertEqual(self.scan.file.progress, 100)
@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from agents.models import Agent
+from scans.dispatcher import ScanDispatcher
+from scans.models.file import File
+from scans.models.scan import Scan
+from scans.models.session import Session
+from scans.priorities import get_priority
+
+
+@override_settings(SCAN_PRIORITY_AGING=60)
+class Priority(TestCase):
+
+    def setUp(self):
+        self.agent = Agent.objects.create(api_ip='192.168.100.158',
+                                          av_name='clamav')
+
+    def add_scan(self, source, waited=0):
+        session = Session.objects.create(source=source)
+        file = File.objects.create(session=session)
+        scan = Scan.objects.create(agent=self.agent, file=file)
+        Scan.objects.filter(pk=scan.pk).update(
+            created_at=timezone.now() - timedelta(seconds=waited))
+        return scan
+
+    def test_by_source(self):
+        self.assertEqual(get_priority('upload'), 0)
+        self.assertLess(get_priority('email'), get_priority('disk'))
+        self.assertLess(get_priority('disk'), get_priority('rescan'))
+        self.assertEqual(get_priority(None), get_priority('url'))
+
+    def test_aging(self):
+        now = timezone.now()
+        self.assertEqual(get_priority('disk', now - timedelta(seconds=150)),
+                         4)
+        # aging stops short of the priority of uploads
+        self.assertEqual(get_priority('disk', now - timedelta(hours=1)), 1)
+        self.assertEqual(get_priority('upload', now - timedelta(hours=1)), 0)
+        with self.settings(SCAN_PRIORITY_AGING=0):
+            self.assertEqual(get_priority('disk', now - timedelta(hours=1)),
+                             6)
+
+    def test_claimed_by_priority(self):
+        self.add_scan('disk')
+        upload = self.add_scan('upload')
+        claimed = ScanDispatcher(threads=1).claim({self.agent.pk: 1})
+        self.assertEqual(claimed, [upload])
+
+    def test_aged_by_enqueued_time(self):
+        # a rescan which waited long enough goes before a fresh email
+        self.add_scan('email')
+        rescan = self.add_scan('rescan', waited=600)
+        claimed = ScanDispatcher(threads=1).claim({self.agent.pk: 1})
+        self.assertEqual(claimed, [rescan])
+
+    def test_old_bulk_does_not_outrank_upload(self):
+        bulk = self.add_scan('disk', waited=3600)
+        Session.objects.filter(pk=bulk.file.session_id).update(
+            created_at=timezone.now() - timedelta(hours=2))
+        upload = self.add_scan('upload')
+        claimed = ScanDispatcher(threads=1).claim({self.agent.pk: 1})
+        self.assertEqual(claimed, [upload])
+        bulk.refresh_from_db()
+        self.assertGreater(bulk.file.session.get_priority(bulk.created_at),
+                           upload.file.session.get_priority())
+
+    def test_claimed_by_priority_without_aging(self):
+        self.add_scan('disk', waited=3600)
+        upload = self.add_scan('upload')
+        with self.settings(SCAN_PRIORITY_AGING=0):
+            claimed = ScanDispatcher(threads=1).claim({self.agent.pk: 1})
+        self.assertEqual(claimed, [upload])
@@ -0,0 +1,34 @@
+from unittest.mock import Mock
+
+from django.test import TestCase
+
+from scans.models.session import Session
+from scans.progress import ProgressReporter
+
+
+class Reporter(TestCase):
+
+    def setUp(self):
+        self.session = Session.objects.create()
+        self.task = Mock()
+
+    def test_flushes_every_n_items(self):
+        reporter = ProgressReporter(self.task, self.session.pk, total=10,
+                                    interval=60000, items=4)
+        with reporter:
+            for i in range(10):
+                reporter.update(f'/path/{i}')
+        # the first item, every fourth one after it and the final flush
+        self.assertEqual(self.task.update_state.call_count, 4)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.counter, 10)
+        self.assertEqual(self.session.analyze_progress, 100)
+        self.assertEqual(self.session.current_path, '/path/9')
+        self.assertEqual(self.task.update_state.call_args[1]['meta'],
+                         reporter.meta)
+
+    def test_without_session(self):
+        with ProgressReporter(self.task, total=2, interval=0) as reporter:
+            reporter.update('/path/0')
+        self.assertEqual(self.task.update_state.call_count, 2)
+        self.assertEqual(reporter.meta['progress'], 50)
@@ -0,0 +1,113 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from agents.concurrency import get_limit_key
+from scans import queue_index
+
+
+class FakeRedis:
+    """ The commands of redis the queue index uses """
+
+    def __init__(self):
+        self.data = {}
+
+    def zadd(self, key, mapping):
+        self.data.setdefault(key, {}).update(mapping)
+
+    def zrem(self, key, member):
+        return int(self.data.get(key, {}).pop(member, None) is not None)
+
+    def zcard(self, key):
+        return len(self.data.get(key, {}))
+
+    def zrange(self, key, start, end, withscores=False):
+        items = sorted(self.data.get(key, {}).items(), key=lambda i: i[1])
+        return items[start:end + 1] if withscores else \
+            [member for member, score in items[start:end + 1]]
+
+    def zcount(self, key, low, high):
+        high = float(high[1:])
+        return sum(1 for score in self.data.get(key, {}).values()
+                   if score < high)
+
+    def zremrangebyscore(self, key, low, high):
+        members = self.data.get(key, {})
+        for member, score in list(members.items()):
+            if low <= score <= high:
+                del members[member]
+
+    def sadd(self, key, value):
+        self.data.setdefault(key, set()).add(str(value).encode())
+
+    def srem(self, key, value):
+        self.data.get(key, set()).discard(str(value).encode())
+
+    def smembers(self, key):
+        return set(self.data.get(key, set()))
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        self.data.setdefault(key, {}).update(mapping or {field: value})
+
+    def hget(self, key, field):
+        value = self.data.get(key, {}).get(field)
+        return None if value is None else str(value).encode()
+
+    def hmget(self, key, *fields):
+        return [self.hget(key, field) for field in fields]
+
+    def hdel(self, key, field):
+        self.data.get(key, {}).pop(field, None)
+
+    def expire(self, key, seconds):
+        pass
+
+    def pipeline(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self):
+        pass
+
+
+@override_settings(AGENT_CONCURRENCY_INITIAL=2)
+class QueueIndex(SimpleTestCase):
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = patch('scans.queue_index.get_redis',
+                        return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_position(self):
+        queue_index.add_task('a', 1, 10, priority=6)
+        queue_index.add_task('b', 1, 10, priority=6)
+        queue_index.add_task('c', 1, 20, priority=6)
+        queue_index.add_task('d', 2, 20, priority=6)
+        # published later with a higher priority
+        queue_index.add_task('e', 1, 30, priority=0)
+        self.redis.hset(get_limit_key(1), mapping={'limit': 2,
+                                                   'scan_time': 4})
+
+        eta = queue_index.get_eta(20)
+        self.assertEqual(eta['position'], 3)
+        self.assertEqual(eta['waiting'], 2)
+        # four scans on agent 1 which runs two of 4 seconds at once
+        self.assertEqual(eta['eta'], 8)
+
+        queue_index.remove_task('a')
+        self.assertEqual(queue_index.get_eta(20)['position'], 2)
+        self.assertEqual(queue_index.get_eta(30)['position'], 0)
+
+    def test_done(self):
+        queue_index.add_task('a', 1, 10)
+        self.assertTrue(queue_index.remove_task('a'))
+        self.assertFalse(queue_index.remove_task('a'))
+        self.assertEqual(queue_index.get_eta(10),
+                         {'position': 0, 'waiting': 0, 'eta': None})
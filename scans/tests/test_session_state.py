@@ -0,0 +1,52 @@
+from unittest.mock import patch
+
+from django.core.cache import caches
+from django.test import TestCase
+
+from scans.models.session import Session
+from scans.models.file import File
+
+
+class SessionState(TestCase):
+
+    def setUp(self):
+        patcher = patch('scans.models.session.AsyncResult')
+        self.async_result = patcher.start()
+        self.async_result.return_value.state = 'SUCCESS'
+        self.addCleanup(patcher.stop)
+        caches['state'].clear()
+        self.session = Session.objects.create(total=4, counter=4,
+                                              analyze_progress=100)
+        for infected in (True, False, None):
+            File.objects.create(session=self.session, valid=True,
+                                progress=100, infected=infected)
+        File.objects.create(session=self.session)
+        File.track_created(self.session.files.all())
+        for file in self.session.files.filter(valid=True):
+            file.propagate_scan_state()
+        self.session.refresh_from_db()
+
+    def test_counts(self):
+        with self.assertNumQueries(1):
+            data = self.session.state()
+        self.assertEqual(data['invalid'], 1)
+        self.assertEqual(data['scanned'], 3)
+        self.assertEqual(data['infected'], 1)
+        self.assertEqual(data['clean'], 1)
+        self.assertEqual(data['mysterious'], 1)
+        self.assertTrue(data['complete'])
+
+    def test_cached_snapshot(self):
+        self.session.state()
+        with self.assertNumQueries(0):
+            self.session.state()
+        self.assertEqual(self.async_result.call_count, 1)
+
+    def test_snapshot_invalidated(self):
+        self.session.state()
+        File.objects.create(session=self.session, valid=True)
+        File.track_created(self.session.files.filter(progress=None))
+        self.session.refresh_from_db()
+        data = self.session.state()
+        self.assertEqual(data['progresses']['scan']['total'], 4)
+        self.assertFalse(data['complete'])
@@ -0,0 +1,133 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import timedelta
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.utils.archives import ExtractionBudget, extract_archive
+from scans.models.file import File
+from scans.models.session import Session
+from scans.storage import ContentAddressedStorage
+
+
+class ContentAddressed(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+        self.storage = ContentAddressedStorage()
+        self.session = Session.objects.create()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def create(self, content, name='file.txt'):
+        return File.objects.create(session=self.session,
+                                   file=ContentFile(content, name=name))
+
+    def test_duplicates_are_linked(self):
+        first = self.create(b'content')
+        second = self.create(b'content', name='other.txt')
+        other = self.create(b'other content')
+
+        self.assertNotEqual(first.file.name, second.file.name)
+        self.assertEqual(os.path.dirname(first.file.name),
+                         os.path.dirname(second.file.name))
+        self.assertEqual(os.stat(first.file.path).st_ino,
+                         os.stat(second.file.path).st_ino)
+        self.assertNotEqual(os.stat(first.file.path).st_ino,
+                            os.stat(other.file.path).st_ino)
+        self.assertEqual(second.file.read(), b'content')
+
+    def test_hashed_upload_is_not_written(self):
+        first = self.create(b'content')
+        upload = SimpleUploadedFile('upload.txt', b'content')
+        upload.file_info = {'sha256': os.path.basename(
+            os.path.dirname(first.file.name))}
+        name = self.storage.save('upload.txt', upload)
+        self.assertEqual(os.stat(self.storage.path(name)).st_ino,
+                         os.stat(first.file.path).st_ino)
+        self.assertFalse(os.listdir(self.storage.path('blobs/tmp')))
+
+    def test_copy_is_hashed(self):
+        content = ContentFile(b'content')
+        name = self.storage.save('file.txt', content)
+        self.assertEqual(content.checksums, {
+            'md5': hashlib.md5(b'content').hexdigest(),
+            'sha1': hashlib.sha1(b'content').hexdigest(),
+            'sha256': hashlib.sha256(b'content').hexdigest(),
+        })
+        self.assertIn(content.checksums['sha256'], name)
+
+    def test_members_are_not_hashed_again(self):
+        path = os.path.join(self.media_root, 'archive.zip')
+        with zipfile.ZipFile(path, 'w') as f:
+            f.writestr('a.txt', b'content')
+            f.writestr('b.txt', b'content')
+        budget = ExtractionBudget(max_size=0, max_members=0, max_ratio=0,
+                                  max_depth=0)
+        with mock.patch('scans.storage.hash_file') as hash_file, \
+                mock.patch.object(self.storage, 'save_hashed') as save_hashed:
+            first, second = extract_archive(path, self.storage, 'out', budget)
+        hash_file.assert_not_called()
+        save_hashed.assert_not_called()
+        self.assertEqual(os.stat(self.storage.path(first.file)).st_ino,
+                         os.stat(self.storage.path(second.file)).st_ino)
+        self.assertEqual(os.listdir(self.storage.path('out')), [])
+
+    def test_private_copy(self):
+        first = self.create(b'content')
+        second = self.create(b'content')
+        with self.storage.private_copy(first.file.name) as path:
+            self.assertNotEqual(os.stat(path).st_ino,
+                                os.stat(first.file.path).st_ino)
+            # an engine which cleans the file in place
+            with open(path, 'wb') as f:
+                f.write(b'cleaned')
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(second.file.read(), b'content')
+
+        with self.storage.private_copy(first.file.name) as path:
+            self.storage.delete_copies(60)
+            self.assertTrue(os.path.exists(path))
+            self.storage.delete_copies(-1)
+            self.assertFalse(os.path.exists(path))
+
+    def test_delete_drops_a_reference(self):
+        first = self.create(b'content')
+        second = self.create(b'content')
+        folder = os.path.dirname(first.file.path)
+
+        first.delete()
+        self.assertFalse(os.path.exists(first.file.path))
+        self.assertEqual(second.file.read(), b'content')
+
+        second.delete()
+        self.assertFalse(os.path.exists(folder))
+
+    def test_delete_keeps_referenced_name(self):
+        first = self.create(b'content')
+        second = File.objects.create(session=self.session,
+                                     file=first.file.name)
+        first.delete()
+        self.assertTrue(os.path.exists(second.file.path))
+
+    def test_cleanup_disk(self):
+        old = self.create(b'content')
+        new = self.create(b'content')
+        File.objects.filter(pk=old.pk).update(
+            created_at=timezone.now() - timedelta(days=2))
+
+        self.assertEqual(File.objects.cleanup_disk(1), 1)
+        self.assertFalse(os.path.exists(old.file.path))
+        self.assertTrue(os.path.exists(new.file.path))
+        self.assertTrue(File.objects.get(pk=old.pk).deleted)
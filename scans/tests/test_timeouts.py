@@ -0,0 +1,52 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from agents.models import Agent
+from scans.models.file import File, FileInfo
+from scans.models.scan import Scan
+from scans.models.session import Session
+from scans.timeouts import MB, get_time_limit
+
+
+@override_settings(SCAN_TIMEOUT_MIN=10, SCAN_TIMEOUT_MAX=600,
+                   SCAN_TIMEOUT_BASE=60, SCAN_TIMEOUT_PER_MB=2,
+                   SCAN_TIMEOUT_FACTOR=3, SCAN_TIMEOUT_MIN_SAMPLES=3)
+class TimeLimit(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.session = Session.objects.create()
+        self.agent = Agent.objects.create(api_ip='192.168.100.158',
+                                          av_name='clamav')
+
+    def add_scans(self, scan_times, size, mimetype='application/pdf'):
+        for scan_time in scan_times:
+            info = FileInfo.objects.create(size=size, mimetype=mimetype)
+            file = File.objects.create(session=self.session, info=info)
+            Scan.objects.create(agent=self.agent, file=file, status_code=200,
+                                scan_time=scan_time)
+
+    def test_by_size(self):
+        self.assertEqual(get_time_limit(self.agent.pk), 60)
+        self.assertEqual(get_time_limit(self.agent.pk, 100 * MB), 260)
+        self.assertEqual(get_time_limit(self.agent.pk, 1000 * MB), 600)
+
+    def test_by_history(self):
+        self.add_scans([1, 1, 2], 1024)
+        self.add_scans([20, 30, 40], 1024, mimetype='application/zip')
+        # hung agents fail fast on small files
+        self.assertEqual(get_time_limit(self.agent.pk, 2048,
+                                        'application/pdf'), 10)
+        self.assertEqual(get_time_limit(self.agent.pk, 2048,
+                                        'application/zip'), 120)
+        # any mimetype of the size range
+        self.assertEqual(get_time_limit(self.agent.pk, 2048, 'text/plain'),
+                         120)
+        # no history for larger files
+        self.assertEqual(get_time_limit(self.agent.pk, 50 * MB), 160)
+
+    def test_cached(self):
+        self.add_scans([1, 1, 2], 1024)
+        get_time_limit(self.agent.pk, 1024)
+        with self.assertNumQueries(1):
+            get_time_limit(self.agent.pk, 1024)
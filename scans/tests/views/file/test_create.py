@@ -43,7 +43,7 @@ class Operation(UserTestCase):
         perform_async.assert_called_with(
             scan_file.si(response.data['id'],
                          _async=True, extract=True, agent_pks=[1, 2]),
-            session_id=response.data['session_id'],
+            session_id=response.data['session_id'], priority=0,
             #queue=response.data['session_id']
         )
 
@@ -77,7 +77,7 @@ class Operation(UserTestCase):
         perform_async.assert_called_with(
             scan_file.si(response.data['id'],
                          _async=True, extract=True, agent_pks=[]),
-            session_id=response.data['session_id'],
+            session_id=response.data['session_id'], priority=0,
             #queue=response.data['session_id']
         )
 
@@ -97,7 +97,7 @@ class Operation(UserTestCase):
         perform_async.assert_called_with(
             scan_file.si(response.data['id'],
                          _async=True, extract=True, agent_pks=[]),
-            session_id=response.data['session_id'],
+            session_id=response.data['session_id'], priority=0,
             #queue=response.data['session_id']
         )
 
@@ -43,7 +43,8 @@ class Operation(UserTestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         perform_async.assert_called_with(bulk_create_from_disk.si(
             1, data['paths'], scan=True, extract=True,
-            agent_pks=[1, 2], owner_id=1), session_id=1)
+            agent_pks=[1, 2], owner_id=1), session_id=1,
+            priority=6)
 
     @patch('core.mixins.AsyncMixin.perform_async',
            return_value=AsyncResult('test'))
@@ -64,7 +65,8 @@ class Operation(UserTestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         perform_async.assert_called_with(bulk_create_from_disk.si(
             1, data['paths'], scan=True, extract=True,
-            agent_pks=[1, 2], owner_id=1), session_id=1)
+            agent_pks=[1, 2], owner_id=1), session_id=1,
+            priority=6)
 
     @patch('core.mixins.AsyncMixin.perform_async',
            return_value=AsyncResult('test'))
@@ -85,7 +87,8 @@ class Operation(UserTestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         perform_async.assert_called_with(bulk_create_from_disk.si(
             1, data['paths'], scan=True, extract=False,
-            agent_pks=[1, 2], owner_id=1), session_id=1)
+            agent_pks=[1, 2], owner_id=1), session_id=1,
+            priority=6)
 
     @patch('core.mixins.AsyncMixin.perform_async',
            return_value=AsyncResult('test'))
@@ -106,7 +109,8 @@ class Operation(UserTestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         perform_async.assert_called_with(bulk_create_from_disk.si(
             1, data['paths'], scan=True, extract=True,
-            agent_pks=[1, 2], owner_id=1), session_id=1)
+            agent_pks=[1, 2], owner_id=1), session_id=1,
+            priority=6)
 
     def test_bad_request(self):
         data = {
@@ -137,7 +141,8 @@ class Operation(UserTestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         perform_async.assert_called_with(bulk_create_from_disk.si(
             1, data['paths'], scan=True, extract=True,
-            agent_pks=None, owner_id=1),session_id=1)
+            agent_pks=None, owner_id=1), session_id=1,
+            priority=6)
 
     @patch('core.mixins.AsyncMixin.perform_async',
            return_value=AsyncResult('test'))
@@ -154,7 +159,8 @@ class Operation(UserTestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         perform_async.assert_called_with(bulk_create_from_disk.si(
             1, data['paths'], scan=True, extract=True,
-            agent_pks=None, owner_id=1), session_id=1)
+            agent_pks=None, owner_id=1), session_id=1,
+            priority=6)
 
 
 class Perms(UserTestCase):
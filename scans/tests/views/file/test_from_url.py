@@ -42,7 +42,8 @@ class Operation(UserTestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         perform_async.assert_called_with(create_from_url.si(
             1, data['url'], save_as=None, scan=True, extract=True,
-            agent_pks=[1, 2], owner_id=1), session_id=1)
+            agent_pks=[1, 2], owner_id=1), session_id=1,
+            priority=4)
 
     def test_bad_request(self):
         data = {
@@ -73,7 +74,8 @@ class Operation(UserTestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         perform_async.assert_called_with(create_from_url.si(
             1, data['url'], save_as=None, scan=True, extract=True,
-            agent_pks=None, owner_id=1), session_id=1)
+            agent_pks=None, owner_id=1), session_id=1,
+            priority=4)
 
     @patch('core.mixins.AsyncMixin.perform_async',
            return_value=AsyncResult('test'))
@@ -90,7 +92,8 @@ class Operation(UserTestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         perform_async.assert_called_with(create_from_url.si(
             1, data['url'], save_as=None, scan=True, extract=True,
-            agent_pks=None, owner_id=1), session_id=1)
+            agent_pks=None, owner_id=1), session_id=1,
+            priority=4)
 
 
 class Perms(UserTestCase):
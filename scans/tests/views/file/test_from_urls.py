@@ -0,0 +1,50 @@
+from celery.result import AsyncResult
+from unittest.mock import patch
+from rest_framework.reverse import reverse
+from rest_framework.views import status
+
+from users.test import UserTestCase
+from agents.models import Agent
+from scans.tasks import create_from_urls
+from core.models.system import System
+
+
+class Operation(UserTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.super_admin)
+        self.agent = Agent.objects.create(api_ip='192.168.100.158', status={})
+        System.reset_settings()
+
+    def tearDown(self):
+        super().tearDown()
+        self.client.logout()
+
+    @patch('core.mixins.AsyncMixin.perform_async',
+           return_value=AsyncResult('test'))
+    def test_ok(self, perform_async):
+        data = {
+            'urls': ['http://example.com/a.pdf', 'http://example.com/b.pdf'],
+            'scan': True,
+            'agents': [self.agent.pk],
+            'concurrency': 2
+        }
+        response = self.client.post(reverse('file-from-urls'), data=data,
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        session_id = response.data['session_id']
+        perform_async.assert_called_with(create_from_urls.si(
+            session_id, data['urls'], scan=True, extract=False,
+            agent_pks=[self.agent.pk], owner_id=self.super_admin.pk,
+            concurrency=2), session_id=session_id, priority=4)
+
+    def test_bad_request(self):
+        for data in [{'urls': [], 'scan': True},
+                     {'urls': ['not a url'], 'scan': True},
+                     {'urls': ['http://example.com/a.pdf'], 'scan': True,
+                      'concurrency': 1000}]:
+            response = self.client.post(reverse('file-from-urls'), data=data,
+                                        format='json')
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
@@ -38,7 +38,7 @@ class Operation(UserTestCase):
         self.file.refresh_from_db()
         perform_async.assert_called_with(
             scan_file.si(File.objects.last().pk, _async=True, extract=None, agent_pks=None),
-            session_id=Session.objects.last().pk, #queue=''
+            session_id=Session.objects.last().pk, priority=8, #queue=''
         )
 
 
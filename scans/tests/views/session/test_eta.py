@@ -0,0 +1,29 @@
+from unittest.mock import patch
+
+from redis.exceptions import ConnectionError
+from rest_framework.views import status
+from django.urls import reverse
+
+from users.test import UserTestCase
+from scans.models.session import Session
+
+
+class Operation(UserTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.session = Session.objects.create()
+        self.path = reverse('session-eta', kwargs={'pk': self.session.pk})
+
+    @patch('scans.views.queue_index.get_eta')
+    def test_ok(self, get_eta):
+        get_eta.return_value = {'position': 3, 'waiting': 2, 'eta': 12.5}
+        response = self.client.get(self.path)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['position'], 3)
+        get_eta.assert_called_once_with(self.session.pk)
+
+    @patch('scans.views.queue_index.get_eta', side_effect=ConnectionError)
+    def test_redis_down(self, get_eta):
+        response = self.client.get(self.path)
+        self.assertEqual(response.status_code, 499)
@@ -0,0 +1,99 @@
+from itertools import chain, repeat
+from unittest.mock import patch
+
+from asgiref.testing import ApplicationCommunicator
+from rest_framework.views import status
+from rest_framework_simplejwt.tokens import AccessToken
+from django.test import override_settings
+from django.urls import reverse
+
+from proj.asgi import application
+from users.test import UserTestCase
+from scans.models.session import Session
+
+
+class Operation(UserTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.super_admin)
+        self.session = Session.objects.create(total=2, counter=1,
+                                              analyze_progress=50)
+        self.path = reverse('session-events', kwargs={'pk': self.session.pk})
+
+    @patch('scans.views.get_progress')
+    def test_current(self, get_progress):
+        get_progress.return_value = {'version': 3, 'counter': 2}
+        response = self.client.get(self.path)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'version': 3, 'counter': 2})
+        get_progress.assert_called_once_with(self.session.pk)
+
+    @patch('scans.views.get_progress')
+    def test_not_published(self, get_progress):
+        get_progress.return_value = None
+        response = self.client.get(self.path)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['version'], 0)
+        self.assertEqual(response.data['counter'], 1)
+        self.assertEqual(response.data['analyze_progress'], 50)
+
+
+@override_settings(SESSION_EVENTS_INTERVAL=10)
+class Stream(UserTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.session = Session.objects.create()
+        self.path = reverse('session-events', kwargs={'pk': self.session.pk})
+        self.token = str(AccessToken.for_user(self.super_admin))
+
+    def get_scope(self, token=None):
+        return {
+            'type': 'http', 'method': 'GET', 'path': self.path,
+            'query_string': b'', 'root_path': '', 'scheme': 'http',
+            'server': ('testserver', 80), 'client': ('127.0.0.1', 1),
+            'headers': [(b'host', b'testserver'),
+                        (b'accept', b'text/event-stream'),
+                        (b'authorization',
+                         f'Bearer {token or self.token}'.encode())]
+        }
+
+    async def receive_events(self, communicator, count):
+        body = b''
+        while body.count(b'id: ') < count:
+            body += (await communicator.receive_output(1))['body']
+        return body
+
+    @patch('scans.streams.get_redis')
+    @patch('scans.streams.get_progress')
+    @patch('scans.views.get_progress')
+    async def test_stream(self, view_progress, stream_progress, get_redis):
+        view_progress.return_value = {'version': 3, 'counter': 1}
+        stream_progress.side_effect = [{'version': 3, 'counter': 1},
+                                       {'version': 4, 'counter': 2}]
+        get_redis().pubsub().get_message.side_effect = chain(
+            [{'type': 'message'}], repeat(None))
+
+        communicator = ApplicationCommunicator(application, self.get_scope())
+        await communicator.send_input({'type': 'http.request'})
+        start = await communicator.receive_output(1)
+        self.assertEqual(start['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream'),
+                      start['headers'])
+
+        body = await self.receive_events(communicator, 2)
+        self.assertIn(b'id: 3\ndata: {"version": 3, "counter": 1}', body)
+        self.assertIn(b'id: 4\ndata: {"version": 4, "counter": 2}', body)
+
+        await communicator.send_input({'type': 'http.disconnect'})
+        while (await communicator.receive_output(1)).get('more_body'):
+            pass
+        get_redis().pubsub().close.assert_called_once_with()
+
+    async def test_unauthorized(self):
+        communicator = ApplicationCommunicator(application,
+                                               self.get_scope('invalid'))
+        await communicator.send_input({'type': 'http.request'})
+        start = await communicator.receive_output(1)
+        self.assertEqual(start['status'], status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,146 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from celery.result import AsyncResult
+from django.test import override_settings
+from rest_framework.reverse import reverse
+from rest_framework.views import status
+
+from core.models.system import System
+from core.utils.files import generate_photo_file
+from users.test import UserTestCase
+from scans.models import upload
+from scans.models.upload import Upload
+
+CONTENT = generate_photo_file().read() + os.urandom(100000)
+
+
+class Operation(UserTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.super_admin)
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+
+    def tearDown(self):
+        super().tearDown()
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def create(self, size=len(CONTENT)):
+        return self.client.post(reverse('upload-list'),
+                                data={'filename': 'photo.png', 'size': size})
+
+    def put_chunk(self, pk, number, offset, data):
+        path = reverse('upload-chunk', kwargs={'pk': pk, 'number': number})
+        return self.client.put(f'{path}?offset={offset}', data=data,
+                               content_type='application/octet-stream')
+
+    def finalize(self, pk, **data):
+        return self.client.post(reverse('upload-finalize', kwargs={'pk': pk}),
+                                data=data)
+
+    def test_create(self):
+        response = self.create()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['received'], 0)
+        instance = Upload.objects.get(pk=response.data['id'])
+        self.assertTrue(os.path.exists(instance.get_spool_path()))
+
+    def test_create_too_large(self):
+        response = self.create(size=10 ** 12)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch('core.mixins.AsyncMixin.perform_async',
+           return_value=AsyncResult('test'))
+    def test_chunks_and_finalize(self, perform_async):
+        pk = self.create().data['id']
+        response = self.put_chunk(pk, 0, 0, CONTENT[:60000])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['received'], 60000)
+        self.assertEqual(response.data['mimetype'], 'image/png')
+
+        # a resent chunk tells where to resume
+        response = self.put_chunk(pk, 0, 0, CONTENT[:60000])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['chunks'], 1)
+        self.assertEqual(response.data['received'], 60000)
+
+        response = self.finalize(pk)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        response = self.put_chunk(pk, 1, 60000, CONTENT[60000:])
+        self.assertEqual(response.data['received'], len(CONTENT))
+
+        response = self.finalize(pk, scan=True)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['sha256'],
+                         hashlib.sha256(CONTENT).hexdigest())
+        self.assertEqual(response.data['display_name'], 'photo.png')
+        instance = Upload.objects.get(pk=pk)
+        self.assertEqual(instance.file.file.read(), CONTENT)
+        self.assertFalse(os.path.exists(instance.get_spool_path()))
+        perform_async.assert_called_once()
+
+        response = self.finalize(pk)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_finalize_in_another_process(self):
+        pk = self.create().data['id']
+        self.put_chunk(pk, 0, 0, CONTENT)
+        # the chunks reached another worker
+        upload.hashers.clear()
+        response = self.finalize(pk)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['md5'],
+                         hashlib.md5(CONTENT).hexdigest())
+
+    def test_abandoned_hashers_expire(self):
+        pk = self.create().data['id']
+        self.put_chunk(pk, 0, 0, CONTENT[:60000])
+        self.assertIn(pk, {str(key) for key in upload.hashers})
+        with override_settings(UPLOAD_HASHER_TTL=-1):
+            other = self.create().data['id']
+            self.put_chunk(other, 0, 0, CONTENT[:60000])
+        self.assertEqual({str(key) for key in upload.hashers}, set())
+
+        self.put_chunk(other, 1, 60000, CONTENT[60000:])
+        Upload.objects.get(pk=other).delete()
+        self.assertEqual({str(key) for key in upload.hashers}, set())
+
+    def test_mimetype_of_short_chunks(self):
+        System.set_settings({**System.get_settings(),
+                             'mimetypes': ['application/pdf']})
+        pk = self.create().data['id']
+        response = self.put_chunk(pk, 0, 0, CONTENT[:100])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['mimetype'], '')
+
+        # decided once the whole head is received
+        response = self.put_chunk(pk, 1, 100, CONTENT[100:10000])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Upload.objects.get(pk=pk).received, 100)
+
+    def test_chunk_exceeds_size(self):
+        pk = self.create(size=10).data['id']
+        response = self.put_chunk(pk, 0, 0, CONTENT[:20])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_mimetype_not_allowed(self):
+        System.set_settings({**System.get_settings(),
+                             'mimetypes': ['application/pdf']})
+        pk = self.create().data['id']
+        response = self.put_chunk(pk, 0, 0, CONTENT)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Upload.objects.get(pk=pk).received, 0)
+
+    def test_other_user(self):
+        pk = self.create().data['id']
+        self.client.force_login(self.user)
+        response = self.put_chunk(pk, 0, 0, CONTENT)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,74 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+
+MB = 1024 * 1024
+# upper bounds of the size ranges of ScanViewSet.performance
+SIZE_RANGES = (10 * MB, 100 * MB, 500 * MB, 1000 * MB, 5000 * MB)
+
+
+def get_size_range(size):
+    for i, bound in enumerate(SIZE_RANGES):
+        if size <= bound:
+            return i
+    return len(SIZE_RANGES)
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def get_stats_key(agent_id):
+    return f'scan_time_stats:{agent_id}'
+
+
+def get_scan_time_stats(agent_id):
+    """
+    The 95th percentile of the scan time of the last SCAN_TIMEOUT_HISTORY
+    successful scans of an agent by size range and mimetype, and by size
+    range alone with a mimetype of None.
+    """
+    from scans.models.scan import Scan
+
+    stats = cache.get(get_stats_key(agent_id))
+    if stats is not None:
+        return stats
+
+    rows = Scan.objects.filter(
+        agent_id=agent_id, status_code=200, scan_time__isnull=False,
+        file__info__size__isnull=False).order_by('-pk').values_list(
+        'scan_time', 'file__info__size', 'file__info__mimetype')[
+        :settings.SCAN_TIMEOUT_HISTORY]
+    scan_times = defaultdict(list)
+    for scan_time, size, mimetype in rows:
+        size_range = get_size_range(size)
+        scan_times[size_range, mimetype].append(scan_time)
+        scan_times[size_range, None].append(scan_time)
+    stats = {key: percentile(values, 95)
+             for key, values in scan_times.items()
+             if len(values) >= settings.SCAN_TIMEOUT_MIN_SAMPLES}
+    cache.set(get_stats_key(agent_id), stats, settings.SCAN_TIMEOUT_STATS_TTL)
+    return stats
+
+
+def get_time_limit(agent_id, size=None, mimetype=None):
+    """
+    Seconds a scan of a file may take on an agent, SCAN_TIMEOUT_FACTOR times
+    what the agent took for most files alike, or a budget by the size of the
+    file if the agent has no history for them yet. It is kept between
+    SCAN_TIMEOUT_MIN and SCAN_TIMEOUT_MAX.
+    """
+    size = size or 0
+    stats = get_scan_time_stats(agent_id) if agent_id else {}
+    size_range = get_size_range(size)
+    scan_time = stats.get((size_range, mimetype)) or \
+        stats.get((size_range, None))
+    if scan_time:
+        time_limit = scan_time * settings.SCAN_TIMEOUT_FACTOR
+    else:
+        time_limit = settings.SCAN_TIMEOUT_BASE + \
+            size / MB * settings.SCAN_TIMEOUT_PER_MB
+    return min(max(time_limit, settings.SCAN_TIMEOUT_MIN),
+               settings.SCAN_TIMEOUT_MAX)
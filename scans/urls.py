@@ -1,6 +1,7 @@
 from rest_framework.routers import SimpleRouter
 
-from scans.views import SessionViewSet, FileViewSet, ScanViewSet
+from scans.views import (SessionViewSet, FileViewSet, ScanViewSet,
+                         UploadViewSet)
 
 
 router = SimpleRouter()
@@ -8,5 +9,6 @@ router = SimpleRouter()
 router.register(r'sessions', SessionViewSet)
 router.register(r'files', FileViewSet)
 router.register(r'scans', ScanViewSet)
+router.register(r'uploads', UploadViewSet)
 
 urlpatterns = router.urls
@@ -2,6 +2,13 @@ import os
 
 
 from django.conf import settings
+from django.core.files import File as FileWrapper
+from django.db import connection, transaction
+from django.db.utils import DataError
+
+from core.utils.files import (discover_mimetype, get_extension_info,
+                              is_archive_file)
+from core.utils.downloads import DownloadError, DownloadTooLarge, download
 
 
 def register_existing_files(media_root=None):
@@ -17,3 +24,168 @@ def register_existing_files(media_root=None):
                 File.objects.create_from_path(path=file_path, extract=True)
             except:
                 continue
+
+
+def bulk_create(model, objs):
+    """
+    bulk_create which always sets primary keys on the created objects, it
+    falls back to one INSERT per object on backends which can not return
+    them from a bulk insert.
+    """
+    if connection.features.can_return_rows_from_bulk_insert:
+        return model.objects.bulk_create(objs)
+    for obj in objs:
+        obj.save(force_insert=True)
+    return objs
+
+
+def skipped_record(path, notes):
+    """ Record of ingest_file for a file which is not read """
+    return {
+        'path': path,
+        'info': None,
+        'file': {'display_name': os.path.split(path)[-1], 'notes': notes,
+                 'deleted': True, 'progress': 100},
+        'archive': False
+    }
+
+
+def ingest_file(path, owner=None, allowed_mimetypes=None, max_file_size=None,
+                check_archive=False):
+    """
+    Copies a file from disk into storage and returns the values of its
+    FileInfo and File rows. Only the head of the file is read for its
+    mimetype, the rest is read once, while it is copied and hashed. It does
+    not touch the database, so it is safe to run on threads.
+    """
+    from scans.models.file import File
+
+    display_name = os.path.split(path)[-1]
+    record = {
+        'path': path,
+        'info': None,
+        'file': {'display_name': display_name},
+        'archive': False
+    }
+    try:
+        with open(path, 'rb') as f:
+            f = FileWrapper(f, name=display_name)
+            mimetype = discover_mimetype(f)
+            record['info'] = {'size': f.size, 'mimetype': mimetype}
+
+            if allowed_mimetypes and mimetype not in allowed_mimetypes:
+                notes = f'The Uploaded file mimetype {mimetype} is not valid.'
+            elif max_file_size and not f.size <= max_file_size:
+                notes = f'The uploaded file size exceeded {max_file_size}.'
+            else:
+                notes = None
+            if notes:
+                record['file'].update(notes=notes, deleted=True, progress=100)
+                return record
+
+            f.seek(0)
+            field = File._meta.get_field('file')
+            name = field.storage.save(
+                field.generate_filename(File(user=owner), display_name), f,
+                max_length=field.max_length
+            )
+            # the storage hashed the file while it copied it
+            record['info'].update(f.checksums,
+                                  **get_extension_info(display_name, mimetype))
+            record['file'].update(file=name, valid=True)
+            if check_archive:
+                record['archive'] = is_archive_file(field.storage.path(name))
+    except FileNotFoundError:
+        record['file'].update(notes=f'No such file or directory: "{path}"',
+                              deleted=True, progress=100)
+    except OSError as e:
+        record['file'].update(notes=f'{e.strerror}: "{path}"', deleted=True,
+                              progress=100)
+    return record
+
+
+def download_url(url, save_as=None, owner=None, allowed_mimetypes=None,
+                 max_file_size=None, check_archive=False):
+    """
+    Downloads a url into storage, hashing it on the way, and returns the
+    values of its FileInfo and File rows like ingest_file. It does not touch
+    the database either.
+    """
+    from scans.models.file import File
+
+    record = {
+        'path': url,
+        'info': None,
+        'file': {'display_name': url[:256]},
+        'archive': False
+    }
+    try:
+        file = download(url, save_as=save_as, max_size=max_file_size)
+    except DownloadError as e:
+        if isinstance(e, DownloadTooLarge) and e.size is not None:
+            record['info'] = {'size': e.size}
+        record['file'].update(notes=str(e), deleted=True, progress=100)
+        return record
+
+    with file:
+        mimetype = file.file_info['mimetype']
+        record['file']['display_name'] = file.name
+        if allowed_mimetypes and mimetype not in allowed_mimetypes:
+            record['info'] = {'size': file.size, 'mimetype': mimetype}
+            record['file'].update(
+                notes=f'The Uploaded file mimetype {mimetype} is not valid.',
+                deleted=True, progress=100)
+            return record
+
+        record['info'] = dict(file.file_info,
+                              **get_extension_info(file.name, mimetype))
+        field = File._meta.get_field('file')
+        name = field.storage.save(
+            field.generate_filename(File(user=owner), file.name), file,
+            max_length=field.max_length
+        )
+        record['file'].update(file=name, valid=True)
+        if check_archive:
+            record['archive'] = is_archive_file(field.storage.path(name))
+    return record
+
+
+def create_ingested(records, session, owner=None):
+    """
+    Creates the FileInfo and File rows of ingest_file records in bulk. Rows
+    the database rejects are recorded as deleted files with the error.
+    """
+    from scans.models.file import File, FileInfo
+
+    def create(records):
+        infos = iter(bulk_create(FileInfo, [FileInfo(**record['info'])
+                                            for record in records
+                                            if record['info']]))
+        return bulk_create(File, [
+            File(user=owner, session=session,
+                 info=next(infos) if record['info'] else None,
+                 **record['file'])
+            for record in records
+        ])
+
+    try:
+        with transaction.atomic():
+            instances = create(records)
+    except DataError:
+        instances = []
+        for record in records:
+            try:
+                with transaction.atomic():
+                    instances += create([record])
+            except DataError as e:
+                name = record['file'].get('file')
+                if name:
+                    File._meta.get_field('file').storage.delete(name)
+                instances.append(File.objects.create(
+                    user=owner, file=None, session=session,
+                    display_name=record['file']['display_name'][:256],
+                    notes=f'{str(e)}: "{record["path"]}"', deleted=True,
+                    progress=100
+                ))
+    File.track_created(instances)
+    return instances
@@ -7,6 +7,7 @@ from django.db.models import CharField, When, Count, Avg, F, Q, Subquery,\
     OuterRef, Case, Value, ObjectDoesNotExist
 from django.db.models.functions import TruncMonth, Cast, Substr
 from django.conf import settings
+from django.db import transaction
 from rest_framework.viewsets import mixins, GenericViewSet
 from rest_framework.permissions import AllowAny
 from rest_framework.decorators import action
@@ -19,15 +20,22 @@ from django.core.exceptions import ValidationError as django_validatior_error
 from proj.celery import app as celery_app
 from core.mixins import AsyncMixin
 from scans.serializers import (FileSerializer, FromUrlSerializer,
+                               FromUrlsSerializer,
                                FromPathSerializer, FromDiskSerializer,
                                ScanSerializer,
                                CopySerializer, SessionSerializer,
-                               CleanupSerializer, ScanReportSerializer)
+                               CleanupSerializer, ScanReportSerializer,
+                               UploadSerializer, FinalizeUploadSerializer)
 from scans.models.file import File
 from scans.models.session import Session, TaskLog
 from scans.models.scan import Scan
-from scans.exceptions import InvalidPostScanOperation
-from scans.permissions import SessionPermissions, FilePermissions, ScanPermissions
+from scans.models.upload import Upload
+from scans.exceptions import (InvalidPostScanOperation, UploadError,
+                              UploadConflict)
+from scans import queue_index
+from scans.events import get_progress
+from scans.permissions import (SessionPermissions, FilePermissions,
+                               ScanPermissions, UploadPermissions)
 from scans.tasks import cleanup
 from scans.filters import FileFilter
 from agents.models import Agent
@@ -67,6 +75,103 @@ class SessionViewSet(mixins.ListModelMixin,
             res.data = data
         return res
 
+    @action(methods=['get'], detail=True)
+    def events(self, request, pk=None):
+        """
+        Current progress of a session and its version. Clients which accept
+        text/event-stream get it streamed by the ASGI application instead.
+        """
+        instance = self.get_object()
+        try:
+            data = get_progress(instance.pk)
+        except RedisConnectionError as e:
+            return Response(data={'detail': str(e)}, status=499)
+
+        if data is None:
+            # nothing is published for the session yet or it expired
+            instance.refresh_from_db()
+            data = {'version': 0, **instance.get_progress()}
+        return Response(data)
+
+    @action(methods=['get'], detail=True)
+    def eta(self, request, pk=None):
+        """
+        Position of the session in the queues of its agents and the seconds
+        left until its waiting scans are done.
+        """
+        instance = self.get_object()
+        try:
+            data = queue_index.get_eta(instance.pk)
+        except RedisConnectionError as e:
+            return Response(data={'detail': str(e)}, status=499)
+        return Response(data)
+
+
+class UploadViewSet(mixins.CreateModelMixin,
+                    mixins.RetrieveModelMixin,
+                    mixins.DestroyModelMixin,
+                    GenericViewSet):
+    """
+    Uploads large files in chunks, an upload is created with the name and
+    size of its file, its chunks are PUT in order and it is finalized into
+    a file once all of them are received.
+    """
+    queryset = Upload.objects.all()
+    serializer_class = UploadSerializer
+    permission_classes = [UploadPermissions]
+
+    def get_locked_object(self):
+        return self.get_queryset().select_for_update().get(
+            pk=self.get_object().pk)
+
+    @action(methods=['put'], detail=True, url_path=r'chunks/(?P<number>\d+)')
+    def chunk(self, request, pk=None, number=None):
+        """
+        The body of the request is the chunk and the offset querystring the
+        position of its first byte in the file.
+        """
+        offset = request.query_params.get('offset')
+        if offset is None or not re.match(r'^\d+$', offset):
+            return Response(data={'detail': 'offset querystring must be integer'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+
+        with transaction.atomic():
+            instance = self.get_locked_object()
+            try:
+                instance.write_chunk(int(number), int(offset), request.stream,
+                                     length)
+            except UploadConflict as e:
+                return Response(data={'detail': str(e),
+                                      **self.get_serializer(instance).data},
+                                status=status.HTTP_409_CONFLICT)
+            except UploadError as e:
+                return Response(data={'detail': str(e)},
+                                status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(instance).data)
+
+    @action(methods=['post'], detail=True,
+            serializer_class=FinalizeUploadSerializer)
+    def finalize(self, request, pk=None):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        # hashed before the upload is locked, chunks of other uploads and
+        # polls of this one are not held up meanwhile
+        checksums = self.get_object().get_checksums()
+        with transaction.atomic():
+            instance = self.get_locked_object()
+            try:
+                file = instance.finalize(checksums=checksums,
+                                         **serializer.validated_data)
+            except UploadConflict as e:
+                return Response(data={'detail': str(e)},
+                                status=status.HTTP_409_CONFLICT)
+            except UploadError as e:
+                return Response(data={'detail': str(e)},
+                                status=status.HTTP_400_BAD_REQUEST)
+        return Response(FileSerializer(file, context={'request': request}).data,
+                        status=status.HTTP_201_CREATED)
+
 
 class FileViewSet(mixins.CreateModelMixin,
                   mixins.RetrieveModelMixin,
@@ -201,6 +306,15 @@ class FileViewSet(mixins.CreateModelMixin,
         return Response({'session_id': session.pk},
                         status=status.HTTP_201_CREATED)
 
+    @action(methods=['post'], serializer_class=FromUrlsSerializer,
+            detail=False, url_path='urls')
+    def from_urls(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        session = serializer.create(serializer.validated_data)
+        return Response({'session_id': session.pk},
+                        status=status.HTTP_201_CREATED)
+
     @action(methods=['post'], serializer_class=FromPathSerializer,
             detail=False, url_path='path')
     def from_path(self, request):
@@ -218,15 +332,6 @@ class FileViewSet(mixins.CreateModelMixin,
         session = serializer.create(serializer.validated_data)
         return Response({'session_id': session.pk}, status=status.HTTP_201_CREATED)
 
-    @action(methods=['post'], serializer_class=FromDiskserializer,
-            detail=False, url_path='disk')
-    def from_disk(self, request):
-        data = request.data
-        serializer = self.get_serializer(data=data)
-        serializer.is_valid(raise_exception=True)
-        session = serializer.create(serializer.validated_data)
-        return Response({'session_id': session.pk}, status=status.HTTP_201_CREATED)
-
     @action(methods=['post'], detail=False, serializer_class=CleanupSerializer)
     def cleanup(self, request):
         serializer = self.get_serializer(data=request.data)
@@ -250,6 +355,9 @@ class FileViewSet(mixins.CreateModelMixin,
             for task_log in TaskLog.objects.filter(session_id=session_id):
                 celery_app.control.revoke(task_log.task_id, terminate=True)
                 task_log.delete()
+            # Scans of other sessions must not keep waiting on revoked ones
+            Scan.objects.filter(file__session_id=session_id,
+                                status_code=None).release_waiters()
 
             return Response(data={'detail': 'Task terminated'},
                             status=status.HTTP_200_OK)